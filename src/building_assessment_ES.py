@@ -1,6 +1,15 @@
+from collections import deque
+import heapq
+import json
+import time
+
 from experta import *
+from experta.strategies import DepthStrategy
 import skfuzzy as fuzz
-import numpy as np
+
+from building_assessment_fuzzy import get_surface
+from building_assessment_metrics import REGISTRY
+from building_assessment_rules import get_active_rules
 
 # Define a fact class to represent building assessment data
 class BuildingAssessment(Fact):
@@ -59,108 +68,338 @@ class BuildingAssessment(Fact):
     # Design and Data Availability
     outdated_design = Field(bool, default=False)  # Building design predates modern codes
     conflicting_data = Field(bool, default=False)  # Conflicting SAR and optical data
+    significant_difference = Field(bool, default=False)  # Surveys or measurements disagree significantly
     missing_records = Field(bool, default=False)  # Missing pre- and post-war property records
     multiple_properties = Field(bool, default=False)  # Owner has multiple properties
     at_least_one_livable = Field(bool, default=False)  # At least one property is livable
     contaminated_materials = Field(bool, default=False)  # Indicates whether materials are contaminated
     renewable_energy_possible = Field(bool, default=False)  # Indicates feasibility of renewable energy integration
 
-PRIORITY_MAP = {
-    # Critical Actions
-    "Critical: Reconstruction Delayed due to hazardous zone.": 100,
-    "Critical: Reconstruction Delayed due to minefields.": 90,
-    "Critical: Reconstruction Delayed due to landslide risk.": 100,
-    "Critical: Earthquake reinforcement required.": 100,
-    "Critical: Earthquake Reinforcement Required.": 95,
-    "Critical: Prohibit rebuilding due to high radiation.": 95,
-    "Critical: Immediate Repairs Required (SAR Detected).": 85,
-    "Critical: Immediate Repairs Required (Visual Assessment).": 85,
-    "Critical: Immediate Repairs Required for Load-Bearing Cracks.": 90,
-    "Critical: Immediate Repairs Required for Severe Large Cracks.": 85,
-    "Critical: Immediate Water Sanitation Required.": 85,
-    "Critical: Combined impact of hazardous zone and overcrowding.": 100,
-    "Critical: Combined Flood and Water Contamination Risk.": 100,
-    "Critical: Prohibit rebuilding due to radiation and minefields.": 100,
-    "Critical: Landslide Risk Near Critical Infrastructure in Hazardous zone.": 100,
-    "Critical: Flood protection measures required.": 90,
-    "Critical: Reconstruction Delayed due to High Flood Risk.": 95,
-    "Critical: Combined risk of high radiation and cracks in hazardous zone.": 100,
-    "Critical: Contaminated materials detected, remediation required.": 90,
-    "Critical: Near critical infrastructure (e.g., hospitals, schools).": 100,
-
-    # High-Priority Actions
-    "High Priority: Combined risk of radiation and cracks.": 80,
-    "High Priority: Vulnerable population safety.": 80,
-    "High Priority: Immediate temporary housing needed for displaced residents.": 80,
-    "High Priority: Restore Utilities for Vulnerable Population.": 85,
-    "High Priority: Deploy Temporary Power Sources for Critical Facilities.": 85,
-    "High Priority: Reconstruction due to overcrowding.": 75,
-    "High Priority: Temporary housing near urban center for displaced residents.": 75,
-    "High Priority: Deploy temporary power sources for critical facilities.": 90,
-    "High Priority: Use pallet or container homes.": 70,
-    "High Priority: Income below poverty threshold.": 70,
-    "High Priority: Building serves multiple families.": 70,
-    "High Priority: Clear road access before rebuilding.": 80,
-    "High Priority: Hospitals or schools zone reconstruction.": 70,
-    "High Priority: Combined impact of overcrowding and vulnerable population.": 85,
-    "High Priority: Ensure utilities are restored for vulnerable population.": 80,
-    "High Priority: Requires Field Validation.": 70,
-
-    # Moderate Actions
-    "Moderate: Flood zone and water contamination mitigation required.": 70,
-    "Moderate: Repairs suggested for damaged utilities.": 50,
-    "Moderate: Incorporate earthquake-resistant design.": 50,
-    "Moderate: Proceed with caution due to landslide susceptibility.": 50,
-    "Moderate: Flood protection measures required.": 50,
-    "Moderate: Monitor timelines for power restoration.": 50,
-    "Moderate: Restore water supply access.": 70,
-    "Moderate: Monitor and mitigate radiation risks.": 65,
-    "Moderate: Monitor landslide risk near critical infrastructure.": 70,
-
-    # Recommendations and Low Priority Actions
-    "Recommendation: Retrofit building to modern design standards.": 50,
-    "Recommendation: Import certified materials to ensure safety.": 50,
-    "Recommendation: Temporary housing near urban center.": 50,
-    "Recommendation: Use geospatial data and neighboring properties for estimation.": 50,
-    "Recommendation: Routine repairs recommended.": 30,
-    "Low Priority: Landslide risk is minimal.": 30,
-    "Low Priority: Flood risk is minimal.": 30,
-    "Low Priority: Seismic risk is minimal.": 30,
-    "Low Priority: Radiation levels are within safe limits.": 20,
-    "Low Priority: No immediate repairs required (Radar stable).": 20,
-    "Low Priority: At least one livable property available.": 20,
-    "Low Priority: Energy resource allocation not required.": 20,
-    "Low Priority: Routine Repairs Recommended.": 20,
-    "Lower Priority: At least one livable property available.": 20,
+# Confidence fields aggregated into the derived features (those checked by zero_confidence_rule)
+CONFIDENCE_FIELDS = [
+    "crack_confidence", "load_confidence", "width_confidence", "worsening_confidence", "ordnance_confidence",
+    "flood_confidence", "seismic_confidence", "vulnerable_confidence", "income_confidence", "utilities_confidence",
+    "hazardous_confidence", "radiation_confidence", "infrastructure_confidence", "overcrowding_confidence"
+]
+
+class DerivedFeatures(Fact):
+    """
+    Quantities derived once from a declared BuildingAssessment, before rule matching.
+
+    Bands use the thresholds of the rule that consumes them and are 'none' when the
+    underlying value is not positive, so those rules only activate when they can act.
+    """
+
+    source = Field(int, mandatory=True)  # Fact ID of the BuildingAssessment these features were derived from
+
+    # Aggregate confidence statistics
+    min_confidence = Field(float, default=1.0)  # Lowest confidence among CONFIDENCE_FIELDS
+    mean_confidence = Field(float, default=1.0)  # Mean confidence among CONFIDENCE_FIELDS
+    zero_confidence_count = Field(int, default=0)  # Number of CONFIDENCE_FIELDS equal to 0.0
+
+    # Cracks
+    crack_severity_score = Field(float, default=0.0)  # Numeric severity of the crack class
+    severe_crack_membership = Field(float, default=0.0)  # Membership of the score in the 'severe' fuzzy set
+    crack_conf = Field(float, default=1.0)  # Crack confidence
+    crack_urgency = Field(float, default=0.0)  # Mamdani urgency over crack severity, width and confidence
+
+    # Categorical bands
+    radiation_band = Field(str, default="none")  # 'none', 'safe', 'moderate', 'high'
+    radiation_conf = Field(float, default=1.0)
+    slope_band = Field(str, default="none")  # 'none', 'low', 'moderate', 'high'
+    seismic_band = Field(str, default="none")  # 'none', 'low', 'moderate', 'high'
+    seismic_conf = Field(float, default=1.0)
+    flood_band = Field(str, default="none")  # Flood zone proximity: 'none', 'low', 'moderate', 'high'
+    flood_conf = Field(float, default=1.0)
+
+# BuildingAssessment fields each derived feature is computed from (see derive_features)
+DERIVED_SOURCES = {
+    "min_confidence": CONFIDENCE_FIELDS,
+    "mean_confidence": CONFIDENCE_FIELDS,
+    "zero_confidence_count": CONFIDENCE_FIELDS,
+    "crack_severity_score": ["cracks"],
+    "severe_crack_membership": ["cracks"],
+    "crack_conf": ["crack_confidence"],
+    "crack_urgency": ["cracks", "crack_width", "crack_confidence"],
+    "radiation_band": ["radiation_level"],
+    "radiation_conf": ["radiation_confidence"],
+    "slope_band": ["slope_gradient"],
+    "seismic_band": ["seismic_risk"],
+    "seismic_conf": ["seismic_confidence"],
+    "flood_band": ["flood_zone_proximity"],
+    "flood_conf": ["flood_confidence"],
 }
 
-CRACK_SEVERITY_MAP = {
-    "none": 0,
-    "minor": 3,
-    "moderate": 6,
-    "severe": 10
+# Action priorities and crack severities from rule_definitions.json, as loaded at import time.
+# Engines read the active rule set (see building_assessment_rules.reload_rules) on every run.
+PRIORITY_MAP = get_active_rules().priority_map
+CRACK_SEVERITY_MAP = get_active_rules().crack_severity
+
+# Individual rules each combined rule supersedes. A combined rule retracts the assessment when it declares
+# its action, so it is given a salience just above these rules and fires first (see PriorityStrategy)
+SUPERSEDED_RULES = {
+    "radiation_and_minefields": ["radiation_rule_with_confidence", "minefields_with_uncertainty"],
+    "landslide_risk_rule": ["hazardous_zone_with_uncertainty", "slope_gradient_rule",
+                            "critical_infrastructure_priority"],
+    "hazardous_zone_and_overcrowding_rule": ["hazardous_zone_with_uncertainty", "overcrowding_with_uncertainty"],
+    "combined_radiation_and_cracks_rule": ["radiation_rule_with_confidence", "hazardous_zone_with_uncertainty",
+                                           "fuzzy_crack_severity_rule", "moderate_cracks_with_confidence",
+                                           "minor_surface_cracks_with_confidence"],
+    "flood_zone_and_water_contamination_rule": ["flood_zone_proximity_rule", "individual_water_contamination_rule"],
+    "urban_temporary_shelter": ["urban_proximity_rule", "temporary_shelter_rule"],
+    "vulnerable_population_and_damaged_utilities_rule": ["vulnerable_population_with_uncertainty",
+                                                         "damaged_utilities_with_uncertainty"],
+    "water_sanitation_rule": ["individual_water_contamination_rule", "water_access_disruption_rule"],
 }
 
+# Salience added to a combined rule above the highest base priority among itself and the rules it supersedes
+SUPERSEDING_MARGIN = 0.5
+
+# Recorded alongside persisted results so stored rankings can be traced to the rule base that produced them
+ENGINE_VERSION = "1.0.1"
+
+# Engine metrics, exposed through building_assessment_metrics
+ENGINE_CONSTRUCTION_SECONDS = REGISTRY.histogram(
+    "building_assessment_engine_construction_seconds", "Time to construct an expert system engine.")
+ENGINE_RUN_SECONDS = REGISTRY.histogram(
+    "building_assessment_engine_run_seconds", "Latency of one engine run().")
+ACTIONS_DECLARED = REGISTRY.counter(
+    "building_assessment_actions", "Actions declared by rule firings.", ["action"])
+PRIORITY_FALLBACKS = REGISTRY.counter(
+    "building_assessment_priority_fallbacks", "Actions declared without an entry in the priority map.", ["action"])
+
+class ExplanationTrace:
+    """
+    Bounded ring buffer recording why each action was declared.
+
+    Entries record the firing rule, its bound `MATCH` variables, the base and
+    confidence-adjusted priority, and any facts retracted by combined rules.
+    When the buffer is full the oldest entries are dropped.
+    """
+
+    def __init__(self, capacity=10000):
+        self.entries = deque(maxlen=capacity)
+        self.building_id = None
+
+    def begin(self, building_id):
+        """Tags subsequent entries with the given building ID."""
+        self.building_id = building_id
+
+    def record_action(self, rule, bindings, action, base_priority, confidence, adjusted_priority):
+        """Records an action declared by a rule, with its bindings and priorities."""
+        self.entries.append({
+            "building_id": self.building_id,
+            "event": "action",
+            "rule": rule,
+            "bindings": dict(bindings),
+            "action": action,
+            "base_priority": base_priority,
+            "confidence": confidence,
+            "adjusted_priority": adjusted_priority,
+        })
+
+    def record_retraction(self, rule, fact):
+        """Records a fact retracted by a combined rule."""
+        self.entries.append({
+            "building_id": self.building_id,
+            "event": "retract",
+            "rule": rule,
+            "fact": fact.as_dict() if isinstance(fact, Fact) else fact,
+        })
+
+    def export(self, building_id=None):
+        """
+        Returns the recorded entries, optionally for a single building.
+
+        Args:
+            building_id (str, optional): Only return entries tagged with this building.
+
+        Returns:
+            list: Entry dictionaries in firing order.
+        """
+        if building_id is None:
+            return list(self.entries)
+        return [entry for entry in self.entries if entry["building_id"] == building_id]
+
+    def to_json(self, building_id=None):
+        """Returns the exported entries as a JSON string."""
+        return json.dumps(self.export(building_id), default=str, indent=2)
+
+    def clear(self):
+        """Drops all recorded entries."""
+        self.entries.clear()
+
+class PriorityStrategy(DepthStrategy):
+    """
+    Conflict resolution that fires rules able to declare the highest-priority actions first.
+
+    An activation's salience is the highest base priority among the actions its rule
+    can declare (from the rule definitions), plus any explicit `salience` on the rule.
+    Combined rules in `SUPERSEDED_RULES` rank just above the rules they supersede
+    instead, so they can suppress them. Ties are broken by fact recency, as in the
+    default depth strategy, then by rule name so the firing order is deterministic.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rule_priorities = {}
+        self.rule_salience = {}
+
+    def get_key(self, activation):
+        name = activation.rule.__name__
+        salience = self.rule_salience.get(name, self.rule_priorities.get(name, 0)) + activation.rule.salience
+        # Derived features rank as the assessment they were derived from
+        facts = sorted((f['source'] if isinstance(f, DerivedFeatures) else f['__factid__'] for f in activation.facts),
+                       reverse=True)
+        return (salience, facts, name)
+
+    def max_priority(self, activation):
+        """Returns the highest base priority the activation's rule can declare."""
+        return self.rule_priorities.get(activation.rule.__name__, 0)
+
 class BuildingAssessmentExpertSystem(KnowledgeEngine):
     """
     Rule-based expert system for evaluating building conditions using fuzzy logic
     and prioritizing actions based on confidence values. Includes backward chaining.
     """
 
-    def __init__(self):
+    __strategy__ = PriorityStrategy
+
+    def __init__(self, ruleset=None):
+        """
+        Args:
+            ruleset (CompiledRuleSet, optional): Rule definitions to pin this engine to.
+                If omitted, the engine follows the active rule set and picks up hot reloads.
+        """
+        start = time.perf_counter()
         super().__init__()
         self.prioritized_actions = []
+        self.action_rules = {}  # Maps each declared action to the rule that declared it
+        self.current_rule = None  # Name of the rule currently firing
+        self.current_bindings = {}  # MATCH variables bound for the rule currently firing
+        self.trace = None  # Optional ExplanationTrace; tracing is off when None
+        self.activations_fired = 0  # Number of rule firings in the last run
+        self.derived_facts = {}  # Maps each BuildingAssessment fact ID to its DerivedFeatures fact
+
+        self.pinned_ruleset = ruleset
+        self.use_ruleset(ruleset or get_active_rules())
+        ENGINE_CONSTRUCTION_SECONDS.observe(time.perf_counter() - start)
+
+    def use_ruleset(self, ruleset):
+        """
+        Switches the engine to a compiled rule set, including its precompiled fuzzy membership functions.
 
-        # Define fuzzy membership functions
-        self.x_cracks = np.arange(0, 11, 1)
-        self.minor_cracks = fuzz.trimf(self.x_cracks, [0, 0, 4])
-        self.moderate_cracks = fuzz.trimf(self.x_cracks, [4, 6, 8])
-        self.severe_cracks = fuzz.trimf(self.x_cracks, [7, 10, 10])
+        Args:
+            ruleset (CompiledRuleSet): The rule definitions to use.
+        """
+        self.ruleset = ruleset
+
+        # Rule salience follows the base priority of the actions each rule can declare
+        priorities = {name: rule.max_priority for name, rule in ruleset.rules.items()}
+        self.strategy.rule_priorities = priorities
+        self.strategy.rule_salience = {
+            name: max(priorities.get(rule, 0) for rule in [name] + superseded) + SUPERSEDING_MARGIN
+            for name, superseded in SUPERSEDED_RULES.items()}
+        for activation in self.agenda.activations:
+            activation.key = self.strategy.get_key(activation)
+        self.agenda.activations.sort()
+
+        # Fuzzy membership functions
+        self.x_cracks = ruleset.fuzzy_ranges["cracks"]
+        self.minor_cracks = ruleset.fuzzy_sets[("cracks", "minor")]
+        self.moderate_cracks = ruleset.fuzzy_sets[("cracks", "moderate")]
+        self.severe_cracks = ruleset.fuzzy_sets[("cracks", "severe")]
+
+        self.x_confidence = ruleset.fuzzy_ranges["confidence"]
+        self.low_confidence = ruleset.fuzzy_sets[("confidence", "low")]
+        self.moderate_confidence = ruleset.fuzzy_sets[("confidence", "moderate")]
+        self.high_confidence = ruleset.fuzzy_sets[("confidence", "high")]
+
+        # Mamdani inference over crack severity, width and confidence, precomputed as a lookup surface
+        self.fuzzy_surface = get_surface(ruleset)
+
+        # Bands depend on rule thresholds, so features derived under the previous set are stale
+        for source_id, derived in list(self.derived_facts.items()):
+            super().retract(derived)
+            self.derived_facts[source_id] = super().declare(self.derive_features(self.facts[source_id]))
+
+    def derive_features(self, fact):
+        """
+        Computes the derived features of a declared building assessment.
 
-        self.x_confidence = np.arange(0.0, 1.1, 0.1)
-        self.low_confidence = fuzz.trimf(self.x_confidence, [0.0, 0.0, 0.4])
-        self.moderate_confidence = fuzz.trimf(self.x_confidence, [0.3, 0.6, 0.8])
-        self.high_confidence = fuzz.trimf(self.x_confidence, [0.7, 1.0, 1.0])
+        Args:
+            fact (BuildingAssessment): A declared fact.
+
+        Returns:
+            DerivedFeatures: Features linked to `fact` through its fact ID.
+        """
+        rules = self.ruleset.rules
+        confidences = [fact[name] for name in CONFIDENCE_FIELDS]
+
+        crack_severity_score = float(self.ruleset.crack_severity.get(fact["cracks"], 0))
+        severe_crack_membership = self.evaluate_fuzzy_membership(crack_severity_score, self.x_cracks, self.severe_cracks)
+
+        t = rules["radiation_rule_with_confidence"].thresholds
+        radiation = fact["radiation_level"]
+        if radiation > t["high_level"]:
+            radiation_band = "high"
+        elif radiation > t["moderate_level"]:
+            radiation_band = "moderate"
+        elif radiation > 0:
+            radiation_band = "safe"
+        else:
+            radiation_band = "none"
+
+        t = rules["slope_gradient_rule"].thresholds
+        slope = fact["slope_gradient"]
+        if slope > t["high_slope"]:
+            slope_band = "high"
+        elif slope > t["moderate_slope"]:
+            slope_band = "moderate"
+        elif slope > 0:
+            slope_band = "low"
+        else:
+            slope_band = "none"
+
+        t = rules["seismic_activity_rule"].thresholds
+        pga = fact["seismic_risk"]
+        if pga > t["high_pga"]:
+            seismic_band = "high"
+        elif pga > t["moderate_pga"]:
+            seismic_band = "moderate"
+        elif pga > 0:
+            seismic_band = "low"
+        else:
+            seismic_band = "none"
+
+        t = rules["flood_zone_proximity_rule"].thresholds
+        distance = fact["flood_zone_proximity"]
+        if distance >= t["high_distance"]:
+            flood_band = "high"
+        elif distance >= t["moderate_distance"]:
+            flood_band = "moderate"
+        elif distance > 0.0:
+            flood_band = "low"
+        else:
+            flood_band = "none"
+
+        return DerivedFeatures(
+            source=fact['__factid__'],
+            min_confidence=float(min(confidences)),
+            mean_confidence=float(sum(confidences) / len(confidences)),
+            zero_confidence_count=sum(1 for conf in confidences if conf == 0.0),
+            crack_severity_score=crack_severity_score,
+            severe_crack_membership=float(severe_crack_membership),
+            crack_conf=fact["crack_confidence"],
+            crack_urgency=self.fuzzy_surface.evaluate(crack_severity_score, fact["crack_width"], fact["crack_confidence"]),
+            radiation_band=radiation_band,
+            radiation_conf=fact["radiation_confidence"],
+            slope_band=slope_band,
+            seismic_band=seismic_band,
+            seismic_conf=fact["seismic_confidence"],
+            flood_band=flood_band,
+            flood_conf=fact["flood_confidence"]
+        )
 
     def evaluate_fuzzy_membership(self, value, x_range, membership_function, verbose=False):
         """
@@ -193,13 +432,113 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         # Avoid duplicate actions
         if any(a[1] == action for a in self.prioritized_actions):
             return
-        base_priority = PRIORITY_MAP.get(action, 50)  # Default to 50 if action not found
+        base_priority = self.ruleset.base_priority(action)  # Default priority if action not found
+        if action not in self.ruleset.priority_map:
+            PRIORITY_FALLBACKS.inc(action)
+        ACTIONS_DECLARED.inc(action)
         adjusted_priority = base_priority * confidence
         self.prioritized_actions.append((adjusted_priority, action))
+        self.action_rules[action] = self.current_rule
+        if self.trace is not None:
+            self.trace.record_action(self.current_rule, self.current_bindings, action,
+                                     base_priority, confidence, adjusted_priority)
 
     def reset_actions(self):
         """Clears the list of prioritized actions."""
         self.prioritized_actions = []
+        self.action_rules = {}
+
+    def reset(self, **kwargs):
+        """Resets the fact list and agenda, dropping all derived features."""
+        self.derived_facts = {}
+        super().reset(**kwargs)
+
+    def declare(self, *facts):
+        """
+        Declares facts. Each new BuildingAssessment is followed by its DerivedFeatures,
+        computed once here instead of in every rule that needs them.
+        """
+        last_inserted = None
+        for fact in facts:
+            last_inserted = super().declare(fact)
+            if isinstance(last_inserted, BuildingAssessment):
+                source_id = last_inserted['__factid__']
+                self.derived_facts[source_id] = super().declare(self.derive_features(last_inserted))
+        return last_inserted
+
+    def retract(self, idx_or_declared_fact):
+        """
+        Retracts a fact, recording it in the explanation trace when tracing is on.
+        Retracting a BuildingAssessment also retracts its derived features.
+        """
+        super().retract(idx_or_declared_fact)
+        if self.trace is not None:
+            self.trace.record_retraction(self.current_rule, idx_or_declared_fact)
+
+        source_id = idx_or_declared_fact if isinstance(idx_or_declared_fact, int) else idx_or_declared_fact['__factid__']
+        derived = self.derived_facts.pop(source_id, None)
+        if derived is not None:
+            super().retract(derived)
+
+    def run(self, steps=float('inf'), top_n=None):
+        """
+        Execute agenda activations, keeping track of the rule currently firing
+        so that each declared action can be attributed to its rule.
+
+        Activations fire in descending order of the base priority their rule can reach,
+        combined rules just before the rules they supersede. With `top_n`, the run stops
+        as soon as no remaining activation could enter the top `top_n` actions, since an
+        action's priority never exceeds base priority x 1.0.
+
+        Args:
+            steps (int or float): Maximum number of activations to fire.
+            top_n (int, optional): Only the top `top_n` actions are needed.
+        """
+        start = time.perf_counter()
+        # Resolve the rule set once per run so a concurrent reload never mixes definitions
+        ruleset = self.pinned_ruleset or get_active_rules()
+        if ruleset is not self.ruleset:
+            self.use_ruleset(ruleset)
+
+        self.activations_fired = 0
+        self.running = True
+        while steps > 0 and self.running:
+            added, removed = self.get_activations()
+            self.strategy.update_agenda(self.agenda, added, removed)
+
+            activation = self.agenda.get_next()
+            if activation is None:
+                break
+            if top_n is not None and self.top_actions_settled(
+                    top_n, max(map(self.strategy.max_priority, self.agenda.activations + [activation]))):
+                break
+
+            steps -= 1
+            self.activations_fired += 1
+            self.current_rule = activation.rule.__name__
+            self.current_bindings = {k: v for k, v in activation.context.items() if not k.startswith('__')}
+            activation.rule(self, **self.current_bindings)
+
+        self.current_rule = None
+        self.current_bindings = {}
+        self.running = False
+        ENGINE_RUN_SECONDS.observe(time.perf_counter() - start)
+
+    def top_actions_settled(self, top_n, max_remaining_priority):
+        """
+        Checks whether the current top `top_n` actions can no longer change.
+
+        Args:
+            top_n (int): Number of top actions required.
+            max_remaining_priority (float): Highest priority any remaining activation can declare.
+
+        Returns:
+            bool: True if `top_n` actions are declared and none is below `max_remaining_priority`.
+        """
+        if len(self.prioritized_actions) < top_n:
+            return False
+        kth_priority = heapq.nlargest(top_n, (priority for priority, _ in self.prioritized_actions))[-1]
+        return kth_priority >= max_remaining_priority
 
     def print_prioritized_actions(self, top_n=5, verbose=False):
         """
@@ -228,6 +567,16 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
             return [(priority, f"Action: {action}") for priority, action in self.prioritized_actions[:top_n]]
         return self.prioritized_actions[:top_n]
 
+    def get_ranked_actions(self):
+        """
+        Returns all prioritized actions sorted by priority, with the rule that declared each one.
+
+        Returns:
+            list: Tuples of (priority, action, rule_name), highest priority first.
+        """
+        self.prioritized_actions.sort(reverse=True, key=lambda x: x[0])
+        return [(priority, action, self.action_rules.get(action)) for priority, action in self.prioritized_actions]
+
     def validate_confidence(self, conf):
         """
         Validates the confidence value provided for a rule or fact.
@@ -291,44 +640,49 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
 
     @Rule(BuildingAssessment(sar_backscatter=True))
     def severe_sar_damage(self):
-        self.declare_action("Critical: Immediate Repairs Required (SAR Detected).")
+        rule = self.ruleset.rules["severe_sar_damage"]
+        self.declare_action(rule.actions["action"])
 
-    @Rule(BuildingAssessment(cracks=MATCH.crack_severity, crack_confidence=MATCH.conf))
-    def fuzzy_crack_severity_rule(self, crack_severity, conf):
-        crack_severity_value = CRACK_SEVERITY_MAP.get(crack_severity, 0)
-        crack_severe = self.evaluate_fuzzy_membership(crack_severity_value, self.x_cracks, self.severe_cracks)
-        if crack_severe > 0.7 and conf > 0.7:
-            self.declare_action("Critical: Immediate Repairs Required (Visual Assessment).", confidence=min(crack_severe, conf))
+    @Rule(DerivedFeatures(crack_urgency=MATCH.urgency & P(lambda urgency: urgency > 0), crack_conf=MATCH.conf))
+    def fuzzy_crack_severity_rule(self, urgency, conf):
+        rule = self.ruleset.rules["fuzzy_crack_severity_rule"]
+        if conf >= rule.thresholds["min_confidence"] and urgency >= rule.thresholds["min_urgency"]:
+            self.declare_action(rule.actions["action"], confidence=urgency / self.fuzzy_surface.peak)
 
     @Rule(BuildingAssessment(load_bearing_cracks=True, crack_width=0.0, load_confidence=MATCH.conf))
     def load_bearing_cracks_rule(self, conf):
+        rule = self.ruleset.rules["load_bearing_cracks_rule"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.9:
-            self.declare_action("Critical: Immediate Repairs Required for Load-Bearing Cracks.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(cracks="moderate", crack_confidence=MATCH.conf))
     def moderate_cracks_with_confidence(self, conf):
+        rule = self.ruleset.rules["moderate_cracks_with_confidence"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.6:
-            self.declare_action("Moderate: Repairs Suggested.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(cracks="minor", crack_confidence=MATCH.conf))
     def minor_surface_cracks_with_confidence(self, conf):
+        rule = self.ruleset.rules["minor_surface_cracks_with_confidence"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.5:
-            self.declare_action("Low Priority: Routine Repairs Recommended.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(crack_width=MATCH.width, width_confidence=MATCH.conf))
     def severe_large_crack_rule(self, width, conf):
+        rule = self.ruleset.rules["severe_large_crack_rule"]
         conf = self.validate_confidence(conf)
-        if width >= 20.0 and conf >= 0.9:
-            self.declare_action("Critical: Immediate Repairs Required for Severe Large Cracks.", confidence=conf)
+        if width >= rule.thresholds["min_width_mm"] and conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(cracks_worsening=True, worsening_confidence=MATCH.conf))
     def worsening_cracks_priority_with_confidence(self, conf):
+        rule = self.ruleset.rules["worsening_cracks_priority_with_confidence"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.8:
-            self.declare_action("Moderate: Cracks worsening over time.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     ### Environmental Hazard Rules ###
 
@@ -339,132 +693,143 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def hazardous_zone_with_uncertainty(self, conf):
+        rule = self.ruleset.rules["hazardous_zone_with_uncertainty"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.6:
-            self.declare_action("Critical: Reconstruction Delayed due to hazardous zone.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
-    @Rule(BuildingAssessment(radiation_level=MATCH.radiation, radiation_confidence=MATCH.conf))
-    def radiation_rule_with_confidence(self, radiation, conf):
+    @Rule(DerivedFeatures(radiation_band=MATCH.band & ~L("none"), radiation_conf=MATCH.conf))
+    def radiation_rule_with_confidence(self, band, conf):
+        rule = self.ruleset.rules["radiation_rule_with_confidence"]
         conf = self.validate_confidence(conf)
-        if radiation > 20.0:  # High radiation
-            self.declare_action("Critical: Prohibit rebuilding due to high radiation.", confidence=conf)
-        elif 1.0 < radiation <= 20.0:  # Moderate radiation
-            self.declare_action("Moderate: Monitor and mitigate radiation risks.", confidence=conf)
-        elif 0 < radiation <= 1.0:  # Safe radiation
-            self.declare_action("Low Priority: Radiation levels are within safe limits.", confidence=conf)
+        self.declare_action(rule.actions[band], confidence=conf)  # 'high', 'moderate' or 'safe' radiation
 
     @Rule(BuildingAssessment(water_contamination=True))
     def individual_water_contamination_rule(self):
-        self.declare_action("Critical: Immediate Water Sanitation Required.")
+        rule = self.ruleset.rules["individual_water_contamination_rule"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(unexploded_ordnance=True, ordnance_confidence=MATCH.conf))
     def minefields_with_uncertainty(self, conf):
+        rule = self.ruleset.rules["minefields_with_uncertainty"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.75:
-            self.declare_action("Critical: Reconstruction Delayed due to minefields.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(contaminated_materials=True))
     def contaminated_materials_priority(self):
-        self.declare_action("Critical: Contaminated materials detected, remediation required.")
+        rule = self.ruleset.rules["contaminated_materials_priority"]
+        self.declare_action(rule.actions["action"])
 
-    @Rule(BuildingAssessment(flood_zone_proximity=MATCH.distance, flood_confidence=MATCH.conf))
-    def flood_zone_proximity_rule(self, distance, conf):
+    @Rule(DerivedFeatures(flood_band=MATCH.band & ~L("none"), flood_conf=MATCH.conf))
+    def flood_zone_proximity_rule(self, band, conf):
+        rule = self.ruleset.rules["flood_zone_proximity_rule"]
+        t = rule.thresholds
         conf = self.validate_confidence(conf)
-        if distance >= 500.0 and conf >= 0.7:
-            self.declare_action("Critical: Reconstruction Delayed due to High Flood Risk.", confidence=conf)
-        elif 100.0 <= distance < 500.0 and conf >= 0.5:
-            self.declare_action("Moderate: Flood Protection Measures Required.", confidence=conf)
-        elif distance > 0.0 and conf >= 0.4:
-            self.declare_action("Low Priority: Flood risk is minimal.", confidence=conf)
-
-    @Rule(BuildingAssessment(seismic_risk=MATCH.pga, seismic_confidence=MATCH.conf))
-    def seismic_activity_rule(self, pga, conf):
+        if band == "high" and conf >= t["high_confidence"]:
+            self.declare_action(rule.actions["high"], confidence=conf)
+        elif band == "moderate" and conf >= t["moderate_confidence"]:
+            self.declare_action(rule.actions["moderate"], confidence=conf)
+        elif conf >= t["low_confidence"]:  # Any positive distance falls back to low priority
+            self.declare_action(rule.actions["low"], confidence=conf)
+
+    @Rule(DerivedFeatures(seismic_band=MATCH.band & (L("high") | L("moderate")), seismic_conf=MATCH.conf))
+    def seismic_activity_rule(self, band, conf):
+        rule = self.ruleset.rules["seismic_activity_rule"]
         conf = self.validate_confidence(conf)
-        if pga > 0.4 and conf >= 0.7:
-            self.declare_action("Critical: Earthquake Reinforcement Required.", confidence=conf)
-        elif 0.2 < pga <= 0.4 and conf >= 0.5:
-            self.declare_action("Moderate: Incorporate Earthquake-Resistant Design.", confidence=conf)
+        if conf >= rule.thresholds[f"{band}_confidence"]:
+            self.declare_action(rule.actions[band], confidence=conf)
 
     @Rule(BuildingAssessment(in_flood_zone=True, flood_confidence=MATCH.conf))
     def flood_zone_rule(self, conf):
+        rule = self.ruleset.rules["flood_zone_rule"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.7:
-            self.declare_action("Critical: Flood protection measures required.", confidence=conf)
-        elif conf >= 0.5:
-            self.declare_action("Moderate: Monitor flood risks and prepare mitigation strategies.", confidence=conf)
-
-    @Rule(BuildingAssessment(slope_gradient=MATCH.slope))
-    def slope_gradient_rule(self, slope):
-        if slope > 30:
-            self.declare_action("Critical: Reconstruction Delayed due to landslide risk.")
-        elif 15 < slope <= 30:
-            self.declare_action("Moderate: Landslide risk present. Monitor closely.")
-        elif slope > 0:
-            self.declare_action("Low Priority: Minimal landslide risk.")
+        if conf >= rule.thresholds["high_confidence"]:
+            self.declare_action(rule.actions["high"], confidence=conf)
+        elif conf >= rule.thresholds["moderate_confidence"]:
+            self.declare_action(rule.actions["moderate"], confidence=conf)
+
+    @Rule(DerivedFeatures(slope_band=MATCH.band & ~L("none")))
+    def slope_gradient_rule(self, band):
+        rule = self.ruleset.rules["slope_gradient_rule"]
+        self.declare_action(rule.actions[band])  # 'high', 'moderate' or 'low' slope
 
     @Rule(BuildingAssessment(water_access_disrupted=True))
     def water_access_disruption_rule(self):
-        self.declare_action("Moderate: Restore water access as soon as possible.")
+        rule = self.ruleset.rules["water_access_disruption_rule"]
+        self.declare_action(rule.actions["action"])
 
     ### Data and Assessment Rules ###
 
     @Rule(BuildingAssessment(significant_difference=True))
     def significant_differences_priority(self):
-        self.declare_action("Moderate: Further Inspection Needed.")
+        rule = self.ruleset.rules["significant_differences_priority"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(conflicting_data=True))
     def conflicting_data_priority(self):
-        self.declare_action("High Priority: Requires Field Validation.")
+        rule = self.ruleset.rules["conflicting_data_priority"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(missing_records=True))
     def use_geospatial_data(self):
-        self.declare_action("Recommendation: Use geospatial data and neighboring properties for estimation.")
+        rule = self.ruleset.rules["use_geospatial_data"]
+        self.declare_action(rule.actions["action"])
     
     @Rule(BuildingAssessment(radar_stable=True))
     def stable_radar_rule(self):
-        self.declare_action("Low Priority: No immediate repairs required (Radar stable).")
+        rule = self.ruleset.rules["stable_radar_rule"]
+        self.declare_action(rule.actions["action"])
 
     ### Social Factors Rules ###
 
     @Rule(BuildingAssessment(overcrowding=True, overcrowding_confidence=MATCH.conf))
     def overcrowding_with_uncertainty(self, conf):
+        rule = self.ruleset.rules["overcrowding_with_uncertainty"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.7:
-            self.declare_action("High Priority: Reconstruction due to overcrowding.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(vulnerable_population=True, vulnerable_confidence=MATCH.conf))
     def vulnerable_population_with_uncertainty(self, conf):
+        rule = self.ruleset.rules["vulnerable_population_with_uncertainty"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.8:
-            self.declare_action("High Priority: Vulnerable population safety.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(population_displacement=True))
     def population_displacement_priority(self):
-        self.declare_action("High Priority: Use pallet or container homes.")
+        rule = self.ruleset.rules["population_displacement_priority"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(income_below_poverty=True, income_confidence=MATCH.conf))
     def income_priority(self, conf):
+        rule = self.ruleset.rules["income_priority"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.7:
-            self.declare_action("High Priority: Income below poverty threshold.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(multiple_families=True))
     def prioritize_multiple_families(self):
-        self.declare_action("High Priority: Building serves multiple families.")
+        rule = self.ruleset.rules["prioritize_multiple_families"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(at_least_one_livable=True))
     def deprioritize_livable_properties(self):
-        self.declare_action("Lower Priority: At least one livable property available.")
+        rule = self.ruleset.rules["deprioritize_livable_properties"]
+        self.declare_action(rule.actions["action"])
 
     ### Design and Sustainability Rules ###
 
     @Rule(BuildingAssessment(outdated_design=True))
     def recommend_retrofitting(self):
-        self.declare_action("Recommendation: Retrofit building to modern design standards.")
+        rule = self.ruleset.rules["recommend_retrofitting"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(renewable_energy_possible=True))
     def renewable_energy_integration(self):
-        self.declare_action("Recommendation: Integrate renewable energy systems.")
+        rule = self.ruleset.rules["renewable_energy_integration"]
+        self.declare_action(rule.actions["action"])
  
     ### Utility and Infrastructure Rules ###
 
@@ -475,41 +840,48 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def critical_infrastructure_priority(self, conf):
+        rule = self.ruleset.rules["critical_infrastructure_priority"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.8:  # High confidence threshold
-            self.declare_action("Critical: Near critical infrastructure (e.g., hospitals, schools).", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:  # High confidence threshold
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(damaged_utilities=True, utilities_confidence=MATCH.conf))
     def damaged_utilities_with_uncertainty(self, conf):
+        rule = self.ruleset.rules["damaged_utilities_with_uncertainty"]
         conf = self.validate_confidence(conf)
-        if conf >= 0.8:
-            self.declare_action("Moderate: Repairs suggested for damaged utilities.", confidence=conf)
+        if conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=conf)
 
     @Rule(BuildingAssessment(access_to_power=True))
     def lower_priority_energy(self):
-        self.declare_action("Low Priority: Energy resource allocation not required.")
+        rule = self.ruleset.rules["lower_priority_energy"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(road_inaccessibility=True))
     def road_inaccessibility_priority(self):
-        self.declare_action("High Priority: Clear road access before rebuilding.")
+        rule = self.ruleset.rules["road_inaccessibility_priority"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(urban_proximity=True))
     def urban_proximity_rule(self):
-        self.declare_action("Recommendation: Prioritize urban-center buildings for temporary housing.")
+        rule = self.ruleset.rules["urban_proximity_rule"]
+        self.declare_action(rule.actions["action"])
 
     @Rule(BuildingAssessment(temporary_shelter_needed=True))
     def temporary_shelter_rule(self):
-        self.declare_action("High Priority: Immediate temporary housing needed for displaced residents.")
+        rule = self.ruleset.rules["temporary_shelter_rule"]
+        self.declare_action(rule.actions["action"])
 
     @Rule((BuildingAssessment(power_outage_duration=MATCH.duration)))
     def temporary_power_rule(self, duration):
-        if duration > 6:  # High priority for outages exceeding 6 months
-            self.declare_action("High Priority: Deploy Temporary Power Sources for Critical Facilities.")
+        rule = self.ruleset.rules["temporary_power_rule"]
+        if duration > rule.thresholds["long_outage_months"]:  # High priority for long outages
+            self.declare_action(rule.actions["long"])
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
                     self.retract(fact)
-        elif 0 < duration <= 6:  # Moderate priority for shorter outages
-            self.declare_action("Moderate: Monitor Power Restoration Timelines.")
+        elif 0 < duration <= rule.thresholds["long_outage_months"]:  # Moderate priority for shorter outages
+            self.declare_action(rule.actions["short"])
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
                     self.retract(fact)
@@ -522,9 +894,10 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         BuildingAssessment(unexploded_ordnance=True, ordnance_confidence=MATCH.ordnance_conf)
         ))
     def radiation_and_minefields(self, radiation, radiation_conf, ordnance_conf):
+        rule = self.ruleset.rules["radiation_and_minefields"]
         combined_conf = min(radiation_conf, ordnance_conf)
-        if radiation > 1.0 and combined_conf >= 0.75:
-            self.declare_action("Critical: Prohibit rebuilding due to radiation and minefields.", confidence=combined_conf)
+        if radiation > rule.thresholds["min_radiation"] and combined_conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=combined_conf)
             # Suppress individual outputs
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
@@ -538,19 +911,21 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def landslide_risk_rule(self, conf, slope):
+        rule = self.ruleset.rules["landslide_risk_rule"]
+        t = rule.thresholds
         conf = self.validate_confidence(conf)
-        if slope > 30 and conf >= 0.6:
-            self.declare_action("Critical: Landslide Risk Near Critical Infrastructure in Hazardous zone.", confidence=conf)
+        if slope > t["high_slope"] and conf >= t["high_confidence"]:
+            self.declare_action(rule.actions["high"], confidence=conf)
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
                     self.retract(fact)
-        elif 20 < slope <= 30 and conf >= 0.5:
-                self.declare_action("Moderate: Monitor landslide risk near critical infrastructure.", confidence=conf)
+        elif t["moderate_slope"] < slope <= t["high_slope"] and conf >= t["moderate_confidence"]:
+                self.declare_action(rule.actions["moderate"], confidence=conf)
                 for fact in list(self.facts.values()):
                     if isinstance(fact, BuildingAssessment):
                         self.retract(fact)
         elif slope > 0:
-            self.declare_action("Low Priority: Landslide risk is minimal.", confidence=conf)
+            self.declare_action(rule.actions["low"], confidence=conf)
             for fact in list(self.facts.values()):
                     if isinstance(fact, BuildingAssessment):
                         self.retract(fact)
@@ -562,9 +937,10 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
             )
         )
     def hazardous_zone_and_overcrowding_rule(self, hazardous_conf, overcrowding_conf):
+        rule = self.ruleset.rules["hazardous_zone_and_overcrowding_rule"]
         combined_conf = min(hazardous_conf, overcrowding_conf)
-        if combined_conf >= 0.7:
-            self.declare_action("Critical: Combined impact of hazardous zone and overcrowding.", confidence=combined_conf)
+        if combined_conf >= rule.thresholds["min_confidence"]:
+            self.declare_action(rule.actions["action"], confidence=combined_conf)
             # Suppress individual outputs
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
@@ -578,11 +954,12 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def combined_radiation_and_cracks_rule(self, radiation, radiation_conf, crack_severity, crack_conf, hazardous_conf):
+        rule = self.ruleset.rules["combined_radiation_and_cracks_rule"]
         combined_conf = min(radiation_conf, crack_conf, hazardous_conf)
 
-        if radiation > 2.0 and combined_conf >= 0.7:
+        if radiation > rule.thresholds["min_radiation"] and combined_conf >= rule.thresholds["min_confidence"]:
             self.declare_action(
-                "Critical: Combined risk of high radiation and cracks in hazardous zone.",
+                rule.actions["action"],
                 confidence=combined_conf
             )
             for fact in list(self.facts.values()):
@@ -596,8 +973,10 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def flood_zone_and_water_contamination_rule(self, proximity):
-        if proximity >= 100:
-            self.declare_action("Critical: Combined Flood and Water Contamination Risk.")
+        rule = self.ruleset.rules["flood_zone_and_water_contamination_rule"]
+        if proximity < rule.thresholds["min_proximity"]:
+            return  # Not combined; the individual flood and water rules apply
+        self.declare_action(rule.actions["action"])
 
         # Suppress individual facts
         facts_to_retract = []
@@ -620,7 +999,8 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def urban_temporary_shelter(self):
-        self.declare_action("High Priority: Temporary housing near urban center for displaced residents.")
+        rule = self.ruleset.rules["urban_temporary_shelter"]
+        self.declare_action(rule.actions["action"])
         for fact in list(self.facts.values()):
             if isinstance(fact, BuildingAssessment):
                 self.retract(fact)
@@ -632,9 +1012,10 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def vulnerable_population_and_damaged_utilities_rule(self, vulnerable_conf, utilities_conf):
+        rule = self.ruleset.rules["vulnerable_population_and_damaged_utilities_rule"]
         combined_conf = min(vulnerable_conf, utilities_conf)  # Use the lower confidence level
-        if combined_conf >= 0.8:  # High confidence threshold
-            self.declare_action("High Priority: Restore Utilities for Vulnerable Population.", confidence=combined_conf)
+        if combined_conf >= rule.thresholds["min_confidence"]:  # High confidence threshold
+            self.declare_action(rule.actions["action"], confidence=combined_conf)
             # Suppress individual outputs
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
@@ -647,8 +1028,9 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
         )
     )
     def water_sanitation_rule(self, water_contamination=None, water_access_disrupted=None):
+        rule = self.ruleset.rules["water_sanitation_rule"]
         if water_contamination and water_access_disrupted:
-            self.declare_action("Critical: Immediate Water Sanitation Required.")
+            self.declare_action(rule.actions["action"])
             for fact in list(self.facts.values()):
                 if isinstance(fact, BuildingAssessment):
                     self.retract(fact)
@@ -657,37 +1039,14 @@ class BuildingAssessmentExpertSystem(KnowledgeEngine):
 
     @Rule(
         AND(
-            OR(
-                BuildingAssessment(crack_confidence=MATCH.crack_conf),
-                BuildingAssessment(load_confidence=MATCH.load_conf),
-                BuildingAssessment(width_confidence=MATCH.width_conf),
-                BuildingAssessment(worsening_confidence=MATCH.worsening_conf),
-                BuildingAssessment(ordnance_confidence=MATCH.ordnance_conf),
-                BuildingAssessment(flood_confidence=MATCH.flood_conf),
-                BuildingAssessment(seismic_confidence=MATCH.seismic_conf),
-                BuildingAssessment(vulnerable_confidence=MATCH.vulnerable_conf),
-                BuildingAssessment(income_confidence=MATCH.income_conf),
-                BuildingAssessment(utilities_confidence=MATCH.utilities_conf),
-                BuildingAssessment(hazardous_confidence=MATCH.hazardous_conf),
-                BuildingAssessment(radiation_confidence=MATCH.radiation_conf),
-                BuildingAssessment(infrastructure_confidence=MATCH.infrastructure_conf),
-                BuildingAssessment(overcrowding_confidence=MATCH.overcrowding_conf),
-            ),
+            DerivedFeatures(zero_confidence_count=P(lambda count: count > 0)),
             NOT(Fact(prioritized_action=W()))  # Ensure no actions exist yet
         )
     )
-    def zero_confidence_rule(self, crack_conf=None, load_conf=None, width_conf=None, worsening_conf=None, ordnance_conf=None,
-                            flood_conf=None, seismic_conf=None, vulnerable_conf=None, income_conf=None, utilities_conf=None,
-                            hazardous_conf=None, radiation_conf=None, infrastructure_conf=None, overcrowding_conf=None):
-        # Check if all provided confidence values are zero
-        confidence_values = [
-            crack_conf, load_conf, width_conf, worsening_conf, ordnance_conf,
-            flood_conf, seismic_conf, vulnerable_conf, income_conf, utilities_conf,
-            hazardous_conf, radiation_conf, infrastructure_conf, overcrowding_conf
-        ]
-        
-        if all(conf == 0.0 for conf in confidence_values if conf is not None):
-            self.declare_action(
-                "Recommendation: Further inspection required due to zero confidence.",
-                confidence=0.5
-            )
+    def zero_confidence_rule(self):
+        rule = self.ruleset.rules["zero_confidence_rule"]
+        # At least one confidence value of the assessment is zero
+        self.declare_action(
+            rule.actions["action"],
+            confidence=rule.thresholds["fallback_confidence"]
+        )
@@ -1,5 +1,40 @@
+import io
+import os
+
+import pydeck as pdk
 import streamlit as st
-from building_assessment_ES import BuildingAssessment, BuildingAssessmentExpertSystem
+from building_assessment_ES import BuildingAssessment
+from building_assessment_csv import CsvBatchJob, csv_template
+from building_assessment_rules import action_category
+from building_assessment_service import ConcurrentAssessor
+from building_assessment_store import AssessmentStore
+from building_assessment_tiles import CATEGORIES, CATEGORY_COLORS, METERS_PER_DEGREE, TileStore
+from building_assessment_warm import warm_start
+
+
+@st.cache_resource
+def get_assessor():
+    """Shared across sessions; each server thread keeps its own warm engine."""
+    warm_start()  # Loads the engine snapshot, so the first server threads skip rebuilding the fuzzy surface
+    return ConcurrentAssessor()
+
+
+@st.cache_resource(max_entries=4)
+def get_job_tiles(started_at, _job):
+    """Tile pyramid of a finished batch upload, keyed by its start time."""
+    return TileStore.from_records(
+        (*_job.locations[building_id], [action_category(entry.action) for entry in actions])
+        for building_id, actions in _job.results if building_id in _job.locations
+    )
+
+
+@st.cache_resource(max_entries=4)
+def get_store_tiles(path, modified):
+    """Tile pyramid of a result store, rebuilt when the database changes."""
+    with AssessmentStore(path) as store:
+        return TileStore.from_records((latitude, longitude, categories)
+                                      for _, latitude, longitude, categories in store.iter_locations())
+
 
 # Header Section
 st.markdown(
@@ -36,376 +71,374 @@ st.markdown(
 
 st.divider()
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Structural", "Environmental", "Social & Infrastructure", "Design & Sustainability", "Data & Utility"])
-with tab1:
-    # Section: Structural Damage Assessment
-    st.header("Structural Damage Assessment")
-    st.caption("Evaluate structural factors such as cracks, load-bearing issues, and worsening conditions.")
+single_tab, batch_tab, map_tab = st.tabs(["Single Building", "Batch Upload", "Map"])
+
+with single_tab:
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Structural", "Environmental", "Social & Infrastructure", "Design & Sustainability", "Data & Utility"])
+    with tab1:
+        # Section: Structural Damage Assessment
+        st.header("Structural Damage Assessment")
+        st.caption("Evaluate structural factors such as cracks, load-bearing issues, and worsening conditions.")
     
-    # Severe SAR backscatter
-    sar_backscatter = st.checkbox(
-        "Severe SAR backscatter detected?",
-        help="Indicates significant structural deformation based on SAR analysis."
-    )
+        # Severe SAR backscatter
+        sar_backscatter = st.checkbox(
+            "Severe SAR backscatter detected?",
+            help="Indicates significant structural deformation based on SAR analysis."
+        )
+
+        # Cracks in the building
+        has_cracks = st.checkbox("Does the building have cracks?")
+        cracks = "none"  # Default value
+        crack_confidence = 1.0  # Default confidence value
 
-    # Cracks in the building
-    has_cracks = st.checkbox("Does the building have cracks?")
-    cracks = "none"  # Default value
-    crack_confidence = 1.0  # Default confidence value
+        if has_cracks:
+            cracks = st.selectbox(
+                "Type of cracks:",
+                ["minor", "moderate", "severe"],
+                help="Classify the cracks based on their severity."
+            )
+            crack_confidence = st.number_input(
+                "Confidence in crack assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the crack assessment."
+            )
 
-    if has_cracks:
-        cracks = st.selectbox(
-            "Type of cracks:",
-            ["minor", "moderate", "severe"],
-            help="Classify the cracks based on their severity."
+            # Load-bearing cracks
+            load_bearing_cracks = st.checkbox(
+                "Cracks in load-bearing walls?",
+                help="Select if the cracks affect load-bearing walls."
+            )
+            load_confidence = 1.0
+            if load_bearing_cracks:
+                load_confidence = st.number_input(
+                    "Confidence in load-bearing cracks assessment (0.0 - 1.0):",
+                    min_value=0.0, max_value=1.0, value=1.0,
+                    help="Enter your confidence in load-bearing cracks assessment."
+                )
+
+            # Crack width
+            crack_width = st.number_input(
+                "Width of cracks (mm):",
+                min_value=0.0, value=0.0,
+                help="Specify the measured width of the cracks in millimeters."
+            )
+            width_confidence = 1.0
+            if crack_width > 0.0:
+                width_confidence = st.number_input(
+                    "Confidence in crack width measurement (0.0 - 1.0):",
+                    min_value=0.0, max_value=1.0, value=1.0,
+                    help="Enter your confidence in the crack width measurement."
+                )
+
+            # Worsening cracks
+            cracks_worsening = st.checkbox(
+                "Are the cracks worsening over time?",
+                help="Select if minor cracks are worsening over time."
+            )
+            worsening_confidence = 1.0
+            if cracks_worsening:
+                worsening_confidence = st.number_input(
+                    "Confidence in worsening cracks assessment (0.0 - 1.0):",
+                    min_value=0.0, max_value=1.0, value=1.0,
+                    help="Enter your confidence in the worsening cracks assessment."
+                )
+        else:
+            # Default values if no cracks are selected
+            load_bearing_cracks = False
+            load_confidence = 1.0
+            crack_width = 0.0
+            width_confidence = 1.0
+            cracks_worsening = False
+            worsening_confidence = 1.0
+
+    with tab2:
+        # Section: Environmental Hazard Assessment
+        st.header("Environmental Hazard Assessment")
+        st.caption("Evaluate environmental risks such as hazardous zones, radiation, ordnance, and proximity to flood zones.")
+
+        # Hazardous Zone
+        hazardous_zone = st.checkbox(
+            "Is the building in a hazardous zone?",
+            help="Select this if the building is located in an area with environmental risks (e.g., flooding, radiation)."
         )
-        crack_confidence = st.number_input(
-            "Confidence in crack assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the crack assessment."
+        hazardous_confidence = 1.0  # Default confidence value
+        if hazardous_zone:
+            hazardous_confidence = st.number_input(
+                "Confidence in hazardous zone assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the hazardous zone assessment."
+            )
+
+        # Radiation Risk
+        radiation_detected = st.checkbox(
+            "Is there a radiation risk?",
+            help="Select this if radiation levels in the area are a concern."
         )
+        radiation_level = 0.0
+        radiation_confidence = 1.0
+        if radiation_detected:
+            radiation_level = st.number_input(
+                "Radiation Level (mSv/year):",
+                min_value=0.0, value=0.0,
+                help="Specify the measured radiation level in millisieverts per year."
+            )
+            radiation_confidence = st.number_input(
+                "Confidence in radiation assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the radiation level measurement."
+            )
 
-        # Load-bearing cracks
-        load_bearing_cracks = st.checkbox(
-            "Cracks in load-bearing walls?",
-            help="Select if the cracks affect load-bearing walls."
+        # Unexploded Ordnance
+        unexploded_ordnance = st.checkbox(
+            "Are there nearby minefields or unexploded ordnance?",
+            help="Select this if the area contains minefields or unexploded ordnance."
         )
-        load_confidence = 1.0
-        if load_bearing_cracks:
-            load_confidence = st.number_input(
-                "Confidence in load-bearing cracks assessment (0.0 - 1.0):",
+        ordnance_confidence = 1.0
+        if unexploded_ordnance:
+            ordnance_confidence = st.number_input(
+                "Confidence in ordnance detection (0.0 - 1.0):",
                 min_value=0.0, max_value=1.0, value=1.0,
-                help="Enter your confidence in load-bearing cracks assessment."
+                help="Enter your confidence in the ordnance detection."
             )
 
-        # Crack width
-        crack_width = st.number_input(
-            "Width of cracks (mm):",
-            min_value=0.0, value=0.0,
-            help="Specify the measured width of the cracks in millimeters."
+        # Contaminated Materials
+        contaminated_materials = st.checkbox(
+            "Are contaminated materials detected?",
+            help="Select this if the building materials are contaminated and unsafe."
         )
-        width_confidence = 1.0
-        if crack_width > 0.0:
-            width_confidence = st.number_input(
-                "Confidence in crack width measurement (0.0 - 1.0):",
+
+        # Flood Zone
+        in_flood_zone = st.checkbox(
+            "Is the building in a flood zone?",
+            help="Select this if the building is located in a flood-prone area."
+        )
+
+        flood_zone_proximity = 0.0  # Default proximity
+        flood_confidence = 1.0  # Default confidence
+
+        if in_flood_zone:
+            flood_zone_proximity = st.number_input(
+                "Distance to nearest flood zone (meters):",
+                min_value=0.0, value=0.0,
+                help="Specify the distance from the building to the nearest flood zone in meters."
+            )
+            flood_confidence = st.number_input(
+                "Confidence in flood zone assessment (0.0 - 1.0):",
                 min_value=0.0, max_value=1.0, value=1.0,
-                help="Enter your confidence in the crack width measurement."
+                help="Enter your confidence in the flood zone assessment."
+            )
+
+
+        # Slope Gradient
+        land_risk = st.checkbox(
+            "Is there a slope or land risk?",
+            help="Select this if the building is located near a sloped area."
+        )
+        slope_gradient = 0.0
+        if land_risk:
+            slope_gradient = st.number_input(
+                "Slope Gradient (degrees):",
+                min_value=0.0, max_value=90.0, value=0.0,
+                help="Specify the slope gradient near the building in degrees."
             )
 
-        # Worsening cracks
-        cracks_worsening = st.checkbox(
-            "Are the cracks worsening over time?",
-            help="Select if minor cracks are worsening over time."
+        # Seismic Risk
+        seismic_detected = st.checkbox(
+            "Is there a seismic risk?",
+            help="Select this if the area has a potential for earthquakes."
         )
-        worsening_confidence = 1.0
-        if cracks_worsening:
-            worsening_confidence = st.number_input(
-                "Confidence in worsening cracks assessment (0.0 - 1.0):",
+        seismic_risk = 0.0
+        seismic_confidence = 1.0
+        if seismic_detected:
+            seismic_risk = st.number_input(
+                "Seismic Risk (PGA in g):",
+                min_value=0.0, max_value=1.0, value=0.0,
+                help="Specify the Peak Ground Acceleration (PGA) representing seismic risk."
+            )
+            seismic_confidence = st.number_input(
+                "Confidence in seismic risk assessment (0.0 - 1.0):",
                 min_value=0.0, max_value=1.0, value=1.0,
-                help="Enter your confidence in the worsening cracks assessment."
+                help="Enter your confidence in the seismic risk assessment."
             )
-    else:
-        # Default values if no cracks are selected
-        load_bearing_cracks = False
-        load_confidence = 1.0
-        crack_width = 0.0
-        width_confidence = 1.0
-        cracks_worsening = False
-        worsening_confidence = 1.0
-
-with tab2:
-    # Section: Environmental Hazard Assessment
-    st.header("Environmental Hazard Assessment")
-    st.caption("Evaluate environmental risks such as hazardous zones, radiation, ordnance, and proximity to flood zones.")
-
-    # Hazardous Zone
-    hazardous_zone = st.checkbox(
-        "Is the building in a hazardous zone?",
-        help="Select this if the building is located in an area with environmental risks (e.g., flooding, radiation)."
-    )
-    hazardous_confidence = 1.0  # Default confidence value
-    if hazardous_zone:
-        hazardous_confidence = st.number_input(
-            "Confidence in hazardous zone assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the hazardous zone assessment."
-        )
-
-    # Radiation Risk
-    radiation_detected = st.checkbox(
-        "Is there a radiation risk?",
-        help="Select this if radiation levels in the area are a concern."
-    )
-    radiation_level = 0.0
-    radiation_confidence = 1.0
-    if radiation_detected:
-        radiation_level = st.number_input(
-            "Radiation Level (mSv/year):",
-            min_value=0.0, value=0.0,
-            help="Specify the measured radiation level in millisieverts per year."
-        )
-        radiation_confidence = st.number_input(
-            "Confidence in radiation assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the radiation level measurement."
-        )
-
-    # Unexploded Ordnance
-    unexploded_ordnance = st.checkbox(
-        "Are there nearby minefields or unexploded ordnance?",
-        help="Select this if the area contains minefields or unexploded ordnance."
-    )
-    ordnance_confidence = 1.0
-    if unexploded_ordnance:
-        ordnance_confidence = st.number_input(
-            "Confidence in ordnance detection (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the ordnance detection."
-        )
-
-    # Contaminated Materials
-    contaminated_materials = st.checkbox(
-        "Are contaminated materials detected?",
-        help="Select this if the building materials are contaminated and unsafe."
-    )
 
-    # Flood Zone
-    in_flood_zone = st.checkbox(
-        "Is the building in a flood zone?",
-        help="Select this if the building is located in a flood-prone area."
-    )
+    with tab3:
+        # Section: Social and Infrastructure Assessment
+        st.header("Social and Infrastructure Assessment")
+        st.caption("Assess social impact, overcrowding, and proximity to critical infrastructure.")
 
-    flood_zone_proximity = 0.0  # Default proximity
-    flood_confidence = 1.0  # Default confidence
+        # Overcrowding
+        overcrowding = st.checkbox(
+            "Is the building overcrowded?",
+            help="Select this if the building is overcrowded beyond its capacity."
+        )
+        overcrowding_confidence = 1.0
+        if overcrowding:
+            overcrowding_confidence = st.number_input(
+                "Confidence in overcrowding assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the overcrowding assessment."
+            )
 
-    if in_flood_zone:
-        flood_zone_proximity = st.number_input(
-            "Distance to nearest flood zone (meters):",
-            min_value=0.0, value=0.0,
-            help="Specify the distance from the building to the nearest flood zone in meters."
+        # Vulnerable Population
+        vulnerable_population = st.checkbox(
+            "Does the building house vulnerable groups?",
+            help="Select this if the building houses vulnerable populations (e.g., elderly, children)."
         )
-        flood_confidence = st.number_input(
-            "Confidence in flood zone assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the flood zone assessment."
+        vulnerable_confidence = 1.0
+        if vulnerable_population:
+            vulnerable_confidence = st.number_input(
+                "Confidence in vulnerable population assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the vulnerable population assessment."
+            )
+
+        # Critical Infrastructure
+        critical_infrastructure = st.checkbox(
+            "Is the building near critical infrastructure?",
+            help="Select this if the building is close to critical infrastructure like hospitals or schools."
         )
+        infrastructure_confidence = 1.0
+        if critical_infrastructure:
+            infrastructure_confidence = st.number_input(
+                "Confidence in critical infrastructure proximity (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in proximity to critical infrastructure."
+            )
 
+        # Population Displacement
+        population_displacement = st.checkbox(
+            "Does the population displacement exceed housing capacity?",
+            help="Select this if the displaced population exceeds available permanent housing."
+        )
 
-    # Slope Gradient
-    land_risk = st.checkbox(
-        "Is there a slope or land risk?",
-        help="Select this if the building is located near a sloped area."
-    )
-    slope_gradient = 0.0
-    if land_risk:
-        slope_gradient = st.number_input(
-            "Slope Gradient (degrees):",
-            min_value=0.0, max_value=90.0, value=0.0,
-            help="Specify the slope gradient near the building in degrees."
-        )
-
-    # Seismic Risk
-    seismic_detected = st.checkbox(
-        "Is there a seismic risk?",
-        help="Select this if the area has a potential for earthquakes."
-    )
-    seismic_risk = 0.0
-    seismic_confidence = 1.0
-    if seismic_detected:
-        seismic_risk = st.number_input(
-            "Seismic Risk (PGA in g):",
-            min_value=0.0, max_value=1.0, value=0.0,
-            help="Specify the Peak Ground Acceleration (PGA) representing seismic risk."
-        )
-        seismic_confidence = st.number_input(
-            "Confidence in seismic risk assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the seismic risk assessment."
-        )
-
-with tab3:
-    # Section: Social and Infrastructure Assessment
-    st.header("Social and Infrastructure Assessment")
-    st.caption("Assess social impact, overcrowding, and proximity to critical infrastructure.")
-
-    # Overcrowding
-    overcrowding = st.checkbox(
-        "Is the building overcrowded?",
-        help="Select this if the building is overcrowded beyond its capacity."
-    )
-    overcrowding_confidence = 1.0
-    if overcrowding:
-        overcrowding_confidence = st.number_input(
-            "Confidence in overcrowding assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the overcrowding assessment."
-        )
-
-    # Vulnerable Population
-    vulnerable_population = st.checkbox(
-        "Does the building house vulnerable groups?",
-        help="Select this if the building houses vulnerable populations (e.g., elderly, children)."
-    )
-    vulnerable_confidence = 1.0
-    if vulnerable_population:
-        vulnerable_confidence = st.number_input(
-            "Confidence in vulnerable population assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the vulnerable population assessment."
-        )
-
-    # Critical Infrastructure
-    critical_infrastructure = st.checkbox(
-        "Is the building near critical infrastructure?",
-        help="Select this if the building is close to critical infrastructure like hospitals or schools."
-    )
-    infrastructure_confidence = 1.0
-    if critical_infrastructure:
-        infrastructure_confidence = st.number_input(
-            "Confidence in critical infrastructure proximity (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in proximity to critical infrastructure."
-        )
-
-    # Population Displacement
-    population_displacement = st.checkbox(
-        "Does the population displacement exceed housing capacity?",
-        help="Select this if the displaced population exceeds available permanent housing."
-    )
+        # Multiple Families
+        multiple_families = st.checkbox(
+            "Does the building serve multiple families?",
+            help="Select this if the building serves as a residence for multiple families."
+        )
 
-    # Multiple Families
-    multiple_families = st.checkbox(
-        "Does the building serve multiple families?",
-        help="Select this if the building serves as a residence for multiple families."
-    )
+        # Income Below Poverty
+        income_below_poverty = st.checkbox(
+            "Is the income level below the poverty threshold?",
+            help="Select this if the income level of residents is below the poverty threshold."
+        )
+        income_confidence = 1.0
+        if income_below_poverty:
+            income_confidence = st.number_input(
+                "Confidence in income assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the income level assessment."
+        )
 
-    # Income Below Poverty
-    income_below_poverty = st.checkbox(
-        "Is the income level below the poverty threshold?",
-        help="Select this if the income level of residents is below the poverty threshold."
-    )
-    income_confidence = 1.0
-    if income_below_poverty:
-        income_confidence = st.number_input(
-            "Confidence in income assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the income level assessment."
-    )
 
+    with tab4:
+        # Section: Design and Sustainability Considerations
+        st.header("Design and Sustainability Considerations")
+        st.caption("Explore the feasibility of modern design standards, renewable energy integration, and temporary housing needs.")
 
-with tab4:
-    # Section: Design and Sustainability Considerations
-    st.header("Design and Sustainability Considerations")
-    st.caption("Explore the feasibility of modern design standards, renewable energy integration, and temporary housing needs.")
+        # Outdated Design
+        outdated_design = st.checkbox(
+            "Does the building design predate modern codes?",
+            help="Select this if the building was designed before modern construction standards."
+        )
 
-    # Outdated Design
-    outdated_design = st.checkbox(
-        "Does the building design predate modern codes?",
-        help="Select this if the building was designed before modern construction standards."
-    )
+        # Renewable Energy Feasibility
+        renewable_energy_possible = st.checkbox(
+            "Is renewable energy integration feasible?",
+            help="Select this if the building can integrate renewable energy systems."
+        )
 
-    # Renewable Energy Feasibility
-    renewable_energy_possible = st.checkbox(
-        "Is renewable energy integration feasible?",
-        help="Select this if the building can integrate renewable energy systems."
-    )
+        # Temporary Shelter Needed
+        temporary_shelter_needed = st.checkbox(
+            "Are displaced residents requiring temporary housing?",
+            help="Select this if the displaced residents require immediate temporary housing."
+        )
 
-    # Temporary Shelter Needed
-    temporary_shelter_needed = st.checkbox(
-        "Are displaced residents requiring temporary housing?",
-        help="Select this if the displaced residents require immediate temporary housing."
-    )
+        # At Least One Livable Property
+        at_least_one_livable = st.checkbox(
+            "Is at least one property livable?",
+            help="Select this if at least one of the owner's properties is livable."
+        )
 
-    # At Least One Livable Property
-    at_least_one_livable = st.checkbox(
-        "Is at least one property livable?",
-        help="Select this if at least one of the owner's properties is livable."
-    )
+    with tab5:
+        # Section: Data and Utility Analysis
+        st.header("Data and Utility Analysis")
+        st.caption("Analyze utility damage, accessibility, and data inconsistencies for informed decisions.")
 
-with tab5:
-    # Section: Data and Utility Analysis
-    st.header("Data and Utility Analysis")
-    st.caption("Analyze utility damage, accessibility, and data inconsistencies for informed decisions.")
+        # Significant Differences
+        significant_difference = st.checkbox(
+            "Significant differences in damage assessments?",
+            help="Select this if multiple damage assessments significantly differ."
+        )
 
-    # Significant Differences
-    significant_difference = st.checkbox(
-        "Significant differences in damage assessments?",
-        help="Select this if multiple damage assessments significantly differ."
-    )
+        # Conflicting Data
+        conflicting_data = st.checkbox(
+            "Are there conflicting SAR and optical data?",
+            help="Select this if remote sensing data (SAR vs. optical) shows conflicting results."
+        )
 
-    # Conflicting Data
-    conflicting_data = st.checkbox(
-        "Are there conflicting SAR and optical data?",
-        help="Select this if remote sensing data (SAR vs. optical) shows conflicting results."
-    )
+        # Missing Records
+        missing_records = st.checkbox(
+            "Are pre- and post-war property records missing?",
+            help="Select this if historical records are unavailable."
+        )
 
-    # Missing Records
-    missing_records = st.checkbox(
-        "Are pre- and post-war property records missing?",
-        help="Select this if historical records are unavailable."
-    )
+        # Damaged Utilities
+        damaged_utilities = st.checkbox(
+            "Are there damaged sewer or water pipes?",
+            help="Select this if the building's utilities (e.g., sewer, water pipes) are damaged."
+        )
+        utilities_confidence = 1.0
+        if damaged_utilities:
+            utilities_confidence = st.number_input(
+                "Confidence in damaged utilities assessment (0.0 - 1.0):",
+                min_value=0.0, max_value=1.0, value=1.0,
+                help="Enter your confidence in the damaged utilities assessment."
+            )
 
-    # Damaged Utilities
-    damaged_utilities = st.checkbox(
-        "Are there damaged sewer or water pipes?",
-        help="Select this if the building's utilities (e.g., sewer, water pipes) are damaged."
-    )
-    utilities_confidence = 1.0
-    if damaged_utilities:
-        utilities_confidence = st.number_input(
-            "Confidence in damaged utilities assessment (0.0 - 1.0):",
-            min_value=0.0, max_value=1.0, value=1.0,
-            help="Enter your confidence in the damaged utilities assessment."
-        )
-
-    # Access to Power
-    access_to_power = st.checkbox(
-        "Does the building have access to power?",
-        help="Select this if the building has reliable access to power."
-    )
+        # Access to Power
+        access_to_power = st.checkbox(
+            "Does the building have access to power?",
+            help="Select this if the building has reliable access to power."
+        )
 
-    # Road Inaccessibility
-    road_inaccessibility = st.checkbox(
-        "Are roads to the building inaccessible?",
-        help="Select this if road access to the building is blocked or damaged."
-    )
+        # Road Inaccessibility
+        road_inaccessibility = st.checkbox(
+            "Are roads to the building inaccessible?",
+            help="Select this if road access to the building is blocked or damaged."
+        )
 
-    # Power Outage Duration
-    has_power_outage = st.checkbox(
-        "Is there a power outage?",
-        help="Select this if the building has experienced a power outage."
-    )
-    power_outage_duration = 0  # Default value
-    if has_power_outage:
-        power_outage_duration = st.number_input(
-            "Duration of power outage (months):",
-            min_value=0, value=0,
-            help="Specify the duration of the power outage in months."
-        )
-
-    # Water Contamination
-    water_contamination = st.checkbox(
-        "Is water contamination detected?",
-        help="Select this if bacterial or chemical contamination in water is detected."
-    )
+        # Power Outage Duration
+        has_power_outage = st.checkbox(
+            "Is there a power outage?",
+            help="Select this if the building has experienced a power outage."
+        )
+        power_outage_duration = 0  # Default value
+        if has_power_outage:
+            power_outage_duration = st.number_input(
+                "Duration of power outage (months):",
+                min_value=0, value=0,
+                help="Specify the duration of the power outage in months."
+            )
 
-    # Water Access Disruption
-    water_access_disrupted = st.checkbox(
-        "Is water access temporarily disrupted?",
-        help="Select this if water access to the building is temporarily disrupted."
-    )
+        # Water Contamination
+        water_contamination = st.checkbox(
+            "Is water contamination detected?",
+            help="Select this if bacterial or chemical contamination in water is detected."
+        )
 
-st.divider()
+        # Water Access Disruption
+        water_access_disrupted = st.checkbox(
+            "Is water access temporarily disrupted?",
+            help="Select this if water access to the building is temporarily disrupted."
+        )
 
-# Run Expert System
-if st.button("Run Expert System"):
-    # Initialize the expert system
-    engine = BuildingAssessmentExpertSystem()
-    engine.reset()
+    st.divider()
 
-    # Declare facts for structural assessment
-    engine.declare(
-        BuildingAssessment(
+    # Run Expert System
+    if st.button("Run Expert System"):
+        # Collect the building facts
+        fact = BuildingAssessment(
             #Structural Inputs
             sar_backscatter=sar_backscatter,
             cracks=cracks,
@@ -462,20 +495,163 @@ if st.button("Run Expert System"):
             water_contamination=water_contamination,
             water_access_disrupted=water_access_disrupted
         )
+
+        # Run the expert system, stopping once the top 5 actions shown below are settled
+        result = get_assessor().assess(fact, top_n=5)
+
+        # Display results
+        st.subheader("Results")
+        if result.actions:
+            st.success("Analysis complete. Here are the recommended actions:")
+            for priority, action, rule in result.top(5):
+                st.write(f"**Priority {priority:.1f}:** {action}")
+        else:
+            st.warning("No critical actions were triggered. Consider revisiting the input values or further inspections.")
+
+with batch_tab:
+    st.header("Batch Upload")
+    st.caption(
+        "Assess many buildings at once from a CSV file with one row per building. Columns are named after "
+        "the assessment fields; empty cells and missing columns keep their defaults. Optional `latitude` and "
+        "`longitude` columns place the buildings on the Map tab."
     )
+    st.download_button(
+        "Download CSV template",
+        data=csv_template(),
+        file_name="building_assessment_template.csv",
+        mime="text/csv",
+    )
+
+    uploaded = st.file_uploader("Building assessments (CSV)", type="csv")
+    job = st.session_state.get("batch_job")
+
+    if uploaded is not None and st.button("Assess Buildings", disabled=job is not None and not job.done):
+        content = uploaded.getvalue()
+        rows = max(content.count(b"\n") - 1, 0)  # Header excluded; only used for the progress bar
+        # Processing runs on a background thread so the page stays responsive; it never calls st.*
+        job = CsvBatchJob(io.BytesIO(content), get_assessor(), total_rows=rows).start()
+        st.session_state["batch_job"] = job
+
+    def show_batch_job():
+        job = st.session_state.get("batch_job")
+        if job is None:
+            return
+        if not job.done:
+            st.progress(job.progress, text=f"Assessed {job.rows_read} of {job.total_rows} rows...")
+            if st.button("Cancel"):
+                job.cancel()
+            return
+        if st.session_state.get("batch_polling"):
+            st.session_state["batch_polling"] = False
+            st.rerun()  # Full rerun, so the finished page stops polling
+
+        elapsed = job.finished_at - job.started_at
+        st.success(f"Assessed {len(job.results)} buildings in {elapsed:.1f} s.")
+        if job.failure:
+            st.error(f"Processing stopped: {job.failure}")
+        if job.truncated:
+            st.warning(f"Only the first {job.max_rows} rows were assessed.")
+        if job.error_count:
+            st.warning(f"{job.error_count} rows could not be read and were skipped.")
+            with st.expander("Row errors"):
+                for row_number, building_id, message in job.errors:
+                    st.write(f"Row {row_number} ({building_id}): {message}")
+
+        # Column headers sort the table
+        st.dataframe(job.summary_rows(), use_container_width=True, hide_index=True)
+        st.download_button(
+            "Download results (CSV)",
+            data=job.to_csv(),
+            file_name="building_assessment_results.csv",
+            mime="text/csv",
+        )
 
-    # Run the engine
-    engine.run()
+    running = job is not None and not job.done
+    st.session_state["batch_polling"] = running
+    st.fragment(show_batch_job, run_every=1.0 if running else None)()
 
-    # Display results
-    st.subheader("Results")
-    if engine.prioritized_actions:
-        st.success("Analysis complete. Here are the recommended actions:")
-        engine.prioritized_actions.sort(reverse=True, key=lambda x: x[0])
-        for priority, action in engine.prioritized_actions[:5]:
-            st.write(f"**Priority {priority:.1f}:** {action}")
+with map_tab:
+    st.header("Map")
+    st.caption(
+        "Buildings colored by their most severe action category, aggregated into grid cells whose size follows "
+        "the zoom. Click a cell to zoom in on it; the map only loads the cells around the current view."
+    )
+    source = st.radio("Results", ["Latest batch upload", "Result store"], horizontal=True)
+    tiles = None
+    if source == "Latest batch upload":
+        job = st.session_state.get("batch_job")
+        if job is None or not job.done:
+            st.info("Assess a CSV in the Batch Upload tab first.")
+        elif not job.locations:
+            st.info("The uploaded CSV has no `latitude` and `longitude` columns to place buildings on the map.")
+        else:
+            tiles = get_job_tiles(job.started_at, job)
     else:
-        st.warning("No critical actions were triggered. Consider revisiting the input values or further inspections.")
+        path = st.text_input("Store file", "assessments.db")
+        if not os.path.exists(path):
+            st.info(f"No result store at '{path}'.")
+        else:
+            # WAL commits leave the main file untouched until checkpointed
+            modified = max(os.path.getmtime(name) for name in (path, path + "-wal") if os.path.exists(name))
+            tiles = get_store_tiles(path, modified)
+            if not len(tiles):
+                st.info("No stored building has a location yet; see `AssessmentStore.save_locations`.")
+
+    if tiles is not None and len(tiles):
+        home = tiles.home(height_pixels=550)
+        if st.session_state.get("map_home") != home:  # New results: start from the whole area
+            st.session_state["map_home"] = home
+            st.session_state["map_center"] = home[:2]
+            st.session_state["map_zoom"] = home[2]
+
+        def zoom_to_cell():
+            selected = st.session_state["map_chart"].selection.get("objects", {}).get("cells") or []
+            if selected:
+                (longitude, latitude), (half_lon, half_lat) = selected[0]["position"], st.session_state["map_half_cell"]
+                st.session_state["map_center"] = (latitude + half_lat, longitude + half_lon)
+                st.session_state["map_zoom"] = min(st.session_state["map_zoom"] + 2.0, 18.0)
+
+        def zoom_out():
+            st.session_state["map_zoom"] = max(st.session_state["map_zoom"] - 2.0, 1.0)
+
+        def reset_view():
+            st.session_state["map_center"] = home[:2]
+            st.session_state["map_zoom"] = home[2]
+
+        latitude, longitude = st.session_state["map_center"]
+        zoom = st.session_state["map_zoom"]
+        view = tiles.view(latitude, longitude, zoom, height_pixels=550)
+        size = view["cell_meters"]
+        st.session_state["map_half_cell"] = (size / 2 / tiles.meters_per_lon, size / 2 / METERS_PER_DEGREE)
+
+        layer = pdk.Layer(
+            "GridCellLayer",
+            data=view["cells"],
+            id="cells",
+            get_position="position",
+            get_fill_color="color",
+            cell_size=size,
+            extruded=False,
+            pickable=True,
+            opacity=0.8,
+        )
+        deck = pdk.Deck(
+            layers=[layer],
+            initial_view_state=pdk.ViewState(latitude=latitude, longitude=longitude, zoom=zoom),
+            tooltip={"text": "{buildings} buildings, {critical} with Critical actions\nMostly: {category}"},
+        )
+        st.pydeck_chart(deck, height=550, use_container_width=True, on_select=zoom_to_cell,
+                        selection_mode="single-object", key="map_chart")
+
+        col1, col2, col3 = st.columns([1, 1, 4])
+        col1.button("Zoom out", on_click=zoom_out, use_container_width=True)
+        col2.button("Whole area", on_click=reset_view, use_container_width=True)
+        col3.caption(f"{len(tiles)} buildings. Showing {len(view['cells'])} cells of {size:.0f} m "
+                     f"from {view['tiles']} cached tiles.")
+        st.markdown(" ".join(
+            f'<span style="color: rgb({", ".join(map(str, CATEGORY_COLORS[category]))})">&#9632;</span> {category}'
+            for category in CATEGORIES
+        ), unsafe_allow_html=True)
 
 # Footer Section
 st.markdown("---")
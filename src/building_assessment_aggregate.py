@@ -0,0 +1,184 @@
+import json
+
+from building_assessment_rules import action_category
+
+# Fixed priority histogram bins: [0, 5), [5, 10), ..., [95, 100]; higher priorities fall in the last bin
+BIN_WIDTH = 5
+BIN_COUNT = 20
+
+# Priority sums are kept as integer millionths, so merging is exact in any order
+PRIORITY_SCALE = 1000000
+
+
+class ActionAggregate:
+    """
+    Mergeable rollup of assessment results for one group of buildings.
+
+    Memory is bounded by the number of distinct actions and histogram bins, not by
+    the number of buildings. All counters are integers, so `merge` is exact,
+    associative and commutative: aggregates built per chunk or per worker combine to
+    the same result as a single pass over all buildings.
+
+    Attributes:
+        buildings (int): Number of buildings added.
+        critical_buildings (int): Buildings with at least one "Critical" action.
+        action_counts (dict): Number of buildings that received each action.
+        histogram (list): Action counts per priority bin of width `BIN_WIDTH`.
+        actions (int): Total number of actions.
+        priority_sum (int): Sum of confidence-scaled priorities, in units of 1 / `PRIORITY_SCALE`.
+    """
+
+    def __init__(self):
+        self.buildings = 0
+        self.critical_buildings = 0
+        self.action_counts = {}
+        self.histogram = [0] * BIN_COUNT
+        self.actions = 0
+        self.priority_sum = 0
+
+    def add(self, actions):
+        """
+        Adds one building's results.
+
+        Args:
+            actions (list): (priority, action) or (priority, action, rule_name) tuples.
+        """
+        self.buildings += 1
+        critical = False
+        for entry in actions:
+            priority, action = entry[0], entry[1]
+            self.action_counts[action] = self.action_counts.get(action, 0) + 1
+            self.histogram[min(max(int(priority // BIN_WIDTH), 0), BIN_COUNT - 1)] += 1
+            self.actions += 1
+            self.priority_sum += round(priority * PRIORITY_SCALE)
+            critical = critical or action_category(action) == "Critical"
+        if critical:
+            self.critical_buildings += 1
+
+    def merge(self, other):
+        """Adds another aggregate's counts into this one and returns self."""
+        self.buildings += other.buildings
+        self.critical_buildings += other.critical_buildings
+        for action, count in other.action_counts.items():
+            self.action_counts[action] = self.action_counts.get(action, 0) + count
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.actions += other.actions
+        self.priority_sum += other.priority_sum
+        return self
+
+    def __eq__(self, other):
+        return isinstance(other, ActionAggregate) and self.to_dict() == other.to_dict()
+
+    @property
+    def critical_share(self):
+        """Share of buildings with at least one "Critical" action."""
+        return self.critical_buildings / self.buildings if self.buildings else 0.0
+
+    @property
+    def mean_priority(self):
+        """Mean confidence-scaled priority over all actions."""
+        return self.priority_sum / PRIORITY_SCALE / self.actions if self.actions else 0.0
+
+    def top_actions(self, n=10):
+        """Returns the `n` most frequent actions as (action, count) tuples."""
+        return sorted(self.action_counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def to_dict(self):
+        """Returns a JSON-serializable representation."""
+        return {
+            "buildings": self.buildings,
+            "critical_buildings": self.critical_buildings,
+            "action_counts": dict(sorted(self.action_counts.items())),
+            "histogram": list(self.histogram),
+            "actions": self.actions,
+            "priority_sum": self.priority_sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds an aggregate from `to_dict` output."""
+        if len(data["histogram"]) != BIN_COUNT:
+            raise ValueError(f"Expected {BIN_COUNT} histogram bins, got {len(data['histogram'])}.")
+        aggregate = cls()
+        aggregate.buildings = data["buildings"]
+        aggregate.critical_buildings = data["critical_buildings"]
+        aggregate.action_counts = dict(data["action_counts"])
+        aggregate.histogram = list(data["histogram"])
+        aggregate.actions = data["actions"]
+        aggregate.priority_sum = data["priority_sum"]
+        return aggregate
+
+
+class GroupedAggregate:
+    """
+    `ActionAggregate` per group, e.g. per district or grid cell.
+
+    Groups are assigned by `key(building_id, fact)`; by default all buildings fall
+    in the single group "all". Grouped aggregates merge group by group and
+    round-trip through JSON, so partial rollups can be checkpointed and combined later.
+    """
+
+    def __init__(self, key=None):
+        """
+        Args:
+            key (callable, optional): Maps (building_id, fact) to a group name.
+        """
+        self.key = key
+        self.groups = {}
+
+    def add(self, building_id, fact, actions):
+        """
+        Adds one building's results to its group.
+
+        Args:
+            building_id (str): Identifier of the building.
+            fact (BuildingAssessment): The assessed input fact.
+            actions (list): (priority, action[, rule_name]) tuples.
+        """
+        group = "all" if self.key is None else str(self.key(building_id, fact))
+        aggregate = self.groups.get(group)
+        if aggregate is None:
+            aggregate = self.groups[group] = ActionAggregate()
+        aggregate.add(actions)
+
+    def merge(self, other):
+        """Merges another grouped aggregate into this one and returns self."""
+        for group, aggregate in other.groups.items():
+            self.groups.setdefault(group, ActionAggregate()).merge(aggregate)
+        return self
+
+    def __getitem__(self, group):
+        return self.groups[group]
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __eq__(self, other):
+        return isinstance(other, GroupedAggregate) and self.groups == other.groups
+
+    def total(self):
+        """Returns one aggregate over all groups."""
+        total = ActionAggregate()
+        for aggregate in self.groups.values():
+            total.merge(aggregate)
+        return total
+
+    def to_json(self):
+        """Serializes the groups (not the key function) to a JSON string."""
+        return json.dumps({group: aggregate.to_dict() for group, aggregate in sorted(self.groups.items())})
+
+    @classmethod
+    def from_json(cls, text, key=None):
+        """
+        Rebuilds a grouped aggregate from `to_json` output.
+
+        Args:
+            text (str): Serialized groups.
+            key (callable, optional): Group key to use for buildings added afterwards.
+        """
+        grouped = cls(key)
+        grouped.groups = {group: ActionAggregate.from_dict(data) for group, data in json.loads(text).items()}
+        return grouped
@@ -0,0 +1,322 @@
+import argparse
+from collections import namedtuple
+import json
+import time
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix
+
+from building_assessment_rules import get_active_rules
+
+# Resources each action consumes per building, as a starting point for a campaign's own cost table:
+# crew-days of repair work, container homes and temporary power units. Actions that word the same
+# intervention differently share an "intervention" key, so a building is funded for it only once.
+# Every action is one the rules in rule_definitions.json can declare (see `undeclared_actions`)
+DEFAULT_COSTS = {
+    "Critical: Immediate Repairs Required for Load-Bearing Cracks.":
+        {"intervention": "load_bearing_repairs", "crew_days": 12},
+    "Critical: Immediate Repairs Required for Severe Large Cracks.":
+        {"intervention": "severe_crack_repairs", "crew_days": 8},
+    "Critical: Immediate Repairs Required (SAR Detected).":
+        {"intervention": "immediate_repairs", "crew_days": 6},
+    "Critical: Immediate Repairs Required (Visual Assessment).":
+        {"intervention": "immediate_repairs", "crew_days": 6},
+    "Moderate: Repairs Suggested.":
+        {"intervention": "crack_repairs", "crew_days": 4},
+    "Critical: Earthquake Reinforcement Required.":
+        {"intervention": "earthquake_reinforcement", "crew_days": 15},
+    "Critical: Flood protection measures required.":
+        {"intervention": "flood_protection", "crew_days": 5},
+    "Moderate: Flood Protection Measures Required.":
+        {"intervention": "flood_protection", "crew_days": 5},
+    "Critical: Immediate Water Sanitation Required.":
+        {"intervention": "water_sanitation", "crew_days": 3},
+    "Critical: Combined Flood and Water Contamination Risk.":
+        {"intervention": "flood_protection_and_sanitation", "crew_days": 8},
+    "Moderate: Restore water access as soon as possible.":
+        {"intervention": "water_access", "crew_days": 2},
+    "Critical: Contaminated materials detected, remediation required.":
+        {"intervention": "remediation", "crew_days": 6},
+    "High Priority: Clear road access before rebuilding.":
+        {"intervention": "road_clearance", "crew_days": 2},
+    "High Priority: Use pallet or container homes.":
+        {"intervention": "temporary_housing", "container_homes": 1, "crew_days": 1},
+    "High Priority: Immediate temporary housing needed for displaced residents.":
+        {"intervention": "temporary_housing", "container_homes": 1, "crew_days": 1},
+    "High Priority: Temporary housing near urban center for displaced residents.":
+        {"intervention": "temporary_housing", "container_homes": 1, "crew_days": 1},
+    "High Priority: Deploy Temporary Power Sources for Critical Facilities.":
+        {"intervention": "temporary_power", "power_units": 1, "crew_days": 1},
+    "High Priority: Restore Utilities for Vulnerable Population.":
+        {"intervention": "utility_restoration", "crew_days": 4},
+    "Moderate: Repairs suggested for damaged utilities.":
+        {"intervention": "utility_repairs", "crew_days": 3},
+    "Low Priority: Routine Repairs Recommended.":
+        {"intervention": "routine_repairs", "crew_days": 2},
+    "Recommendation: Retrofit building to modern design standards.":
+        {"intervention": "retrofitting", "crew_days": 10},
+}
+
+
+# Cost table entry naming the intervention an action stands for; it is not a resource
+INTERVENTION_KEY = "intervention"
+
+# LP values at least this close to 1 count as fully funded when rounding the relaxation
+INTEGRAL_TOLERANCE = 1e-6
+
+METHODS = ["greedy", "lp", "best"]
+
+
+class Allocation(namedtuple("Allocation", ["funded", "value", "upper_bound", "used", "budgets", "method", "seconds"])):
+    """
+    Resources allocated to building actions.
+
+    Attributes:
+        funded (list): (building_id, action, priority) per funded action, highest priority first.
+        value (float): Total priority of the funded actions.
+        upper_bound (float or None): Total priority of the LP relaxation, which no allocation can exceed.
+        used (dict): Amount of each resource allocated.
+        budgets (dict): Amount of each resource available.
+        method (str): Heuristic that produced the allocation, "greedy" or "lp".
+        seconds (float): Time taken, including the bound.
+    """
+    __slots__ = ()
+
+    @property
+    def gap(self):
+        """Share of the upper bound the allocation may fall short of the optimum by, or None without a bound."""
+        if self.upper_bound is None:
+            return None
+        if self.upper_bound <= 0:
+            return 0.0
+        return max(self.upper_bound - self.value, 0.0) / self.upper_bound
+
+    def by_action(self):
+        """Returns the number of funded buildings per action, most funded first."""
+        counts = {}
+        for _, action, _ in self.funded:
+            counts[action] = counts.get(action, 0) + 1
+        return sorted(counts.items(), key=lambda item: -item[1])
+
+
+def load_costs(path):
+    """
+    Reads a cost table from JSON.
+
+    Args:
+        path (str): File mapping each action to {resource: units per building}, plus an
+            optional "intervention" key shared by actions that are the same intervention.
+
+    Returns:
+        dict: The cost table.
+
+    Raises:
+        ValueError: If a cost is negative or not a number, or an intervention key is not a string.
+    """
+    with open(path, encoding="utf-8") as f:
+        costs = json.load(f)
+    for action, resources in costs.items():
+        for resource, amount in resources.items():
+            if resource == INTERVENTION_KEY:
+                if not isinstance(amount, str) or not amount:
+                    raise ValueError(f"Intervention of '{action}' must be a non-empty string, got {amount!r}.")
+            elif isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount < 0:
+                raise ValueError(f"Cost of '{resource}' for '{action}' must be a non-negative number, got {amount!r}.")
+    return costs
+
+
+def undeclared_actions(costs, ruleset=None):
+    """
+    Lists the actions of a cost table that no rule can declare, so they would never be funded.
+
+    Args:
+        costs (dict): Cost table, as returned by `load_costs`.
+        ruleset (CompiledRuleSet, optional): Rule definitions to check against; the active ones if omitted.
+
+    Returns:
+        list: The undeclared actions, sorted.
+    """
+    ruleset = ruleset or get_active_rules()
+    return sorted(action for action in costs if action not in ruleset.action_rules)
+
+
+def _candidates(buildings, costs, resources):
+    """
+    Lists the fundable (building, action) pairs with their priorities and costs.
+
+    Actions of one building with the same "intervention" key in `costs` are one
+    intervention under different wordings (e.g. two temporary housing actions), so only
+    the highest priority one is kept. Actions without a key are interventions of their own.
+    """
+    building_ids = []
+    actions = []
+    values = []
+    rows = []
+    for record in buildings:
+        building_id, ranked = record[0], record[1]
+        seen = set()
+        for entry in sorted(ranked, key=lambda entry: -entry[0]):
+            priority, action = entry[0], entry[1]
+            cost = costs.get(action)
+            if cost is None or priority <= 0:
+                continue
+            intervention = cost.get(INTERVENTION_KEY, action)
+            if intervention in seen:
+                continue
+            seen.add(intervention)
+            building_ids.append(building_id)
+            actions.append(action)
+            values.append(priority)
+            rows.append(tuple(cost.get(resource, 0) for resource in resources))
+    cost_matrix = np.array(rows, dtype=float).reshape(len(rows), len(resources))
+    return building_ids, actions, np.array(values, dtype=float), cost_matrix
+
+
+def _fill(order, cost_matrix, remaining, selected):
+    """Funds the candidates in `order` that still fit, in that order."""
+    for index in order:
+        if selected[index]:
+            continue
+        row = cost_matrix[index]
+        if (row <= remaining).all():
+            remaining -= row
+            selected[index] = True
+    return selected
+
+
+def _greedy_order(values, cost_matrix, capacity):
+    """
+    Orders candidates by priority per unit of weighted cost.
+
+    A resource's weight is how far the demand of all candidates exceeds its budget,
+    per unit of budget, so resources with enough for every candidate cost nothing.
+    """
+    demand = cost_matrix.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(capacity > 0, np.maximum(demand / capacity - 1.0, 0.0) / capacity, np.inf)
+        load = (cost_matrix * np.where(cost_matrix > 0, weights, 0.0)).sum(axis=1)
+        efficiency = np.where(load > 0, values / load, np.inf)
+    return np.lexsort((-values, -efficiency))
+
+
+def _lp_relaxation(values, cost_matrix, capacity):
+    """Solves the allocation with fractional funding allowed; returns (bound, fractions) or (None, None)."""
+    if not len(values):
+        return 0.0, np.zeros(0)
+    result = linprog(-values, A_ub=csr_matrix(cost_matrix.T), b_ub=capacity, bounds=(0, 1), method="highs")
+    if result.status != 0:
+        return None, None
+    return -result.fun, result.x
+
+
+def allocate(buildings, budgets, costs=None, method="best"):
+    """
+    Allocates limited resources to the building actions that achieve the most priority.
+
+    Each candidate is one action of one building with an entry in `costs`; funding it
+    uses that many units of each resource. The goal is to fund the candidates with
+    the highest total confidence-scaled priority without exceeding any budget, a
+    multidimensional knapsack. Two heuristics are available:
+
+    - "greedy" funds candidates by priority per unit of cost, weighting each resource
+      by how oversubscribed it is, and skips any that no longer fit. It needs no
+      solver, but a resource used by cheap actions can run out before the actions
+      that also need a scarcer one, which can cost a tenth or more of the optimum.
+    - "lp" solves the linear relaxation with HiGHS, funds the candidates it funds in
+      full, and fills what is left greedily. A basic solution has at most one
+      fractional candidate per resource, so with a handful of resources this is
+      usually within a fraction of a percent of the optimum.
+
+    "best" runs both and keeps the better one. The relaxation's value is always
+    computed, as an upper bound on what any allocation can achieve, which gives the
+    reported optimality gap. Both finish in seconds for 100k buildings.
+
+    Args:
+        buildings (iterable): (building_id, actions) pairs, e.g. `AssessmentResult`s, with
+            actions as (priority, action[, rule_name]) tuples.
+        budgets (dict): Units available per resource, e.g. {"container_homes": 800}.
+        costs (dict, optional): Action -> {resource: units per building}, plus an optional
+            "intervention" key shared by wordings of the same intervention; defaults to
+            `DEFAULT_COSTS`. Resources missing from `budgets` are unlimited.
+        method (str): One of `METHODS`.
+
+    Returns:
+        Allocation: The funded actions, their total priority, the upper bound and the resources used.
+
+    Raises:
+        ValueError: If the method is unknown, a budget is negative or a resource is named "intervention".
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown allocation method '{method}', expected one of {METHODS}.")
+    if INTERVENTION_KEY in budgets:
+        raise ValueError(f"'{INTERVENTION_KEY}' names the intervention in cost tables and cannot be a resource.")
+    for resource, amount in budgets.items():
+        if amount < 0:
+            raise ValueError(f"Budget for '{resource}' must be non-negative, got {amount}.")
+    start = time.perf_counter()
+    costs = DEFAULT_COSTS if costs is None else costs
+    resources = sorted(budgets)
+    capacity = np.array([budgets[resource] for resource in resources], dtype=float)
+    building_ids, actions, values, cost_matrix = _candidates(buildings, costs, resources)
+
+    order = _greedy_order(values, cost_matrix, capacity)
+    upper_bound, fractions = _lp_relaxation(values, cost_matrix, capacity)
+    allocations = []
+    if method in ("greedy", "best") or fractions is None:
+        allocations.append(("greedy", _fill(order, cost_matrix, capacity.copy(), np.zeros(len(values), dtype=bool))))
+    if method in ("lp", "best") and fractions is not None:
+        selected = fractions >= 1 - INTEGRAL_TOLERANCE
+        remaining = capacity - cost_matrix[selected].sum(axis=0)
+        allocations.append(("lp", _fill(order, cost_matrix, np.maximum(remaining, 0.0), selected)))
+    chosen, selected = max(allocations, key=lambda allocation: values[allocation[1]].sum())
+
+    indices = np.flatnonzero(selected)
+    indices = indices[np.argsort(-values[indices], kind="stable")]
+    funded = [(building_ids[index], actions[index], float(values[index])) for index in indices]
+    used = dict(zip(resources, cost_matrix[selected].sum(axis=0).tolist()))
+    return Allocation(funded, float(values[selected].sum()), upper_bound, used, dict(budgets), chosen,
+                      time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Allocate resource budgets to the building actions with the most priority.")
+    parser.add_argument("--budget", action="append", default=[], metavar="RESOURCE=UNITS", required=True,
+                        help="Units available of a resource, e.g. container_homes=800; repeat per resource.")
+    parser.add_argument("--costs", default=None, help="JSON cost table; the built-in example costs if omitted.")
+    parser.add_argument("--store", default=None, help="Allocate over the buildings in this SQLite file; "
+                                                      "synthetic buildings if omitted.")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic buildings.")
+    parser.add_argument("--seed", type=int, default=0, help="Population seed.")
+    parser.add_argument("--method", choices=METHODS, default="best", help="Allocation heuristic.")
+    args = parser.parse_args()
+
+    budgets = {}
+    for entry in args.budget:
+        resource, _, units = entry.partition("=")
+        budgets[resource.strip()] = float(units)
+    costs = load_costs(args.costs) if args.costs else None
+    for action in undeclared_actions(costs or DEFAULT_COSTS):
+        print(f"Warning: no rule declares '{action}'; it is never funded.")
+
+    if args.store:
+        from building_assessment_store import AssessmentStore
+        with AssessmentStore(args.store) as store:
+            buildings = [(building_id, actions) for building_id, _, actions in store.iter_assessments()]
+    else:
+        from building_assessment_service import ConcurrentAssessor
+        from building_assessment_synthetic import generate_buildings
+        with ConcurrentAssessor() as assessor:
+            buildings = assessor.assess_many(generate_buildings(args.count, args.seed))
+
+    allocation = allocate(buildings, budgets, costs, args.method)
+    print(f"Buildings:     {len(buildings)}")
+    print(f"Funded:        {len(allocation.funded)} actions ({allocation.method})")
+    print(f"Priority:      {allocation.value:.0f}")
+    if allocation.upper_bound is not None:
+        print(f"Upper bound:   {allocation.upper_bound:.0f} (gap {allocation.gap * 100:.3f} %)")
+    print(f"Elapsed:       {allocation.seconds:.2f} s")
+    for resource in sorted(budgets):
+        print(f"  {resource:<16} {allocation.used[resource]:>10.0f} of {budgets[resource]:.0f}")
+    for action, count in allocation.by_action()[:10]:
+        print(f"  {count:>7}  {action}")
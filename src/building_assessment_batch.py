@@ -0,0 +1,167 @@
+import argparse
+from itertools import islice
+import resource
+import sys
+import time
+
+from building_assessment_metrics import REGISTRY, serve_metrics
+from building_assessment_service import ConcurrentAssessor
+from building_assessment_synthetic import generate_buildings
+
+BATCH_CHUNK_SECONDS = REGISTRY.histogram(
+    "building_assessment_batch_chunk_seconds", "Time to assess and record one batch chunk.")
+
+
+def record_results(chunk, results, store=None, portfolio=None, aggregates=None, top_n=None):
+    """
+    Feeds one chunk of results to the store, portfolio and rollups.
+
+    Args:
+        chunk (list): (building_id, BuildingAssessment) pairs.
+        results (list): `AssessmentResult` per pair, in the same order.
+        store (AssessmentStore, optional): Persist every assessment.
+        portfolio (PortfolioQueue, optional): Rank every assessed building.
+        aggregates (GroupedAggregate, optional): Roll every result up by group.
+        top_n (int, optional): Limit the results' actions were assessed with, recorded in the store.
+    """
+    if store is not None:
+        store.save_many(
+            (building_id, fact, result.actions, result.ruleset_hash, top_n)
+            for (building_id, fact), result in zip(chunk, results)
+        )
+    if portfolio is not None:
+        for result in results:
+            portfolio.update(result.building_id, result.actions)
+    if aggregates is not None:
+        for (building_id, fact), result in zip(chunk, results):
+            aggregates.add(building_id, fact, result.actions)
+
+
+def run_batch(records, assessor=None, store=None, portfolio=None, aggregates=None, top_n=None, chunk_size=1000):
+    """
+    Assesses a stream of buildings and feeds the results to the store, portfolio and rollups.
+
+    Records are consumed `chunk_size` at a time, so memory stays bounded however
+    long the input is.
+
+    Args:
+        records (iterable): (building_id, BuildingAssessment) pairs.
+        assessor (ConcurrentAssessor, optional): Assessor to use; a new one is created if omitted.
+        store (AssessmentStore, optional): Persist every assessment.
+        portfolio (PortfolioQueue, optional): Rank every assessed building.
+        aggregates (GroupedAggregate, optional): Roll every result up by group.
+        top_n (int, optional): Only the top `top_n` actions are needed per building.
+        chunk_size (int): Number of buildings assessed and written together.
+
+    Returns:
+        dict: Number of buildings and actions, elapsed seconds and buildings per second.
+    """
+    own_assessor = assessor is None
+    if own_assessor:
+        assessor = ConcurrentAssessor()
+
+    buildings = 0
+    actions = 0
+    start = time.perf_counter()
+    iterator = iter(records)
+    try:
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            chunk_start = time.perf_counter()
+            results = assessor.assess_many(chunk, top_n=top_n, chunk_size=chunk_size)
+            record_results(chunk, results, store, portfolio, aggregates, top_n)
+            buildings += len(chunk)
+            actions += sum(len(result.actions) for result in results)
+            BATCH_CHUNK_SECONDS.observe(time.perf_counter() - chunk_start)
+    finally:
+        if own_assessor:
+            assessor.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "buildings": buildings,
+        "actions": actions,
+        "seconds": elapsed,
+        "buildings_per_second": buildings / elapsed if elapsed else 0.0,
+    }
+
+
+def peak_memory_mb():
+    """Returns the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KB elsewhere
+
+
+def current_memory_mb():
+    """Returns the current resident set size of this process in MB, or the peak where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_memory_mb()
+
+
+def benchmark(count=100000, seed=0, max_workers=None, top_n=None, chunk_size=1000, store=None, sparse=False):
+    """
+    Load-tests the batch path on a synthetic population.
+
+    Args:
+        count (int): Number of synthetic buildings.
+        seed (int): Population seed.
+        max_workers (int, optional): Assessor thread pool size.
+        top_n (int, optional): Only the top `top_n` actions are needed per building.
+        chunk_size (int): Number of buildings assessed and written together.
+        store (AssessmentStore, optional): Include persistence in the measurement.
+        sparse (bool): Use sparse rule activation.
+
+    Returns:
+        dict: `run_batch` statistics plus the peak resident memory in MB and, with
+        `sparse`, the percentage of rule evaluations skipped.
+    """
+    with ConcurrentAssessor(max_workers=max_workers, sparse=sparse) as assessor:
+        assessor.engine()  # Build the rule surfaces outside the measurement
+        stats = run_batch(generate_buildings(count, seed), assessor=assessor, store=store,
+                          top_n=top_n, chunk_size=chunk_size)
+        if sparse:
+            stats["skipped_percent"] = assessor.sparse_report()["skipped_percent"]
+    stats["peak_memory_mb"] = peak_memory_mb()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batch assessment path on synthetic buildings.")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic buildings.")
+    parser.add_argument("--seed", type=int, default=0, help="Population seed.")
+    parser.add_argument("--workers", type=int, default=None, help="Assessor thread pool size.")
+    parser.add_argument("--top-n", type=int, default=None, help="Only compute the top N actions per building.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Buildings per chunk.")
+    parser.add_argument("--store", default=None, help="Also persist results to this SQLite file.")
+    parser.add_argument("--sparse", action="store_true", help="Only evaluate rules whose fields are set.")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve metrics on this local port while running.")
+    parser.add_argument("--metrics-file", default=None, help="Write the final metrics to this file.")
+    args = parser.parse_args()
+
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port)
+
+    store = None
+    if args.store:
+        from building_assessment_store import AssessmentStore
+        store = AssessmentStore(args.store)
+    try:
+        stats = benchmark(args.count, args.seed, args.workers, args.top_n, args.chunk_size, store, args.sparse)
+    finally:
+        if store is not None:
+            store.close()
+
+    print(f"Buildings:    {stats['buildings']}")
+    print(f"Actions:      {stats['actions']}")
+    print(f"Elapsed:      {stats['seconds']:.1f} s")
+    print(f"Throughput:   {stats['buildings_per_second']:.0f} buildings/s")
+    print(f"Peak memory:  {stats['peak_memory_mb']:.0f} MB")
+    if args.sparse:
+        print(f"Rules skipped: {stats['skipped_percent']:.1f} %")
+    if args.metrics_file:
+        REGISTRY.write_file(args.metrics_file)
@@ -0,0 +1,127 @@
+from collections import namedtuple
+from itertools import islice
+import time
+
+from building_assessment_ES import ENGINE_VERSION
+from building_assessment_rules import get_active_rules
+from building_assessment_service import ConcurrentAssessor
+from building_assessment_store import input_hash
+
+
+class ActionDiff(namedtuple("ActionDiff", ["building_id", "status", "gained", "lost", "old_top_priority", "new_top_priority"])):
+    """
+    Change in a re-assessed building's actions.
+
+    Attributes:
+        building_id (str): Identifier of the building.
+        status (str): "new" for buildings not assessed before, "changed" for changed inputs,
+            an assessment made with a different engine version or rule set, or one that
+            kept fewer actions than now needed.
+        gained (list): Actions the building now receives, highest priority first.
+        lost (list): Actions the building no longer receives.
+        old_top_priority (float or None): Previous highest priority, None for new buildings.
+        new_top_priority (float): Current highest priority, 0.0 if no action is triggered.
+    """
+    __slots__ = ()
+
+
+ReassessmentReport = namedtuple("ReassessmentReport", ["buildings", "unchanged", "reassessed", "diffs", "seconds"])
+
+
+def reassess(records, store, assessor=None, portfolio=None, top_n=None, chunk_size=1000):
+    """
+    Re-assesses a survey round, running the engine only for buildings whose inputs changed.
+
+    Each building's canonical inputs are hashed and compared with the hash stored for
+    its previous assessment. Buildings with the same hash, engine version and rule set
+    are skipped, unless their stored actions were limited to fewer than `top_n`; new and
+    changed buildings are assessed, saved and diffed against their previous actions.
+    The cost is therefore proportional to the number of changes plus one indexed hash
+    lookup per building.
+
+    Args:
+        records (iterable): (building_id, BuildingAssessment) pairs of the new round.
+        store (AssessmentStore): Store holding the previous round; updated in place.
+        assessor (ConcurrentAssessor, optional): Assessor to use; a new one is created if omitted.
+        portfolio (PortfolioQueue, optional): Updated with every re-assessed building.
+        top_n (int, optional): Only the top `top_n` actions are needed per building.
+        chunk_size (int): Number of buildings checked and written together.
+
+    Returns:
+        ReassessmentReport: Counts, one `ActionDiff` per new or changed building, and elapsed seconds.
+    """
+    own_assessor = assessor is None
+    if own_assessor:
+        assessor = ConcurrentAssessor()
+    ruleset_hash = (assessor.ruleset or get_active_rules()).content_hash
+
+    buildings = 0
+    unchanged = 0
+    diffs = []
+    start = time.perf_counter()
+    iterator = iter(records)
+    try:
+        while True:
+            chunk = [(str(building_id), fact) for building_id, fact in islice(iterator, chunk_size)]
+            if not chunk:
+                break
+            buildings += len(chunk)
+
+            stored = store.get_hashes(building_id for building_id, _ in chunk)
+            pending = []
+            for building_id, fact in chunk:
+                hashes = stored.get(building_id)
+                current = (input_hash(fact), ENGINE_VERSION, ruleset_hash)
+                if hashes is not None and hashes[:3] == current and covers(hashes[3], top_n):
+                    unchanged += 1
+                else:
+                    pending.append((building_id, fact))
+            if not pending:
+                continue
+
+            previous = {building_id: store.get_actions(building_id) for building_id, _ in pending if building_id in stored}
+            results = assessor.assess_many(pending, top_n=top_n, chunk_size=chunk_size)
+            store.save_many(
+                (building_id, fact, result.actions, result.ruleset_hash, top_n)
+                for (building_id, fact), result in zip(pending, results)
+            )
+            for result in results:
+                if portfolio is not None:
+                    portfolio.update(result.building_id, result.actions)
+                diffs.append(diff_actions(result.building_id, previous.get(result.building_id), result.actions))
+    finally:
+        if own_assessor:
+            assessor.close()
+
+    return ReassessmentReport(buildings, unchanged, len(diffs), diffs, time.perf_counter() - start)
+
+
+def covers(stored_top_n, top_n):
+    """Returns whether actions stored with a `stored_top_n` limit (None for all) include the top `top_n`."""
+    return stored_top_n is None or (top_n is not None and stored_top_n >= top_n)
+
+
+def diff_actions(building_id, old_actions, new_actions):
+    """
+    Compares a building's previous and current actions.
+
+    Args:
+        building_id (str): Identifier of the building.
+        old_actions (list or None): Previous (priority, action, rule) tuples, None if the building is new.
+        new_actions (list): Current (priority, action, rule) tuples.
+
+    Returns:
+        ActionDiff: Gained and lost actions and the top priority move.
+    """
+    new_by_action = {entry[1]: entry[0] for entry in new_actions}
+    new_top_priority = max(new_by_action.values(), default=0.0)
+    if old_actions is None:
+        gained = sorted(new_by_action, key=new_by_action.get, reverse=True)
+        return ActionDiff(building_id, "new", gained, [], None, new_top_priority)
+
+    old_by_action = {entry[1]: entry[0] for entry in old_actions}
+    gained = sorted((action for action in new_by_action if action not in old_by_action),
+                    key=new_by_action.get, reverse=True)
+    lost = sorted((action for action in old_by_action if action not in new_by_action),
+                  key=old_by_action.get, reverse=True)
+    return ActionDiff(building_id, "changed", gained, lost, max(old_by_action.values(), default=0.0), new_top_priority)
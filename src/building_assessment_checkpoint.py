@@ -0,0 +1,269 @@
+import argparse
+from itertools import islice
+import json
+import os
+import tempfile
+import time
+
+from building_assessment_aggregate import GroupedAggregate
+from building_assessment_batch import BATCH_CHUNK_SECONDS, record_results
+from building_assessment_metrics import REGISTRY
+from building_assessment_service import ConcurrentAssessor
+
+# Bump when the checkpoint layout changes so old checkpoints are rejected instead of misread
+CHECKPOINT_VERSION = 1
+
+# Seconds between checkpoints by default; a checkpoint costs a fraction of a second per 100k buildings
+DEFAULT_INTERVAL = 30.0
+
+CHECKPOINT_SECONDS = REGISTRY.histogram(
+    "building_assessment_checkpoint_seconds", "Time to write one batch checkpoint, including syncing the store.")
+
+
+class Checkpoint:
+    """
+    Progress of a batch run, kept in a JSON file.
+
+    Each save writes a complete state to a temporary file, syncs it and renames it
+    over the previous checkpoint, so a crash at any point leaves either the old or
+    the new checkpoint on disk, never a partial one.
+    """
+
+    def __init__(self, path, source=None):
+        """
+        Args:
+            path (str): Checkpoint file.
+            source (str, optional): Description of the input, e.g. a file name or a
+                population seed; resuming against a different source is refused.
+        """
+        self.path = path
+        self.source = source
+
+    def load(self):
+        """
+        Reads the last checkpoint.
+
+        Returns:
+            dict or None: The saved state, or None if there is no checkpoint yet.
+
+        Raises:
+            ValueError: If the checkpoint is unreadable, from another layout version or for another input.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as error:
+            raise ValueError(f"Checkpoint '{self.path}' cannot be read: {error}")
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint '{self.path}' has layout version {state.get('version')}, "
+                             f"expected {CHECKPOINT_VERSION}.")
+        if self.source is not None and state.get("source") not in (None, self.source):
+            raise ValueError(f"Checkpoint '{self.path}' was taken for input '{state['source']}', "
+                             f"not '{self.source}'.")
+        return state
+
+    def save(self, state):
+        """Atomically replaces the checkpoint with `state`, a dict of JSON-compatible values."""
+        state = dict(state, version=CHECKPOINT_VERSION, source=self.source, saved_at=time.time())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def clear(self):
+        """Deletes the checkpoint, so the next run starts from the first record."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_checkpointed(records, checkpoint, assessor=None, store=None, portfolio=None, aggregates=None, top_n=None,
+                     chunk_size=1000, interval=DEFAULT_INTERVAL, stop_after=None):
+    """
+    Runs a batch like `run_batch`, checkpointing progress so a crashed run can resume.
+
+    Every `interval` seconds, between chunks, the number of records consumed, the
+    portfolio, the rollups and the running counts are saved together in one atomic
+    checkpoint. The store is synced first, so the checkpoint never runs ahead of the
+    results it has persisted. Running again with the same checkpoint restores that
+    state and skips the records already accounted for.
+
+    Output is exactly-once: records assessed after the last checkpoint are assessed
+    again on resume, but the store and portfolio keep one entry per building and
+    replace it, while the rollups, which would count a building twice, are restored
+    to the checkpoint first. A finished run leaves a checkpoint marked complete, so
+    repeating it changes nothing; delete the checkpoint to start over.
+
+    Args:
+        records (iterable or callable): (building_id, BuildingAssessment) pairs in a fixed
+            order, or a function of the start offset returning the pairs from there on,
+            e.g. `lambda start: generate_buildings(count, seed, start)`, which avoids
+            re-reading the skipped prefix on resume.
+        checkpoint (Checkpoint or str): Checkpoint, or the path of its file.
+        assessor (ConcurrentAssessor, optional): Assessor to use; a new one is created if omitted.
+        store (AssessmentStore, optional): Persist every assessment.
+        portfolio (PortfolioQueue, optional): Rank every assessed building; must start empty.
+        aggregates (GroupedAggregate, optional): Roll every result up by group; must start empty.
+        top_n (int, optional): Only the top `top_n` actions are needed per building.
+        chunk_size (int): Number of buildings assessed and written together.
+        interval (float): Seconds between checkpoints; 0 checkpoints after every chunk.
+        stop_after (int, optional): Stop after this many records in total, as if preempted.
+
+    Returns:
+        dict: `run_batch` statistics for this run, plus the offset it resumed from, whether
+        the input is complete, the number of checkpoints and their share of the elapsed time.
+
+    Raises:
+        ValueError: If the checkpoint does not match the input, or the portfolio or
+            rollups are not empty when resuming.
+    """
+    if not isinstance(checkpoint, Checkpoint):
+        checkpoint = Checkpoint(checkpoint)
+    state = checkpoint.load()
+    offset = 0
+    totals = {"buildings": 0, "actions": 0}
+    if state is not None:
+        if (portfolio is not None and len(portfolio)) or (aggregates is not None and len(aggregates)):
+            raise ValueError("The portfolio and rollups must start empty when resuming from a checkpoint.")
+        offset = state["offset"]
+        totals = state["totals"]
+        if portfolio is not None and state.get("portfolio") is not None:
+            portfolio.restore(state["portfolio"])
+        if aggregates is not None and state.get("aggregates") is not None:
+            aggregates.merge(GroupedAggregate.from_json(state["aggregates"]))
+    resumed_from = offset
+    complete = state is not None and state.get("complete", False)
+
+    def save(complete=False):
+        with CHECKPOINT_SECONDS.time():
+            if store is not None:
+                store.sync()
+            checkpoint.save({
+                "offset": offset,
+                "complete": complete,
+                "totals": totals,
+                "portfolio": portfolio.to_dict() if portfolio is not None else None,
+                "aggregates": aggregates.to_json() if aggregates is not None else None,
+            })
+
+    buildings = 0
+    actions = 0
+    checkpoints = 0
+    checkpoint_seconds = 0.0
+    start = time.perf_counter()
+    if not complete:
+        own_assessor = assessor is None
+        if own_assessor:
+            assessor = ConcurrentAssessor()
+        iterator = iter(records(offset)) if callable(records) else islice(records, offset, None)
+        last_saved = time.perf_counter()
+        try:
+            while stop_after is None or offset < stop_after:
+                size = chunk_size if stop_after is None else min(chunk_size, stop_after - offset)
+                chunk = list(islice(iterator, size))
+                if not chunk:
+                    complete = True
+                    break
+                chunk_start = time.perf_counter()
+                results = assessor.assess_many(chunk, top_n=top_n, chunk_size=chunk_size)
+                record_results(chunk, results, store, portfolio, aggregates, top_n)
+                chunk_actions = sum(len(result.actions) for result in results)
+                offset += len(chunk)
+                buildings += len(chunk)
+                actions += chunk_actions
+                totals = {"buildings": totals["buildings"] + len(chunk), "actions": totals["actions"] + chunk_actions}
+                BATCH_CHUNK_SECONDS.observe(time.perf_counter() - chunk_start)
+
+                if time.perf_counter() - last_saved >= interval:
+                    save_start = time.perf_counter()
+                    save()
+                    checkpoints += 1
+                    last_saved = time.perf_counter()
+                    checkpoint_seconds += last_saved - save_start
+        finally:
+            if own_assessor:
+                assessor.close()
+        save_start = time.perf_counter()
+        save(complete)
+        checkpoints += 1
+        checkpoint_seconds += time.perf_counter() - save_start
+
+    elapsed = time.perf_counter() - start
+    return {
+        "buildings": buildings,
+        "actions": actions,
+        "seconds": elapsed,
+        "buildings_per_second": buildings / elapsed if elapsed else 0.0,
+        "resumed_from": resumed_from,
+        "offset": offset,
+        "complete": complete,
+        "total_buildings": totals["buildings"],
+        "total_actions": totals["actions"],
+        "checkpoints": checkpoints,
+        "checkpoint_seconds": checkpoint_seconds,
+        "checkpoint_share": checkpoint_seconds / elapsed if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a checkpointed batch that resumes where a previous run stopped.")
+    parser.add_argument("--checkpoint", required=True, help="Checkpoint file; resumed from if it exists.")
+    parser.add_argument("--csv", default=None, help="Buildings to assess, as in the UI's batch upload; "
+                                                    "synthetic buildings if omitted.")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic buildings.")
+    parser.add_argument("--seed", type=int, default=0, help="Population seed.")
+    parser.add_argument("--top-n", type=int, default=None, help="Only compute the top N actions per building.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Buildings per chunk.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between checkpoints.")
+    parser.add_argument("--store", default=None, help="Also persist results to this SQLite file.")
+    parser.add_argument("--stop-after", type=int, default=None, help="Stop after this many buildings, as if preempted.")
+    parser.add_argument("--restart", action="store_true", help="Delete the checkpoint and start from the first building.")
+    args = parser.parse_args()
+
+    from building_assessment_portfolio import PortfolioQueue
+    store = None
+    if args.store:
+        from building_assessment_store import AssessmentStore
+        store = AssessmentStore(args.store)
+    source = None
+    if args.csv:
+        from building_assessment_csv import iter_csv_records
+        source = open(args.csv, newline="", encoding="utf-8-sig")
+        records = ((building_id, fact) for _, building_id, fact, error in iter_csv_records(source) if error is None)
+        aggregates = GroupedAggregate()
+        checkpoint = Checkpoint(args.checkpoint, source=f"csv:{os.path.abspath(args.csv)}")
+    else:
+        from building_assessment_synthetic import district_of, generate_buildings
+
+        def records(start):
+            return generate_buildings(args.count - start, args.seed, start)
+        aggregates = GroupedAggregate(key=district_of)
+        checkpoint = Checkpoint(args.checkpoint, source=f"synthetic:count={args.count}:seed={args.seed}")
+    if args.restart:
+        checkpoint.clear()
+    portfolio = PortfolioQueue()
+    try:
+        stats = run_checkpointed(records, checkpoint, store=store, portfolio=portfolio, aggregates=aggregates,
+                                 top_n=args.top_n, chunk_size=args.chunk_size, interval=args.interval,
+                                 stop_after=args.stop_after)
+    finally:
+        if source is not None:
+            source.close()
+        if store is not None:
+            store.close()
+
+    print(f"Resumed from:  {stats['resumed_from']}")
+    print(f"Buildings:     {stats['buildings']} this run, {stats['total_buildings']} in total")
+    print(f"Throughput:    {stats['buildings_per_second']:.0f} buildings/s")
+    print(f"Checkpoints:   {stats['checkpoints']} ({stats['checkpoint_seconds']:.2f} s, "
+          f"{stats['checkpoint_share'] * 100:.2f} % of the run)")
+    print(f"Status:        {'complete' if stats['complete'] else 'incomplete; run again to resume'}")
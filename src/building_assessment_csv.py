@@ -0,0 +1,239 @@
+import csv
+import io
+from itertools import islice
+import threading
+import time
+
+from building_assessment_ES import BuildingAssessment
+from building_assessment_rules import action_category, get_active_rules
+
+# Column holding the building identifier; rows without one are numbered
+ID_COLUMN = "building_id"
+
+# Optional columns placing a building on the map, in WGS84 degrees
+LOCATION_COLUMNS = ["latitude", "longitude"]
+
+# Upper bound on rows per upload, so one job cannot exhaust a hosted instance
+MAX_ROWS = 20000
+
+# At most this many row errors are kept for display
+MAX_ERRORS = 100
+
+TRUE_VALUES = {"true", "yes", "y", "1"}
+FALSE_VALUES = {"false", "no", "n", "0", ""}
+
+
+def csv_columns():
+    """Returns the accepted CSV columns: the building ID and every BuildingAssessment field."""
+    return [ID_COLUMN] + list(BuildingAssessment.__fields__)
+
+
+def csv_template():
+    """Returns a CSV header with every accepted column and the location columns, for engineers to fill in."""
+    return ",".join(csv_columns() + LOCATION_COLUMNS) + "\n"
+
+
+def parse_location(row):
+    """
+    Reads a row's location columns.
+
+    Args:
+        row (dict): CSV row or JSON object by column name.
+
+    Returns:
+        tuple or None: (latitude, longitude), or None if either is missing, not a number or out of range.
+    """
+    try:
+        latitude, longitude = (float(str(row.get(name, "")).strip()) for name in LOCATION_COLUMNS)
+    except ValueError:
+        return None
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        return None
+    return latitude, longitude
+
+
+def parse_value(name, text):
+    """
+    Converts one CSV cell to the type of its BuildingAssessment field.
+
+    Args:
+        name (str): Field name.
+        text (str): Cell contents.
+
+    Returns:
+        The typed value.
+
+    Raises:
+        ValueError: If the cell cannot be converted.
+    """
+    text = text.strip()
+    default = BuildingAssessment.__fields__[name].default
+    if isinstance(default, bool):
+        lowered = text.lower()
+        if lowered in TRUE_VALUES:
+            return True
+        if lowered in FALSE_VALUES:
+            return False
+        raise ValueError(f"{name}: expected true/false, got '{text}'.")
+    if text == "":
+        return default
+    if isinstance(default, int):
+        return int(float(text))
+    if isinstance(default, float):
+        return float(text)
+    if name == "cracks":
+        text = text.lower()
+        if text not in get_active_rules().crack_severity:
+            raise ValueError(f"cracks: expected one of {sorted(get_active_rules().crack_severity)}, got '{text}'.")
+    return text
+
+
+def iter_csv_records(stream, locations=None):
+    """
+    Reads building assessments from a CSV file, one row at a time.
+
+    Cells left empty are not set on the fact, so the field keeps its default and counts
+    as not reported, e.g. by `SurveyFusion`. Unknown columns are ignored.
+
+    Args:
+        stream (file): Text or binary file with a header row.
+        locations (dict, optional): Filled with building_id -> (latitude, longitude) for
+            valid rows whose location columns are set.
+
+    Yields:
+        tuple: (row_number, building_id, fact, error); fact is None and error is a
+        message for rows that cannot be parsed.
+    """
+    if not isinstance(stream.read(0), str):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(stream)
+    accepted = set(csv_columns())
+    columns = [column for column in (reader.fieldnames or []) if column in accepted and column != ID_COLUMN]
+
+    for row_number, row in enumerate(reader, start=1):
+        building_id = (row.get(ID_COLUMN) or "").strip() or f"row-{row_number}"
+        try:
+            values = {name: parse_value(name, row[name]) for name in columns if (row.get(name) or "").strip()}
+        except ValueError as error:
+            yield row_number, building_id, None, str(error)
+            continue
+        if locations is not None:
+            location = parse_location(row)
+            if location is not None:
+                locations[building_id] = location
+        yield row_number, building_id, BuildingAssessment(**values), None
+
+
+class CsvBatchJob:
+    """
+    Assesses an uploaded CSV on a background thread.
+
+    Rows are read and assessed `chunk_size` at a time, and only the top `top_n`
+    actions of each building are kept, so memory is bounded by `max_rows` x `top_n`
+    whatever the upload. Progress, results and errors can be read from any thread
+    while the job runs, e.g. by a Streamlit fragment.
+    """
+
+    def __init__(self, stream, assessor, total_rows=None, chunk_size=200, top_n=5, max_rows=MAX_ROWS):
+        """
+        Args:
+            stream (file): CSV file with a header row.
+            assessor (ConcurrentAssessor): Shared assessor to run the buildings on.
+            total_rows (int, optional): Number of data rows, for the progress fraction.
+            chunk_size (int): Rows assessed together.
+            top_n (int): Actions kept per building.
+            max_rows (int): Rows beyond this are not assessed.
+        """
+        self.stream = stream
+        self.assessor = assessor
+        self.total_rows = min(total_rows, max_rows) if total_rows is not None else None
+        self.chunk_size = chunk_size
+        self.top_n = top_n
+        self.max_rows = max_rows
+
+        self.results = []  # (building_id, actions) per assessed building, in file order
+        self.locations = {}  # building_id -> (latitude, longitude) for rows with a location
+        self.errors = []  # (row_number, building_id, message), at most MAX_ERRORS
+        self.error_count = 0
+        self.rows_read = 0
+        self.truncated = False
+        self.failure = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="csv-batch", daemon=True)
+
+    def start(self):
+        """Starts processing in the background and returns self."""
+        self.started_at = time.time()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stops the job after the current chunk."""
+        self._cancelled.set()
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    @property
+    def progress(self):
+        """Fraction of rows processed, between 0.0 and 1.0."""
+        if self.done:
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows_read / self.total_rows, 1.0)
+
+    def _run(self):
+        try:
+            records = iter_csv_records(self.stream, self.locations)
+            while not self._cancelled.is_set():
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                valid = []
+                for row_number, building_id, fact, error in chunk:
+                    if row_number > self.max_rows:
+                        self.truncated = True
+                        break
+                    self.rows_read = row_number
+                    if error is None:
+                        valid.append((building_id, fact))
+                    else:
+                        self.error_count += 1
+                        if len(self.errors) < MAX_ERRORS:
+                            self.errors.append((row_number, building_id, error))
+                results = self.assessor.assess_many(valid, top_n=self.top_n, chunk_size=self.chunk_size)
+                self.results.extend((result.building_id, result.actions) for result in results)
+                if self.truncated:
+                    break
+        except Exception as error:  # Surface parse and engine failures to the UI instead of losing them
+            self.failure = f"{type(error).__name__}: {error}"
+        finally:
+            self.finished_at = time.time()
+
+    def summary_rows(self):
+        """Returns one row per building, for display: ID, top priority, Critical flag, top action and action count."""
+        return [
+            {
+                "Building": building_id,
+                "Top Priority": round(actions[0].priority, 1) if actions else 0.0,
+                "Critical": any(action_category(entry.action) == "Critical" for entry in actions),
+                "Top Action": actions[0].action if actions else "",
+                "Actions": len(actions),
+            }
+            for building_id, actions in self.results
+        ]
+
+    def to_csv(self):
+        """Returns the results as CSV, one line per (building, ranked action)."""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow([ID_COLUMN, "rank", "priority", "category", "action", "rule"])
+        for building_id, actions in self.results:
+            for rank, entry in enumerate(actions, start=1):
+                writer.writerow([building_id, rank, f"{entry.priority:.1f}", action_category(entry.action),
+                                 entry.action, entry.rule or ""])
+        return output.getvalue()
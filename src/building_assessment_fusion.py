@@ -0,0 +1,396 @@
+import json
+
+from building_assessment_ES import CONFIDENCE_FIELDS, BuildingAssessment
+from building_assessment_rules import get_active_rules
+
+# Confidence field weighting each surveyed field's vote; other fields are weighted by the survey weight alone
+FIELD_CONFIDENCE = {
+    "cracks": "crack_confidence",
+    "load_bearing_cracks": "load_confidence",
+    "crack_width": "width_confidence",
+    "cracks_worsening": "worsening_confidence",
+    "hazardous_zone": "hazardous_confidence",
+    "radiation_level": "radiation_confidence",
+    "unexploded_ordnance": "ordnance_confidence",
+    "in_flood_zone": "flood_confidence",
+    "flood_zone_proximity": "flood_confidence",
+    "seismic_risk": "seismic_confidence",
+    "overcrowding": "overcrowding_confidence",
+    "vulnerable_population": "vulnerable_confidence",
+    "income_below_poverty": "income_confidence",
+    "damaged_utilities": "utilities_confidence",
+    "critical_infrastructure": "infrastructure_confidence",
+}
+
+# Flags set by fusion from the spread between surveys; a survey that ticked them by hand keeps them set
+FUSION_FLAGS = ["significant_difference", "conflicting_data"]
+
+# Weighted standard deviation above which measurements count as significantly different
+DISPERSION_THRESHOLDS = {
+    "crack_width": 2.0,  # mm
+    "radiation_level": 1.0,  # the moderate radiation level
+    "seismic_risk": 0.1,  # g, half the moderate PGA band
+}
+
+# Severity points between the lightest and heaviest crack class reported, e.g. none (0) vs moderate (6)
+CRACK_SPREAD = 6
+
+# Minority share of the vote weight at which a yes/no field counts as conflicting
+CONFLICT_SHARE = 0.25
+
+# Vote weight floor, so reports with zero confidence still decide a field no one else reported with confidence
+MIN_CONFIDENCE = 1e-6
+
+
+def _schema():
+    """Splits the BuildingAssessment fields into boolean, numeric and confidence fields."""
+    booleans, numbers = [], []
+    for name, field in BuildingAssessment.__fields__.items():
+        if name in CONFIDENCE_FIELDS or name == "cracks" or name in FUSION_FLAGS:
+            continue
+        (booleans if isinstance(field.default, bool) else numbers).append(name)
+    return booleans, numbers
+
+
+BOOLEAN_FIELDS, NUMERIC_FIELDS = _schema()
+
+
+def crack_class_severity(crack_class, crack_severity):
+    """
+    Returns the numeric severity of a crack class.
+
+    Raises:
+        ValueError: If the class is not in `crack_severity`.
+    """
+    severity = crack_severity.get(crack_class)
+    if severity is None:
+        raise ValueError(f"cracks: expected one of {sorted(crack_severity)}, got '{crack_class}'.")
+    return severity
+
+
+class FusionState:
+    """
+    Mergeable summary of every survey of one building.
+
+    Yes/no fields keep the confidence-weighted votes for and against, `cracks` keeps
+    the weight per crack class, and numeric fields keep weighted running moments
+    (weight, mean, sum of squared deviations, min and max). A survey only votes on
+    the fields it reports, directly or through their confidence field; fields it
+    left out do not count as confident votes for the default. Memory is fixed per
+    building however many surveys are added, and `merge` gives the same state as
+    adding the surveys one by one, in any order, up to floating-point rounding.
+
+    Attributes:
+        surveys (int): Number of surveys added.
+        votes (dict): [weight for True, weight for False] per yes/no field.
+        cracks (dict): Vote weight per crack class.
+        moments (dict): [weight, mean, m2, min, max] per numeric field.
+        confidence_sums (dict): Sum of the reported values of each confidence field.
+        confidence_counts (dict): Number of surveys that reported each confidence field.
+        flags (dict): Whether any survey ticked each of `FUSION_FLAGS` by hand.
+    """
+
+    def __init__(self):
+        self.surveys = 0
+        self.votes = {name: [0.0, 0.0] for name in BOOLEAN_FIELDS}
+        self.cracks = {}
+        self.moments = {name: [0.0, 0.0, 0.0, None, None] for name in NUMERIC_FIELDS}
+        self.confidence_sums = {name: 0.0 for name in CONFIDENCE_FIELDS}
+        self.confidence_counts = {name: 0 for name in CONFIDENCE_FIELDS}
+        self.flags = {name: False for name in FUSION_FLAGS}
+
+    def add(self, fact, weight=1.0):
+        """
+        Adds one survey of the building.
+
+        Args:
+            fact (BuildingAssessment): The survey's assessment. A field votes if the survey sets
+                it or its confidence field, with the default standing in for whichever is absent.
+            weight (float): Trust in the surveying team, multiplied into every field's confidence.
+        """
+        fields = BuildingAssessment.__fields__
+        confidences = {}
+        for name in CONFIDENCE_FIELDS:
+            if name in fact:
+                confidence = min(max(float(fact[name]), 0.0), 1.0)
+                confidences[name] = confidence
+                self.confidence_sums[name] += confidence
+                self.confidence_counts[name] += 1
+
+        def reported(name):
+            return name in fact or FIELD_CONFIDENCE.get(name) in confidences
+
+        def field_weight(name):
+            return weight * max(confidences.get(FIELD_CONFIDENCE.get(name), 1.0), MIN_CONFIDENCE)
+
+        for name in BOOLEAN_FIELDS:
+            if reported(name):
+                self.votes[name][0 if fact.get(name, fields[name].default) else 1] += field_weight(name)
+
+        if reported("cracks"):
+            crack_class = fact.get("cracks", fields["cracks"].default)
+            self.cracks[crack_class] = self.cracks.get(crack_class, 0.0) + field_weight("cracks")
+
+        for name in NUMERIC_FIELDS:
+            if reported(name):
+                value = float(fact.get(name, fields[name].default))
+                self._merge_moments(name, [field_weight(name), value, 0.0, value, value])
+
+        for name in FUSION_FLAGS:
+            self.flags[name] = self.flags[name] or bool(fact.get(name, False))
+        self.surveys += 1
+
+    def _merge_moments(self, name, other):
+        # Chan et al. pairwise update of weighted mean and squared deviations
+        weight, mean, m2, low, high = self.moments[name]
+        other_weight, other_mean, other_m2, other_low, other_high = other
+        total = weight + other_weight
+        if weight == 0:
+            mean, m2 = other_mean, other_m2  # Exact for a single survey
+        elif other_weight > 0:
+            delta = other_mean - mean
+            mean += delta * other_weight / total
+            m2 += other_m2 + delta * delta * weight * other_weight / total
+        if other_low is not None:
+            low = other_low if low is None else min(low, other_low)
+            high = other_high if high is None else max(high, other_high)
+        self.moments[name] = [total, mean, m2, low, high]
+
+    def merge(self, other):
+        """Adds another state of the same building into this one and returns self."""
+        self.surveys += other.surveys
+        for name, (true_weight, false_weight) in other.votes.items():
+            self.votes[name][0] += true_weight
+            self.votes[name][1] += false_weight
+        for crack_class, weight in other.cracks.items():
+            self.cracks[crack_class] = self.cracks.get(crack_class, 0.0) + weight
+        for name, moments in other.moments.items():
+            self._merge_moments(name, moments)
+        for name, total in other.confidence_sums.items():
+            self.confidence_sums[name] += total
+        for name, count in other.confidence_counts.items():
+            self.confidence_counts[name] += count
+        for name, flag in other.flags.items():
+            self.flags[name] = self.flags[name] or flag
+        return self
+
+    ### Fused Values ###
+
+    def vote(self, name):
+        """Returns the weighted majority of a yes/no field; a tie keeps the flag set, so a reported hazard is not dropped."""
+        true_weight, false_weight = self.votes[name]
+        return true_weight > 0 and true_weight >= false_weight
+
+    def agreement(self, name):
+        """Returns the winning share of a yes/no field's vote weight, 1.0 if no survey weighed in."""
+        total = sum(self.votes[name])
+        return max(self.votes[name]) / total if total else 1.0
+
+    def crack_class(self, crack_severity):
+        """
+        Reconciles the reported crack classes as their weighted median severity.
+
+        Ties resolve towards the more severe class.
+
+        Raises:
+            ValueError: If a survey reported a crack class missing from `crack_severity`.
+        """
+        ranked = sorted(self.cracks, key=lambda crack_class: crack_class_severity(crack_class, crack_severity),
+                        reverse=True)
+        total = sum(self.cracks.values())
+        if not ranked or total <= 0:
+            return ranked[0] if ranked else "none"
+        cumulative = 0.0
+        for crack_class in ranked:
+            cumulative += self.cracks[crack_class]
+            if cumulative >= total / 2:
+                return crack_class
+        return ranked[-1]
+
+    def crack_spread(self, crack_severity):
+        """Returns the severity points between the lightest and heaviest crack class reported."""
+        severities = [crack_class_severity(crack_class, crack_severity) for crack_class in self.cracks]
+        return max(severities) - min(severities) if severities else 0
+
+    def mean(self, name):
+        """Returns the weighted mean of a numeric field, or its plain mean when no survey weighed in."""
+        weight, mean, _, low, high = self.moments[name]
+        if weight > 0:
+            return mean
+        return (low + high) / 2 if low is not None else BuildingAssessment.__fields__[name].default
+
+    def deviation(self, name):
+        """Returns the weighted standard deviation of a numeric field."""
+        weight, _, m2, _, _ = self.moments[name]
+        return (max(m2, 0.0) / weight) ** 0.5 if weight > 0 else 0.0
+
+    def significant_difference(self, crack_severity, thresholds=None):
+        """Whether measurements spread beyond their thresholds or crack classes are `CRACK_SPREAD` apart."""
+        thresholds = DISPERSION_THRESHOLDS if thresholds is None else thresholds
+        return (
+            self.flags["significant_difference"]
+            or self.crack_spread(crack_severity) >= CRACK_SPREAD
+            or any(self.deviation(name) > limit for name, limit in thresholds.items())
+        )
+
+    def conflicting_data(self, conflict_share=CONFLICT_SHARE):
+        """Whether any yes/no field's losing side holds at least `conflict_share` of its vote weight."""
+        return self.flags["conflicting_data"] or any(
+            1.0 - self.agreement(name) >= conflict_share for name in BOOLEAN_FIELDS
+        )
+
+    def fused(self, ruleset=None, thresholds=None, conflict_share=CONFLICT_SHARE):
+        """
+        Combines the surveys into one assessment for the engine.
+
+        Each confidence field becomes the mean confidence of the surveys reporting it,
+        scaled by the agreement of the least agreed yes/no field it weighs, so split
+        votes lower the confidence the rules see. Fields that end up at their
+        defaults, including fields no survey reported, are left out.
+
+        Args:
+            ruleset (CompiledRuleSet, optional): Source of the crack severities; defaults to the active rules.
+            thresholds (dict, optional): Standard deviation limit per numeric field; defaults to `DISPERSION_THRESHOLDS`.
+            conflict_share (float): Minority vote share that sets `conflicting_data`.
+
+        Returns:
+            BuildingAssessment: The fused assessment.
+        """
+        crack_severity = (ruleset or get_active_rules()).crack_severity
+        fields = BuildingAssessment.__fields__
+        values = {name: self.vote(name) for name in BOOLEAN_FIELDS}
+        values["cracks"] = self.crack_class(crack_severity)
+        for name in NUMERIC_FIELDS:
+            mean = self.mean(name)
+            values[name] = round(mean) if isinstance(fields[name].default, int) else mean
+
+        agreements = {}
+        for name, confidence_field in FIELD_CONFIDENCE.items():
+            if name in self.votes:
+                agreements[confidence_field] = min(agreements.get(confidence_field, 1.0), self.agreement(name))
+        for name in CONFIDENCE_FIELDS:
+            count = self.confidence_counts[name]
+            mean = self.confidence_sums[name] / count if count else fields[name].default
+            values[name] = mean * agreements.get(name, 1.0)
+
+        values = {name: value for name, value in values.items() if value != fields[name].default}
+        if self.significant_difference(crack_severity, thresholds):
+            values["significant_difference"] = True
+        if self.conflicting_data(conflict_share):
+            values["conflicting_data"] = True
+        return BuildingAssessment(**values)
+
+    def to_dict(self):
+        """Returns a JSON-serializable representation."""
+        return {
+            "surveys": self.surveys,
+            "votes": {name: list(votes) for name, votes in self.votes.items()},
+            "cracks": dict(sorted(self.cracks.items())),
+            "moments": {name: list(moments) for name, moments in self.moments.items()},
+            "confidence_sums": dict(self.confidence_sums),
+            "confidence_counts": dict(self.confidence_counts),
+            "flags": dict(self.flags),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a state from `to_dict` output."""
+        state = cls()
+        state.surveys = data["surveys"]
+        state.votes.update({name: list(votes) for name, votes in data["votes"].items()})
+        state.cracks = dict(data["cracks"])
+        state.moments.update({name: list(moments) for name, moments in data["moments"].items()})
+        state.confidence_sums.update(data["confidence_sums"])
+        state.confidence_counts.update(data["confidence_counts"])
+        state.flags.update(data["flags"])
+        return state
+
+
+class SurveyFusion:
+    """
+    Groups surveys by building in a single pass and fuses them before assessment.
+
+    Surveys may arrive in any order, interleaved across buildings. Only one
+    `FusionState` is kept per building, so memory grows with the number of buildings,
+    not surveys. Fusions built over separate files or by separate teams merge and
+    round-trip through JSON.
+
+    Example:
+        fusion = SurveyFusion()
+        for building_id, fact in surveys:
+            fusion.add(building_id, fact)
+        results = assessor.assess_many(fusion.records(), top_n=5)
+    """
+
+    def __init__(self, ruleset=None, thresholds=None, conflict_share=CONFLICT_SHARE):
+        """
+        Args:
+            ruleset (CompiledRuleSet, optional): Source of the crack severities; defaults to the active rules.
+            thresholds (dict, optional): Standard deviation limit per numeric field; defaults to `DISPERSION_THRESHOLDS`.
+            conflict_share (float): Minority vote share that sets `conflicting_data`.
+        """
+        self.ruleset = ruleset
+        self.thresholds = thresholds
+        self.conflict_share = conflict_share
+        self.states = {}
+
+    def add(self, building_id, fact, weight=1.0):
+        """
+        Adds one survey.
+
+        Args:
+            building_id (str): Identifier of the surveyed building.
+            fact (BuildingAssessment): The survey's assessment.
+            weight (float): Trust in the surveying team.
+
+        Raises:
+            ValueError: If the crack class is not one of the rule set's.
+        """
+        if "cracks" in fact:
+            crack_class_severity(fact["cracks"], (self.ruleset or get_active_rules()).crack_severity)
+        state = self.states.get(building_id)
+        if state is None:
+            state = self.states[building_id] = FusionState()
+        state.add(fact, weight)
+
+    def add_many(self, records):
+        """Adds (building_id, fact) or (building_id, fact, weight) records and returns self."""
+        for record in records:
+            self.add(*record)
+        return self
+
+    def merge(self, other):
+        """Merges another fusion into this one, building by building, and returns self."""
+        for building_id, state in other.states.items():
+            self.states.setdefault(building_id, FusionState()).merge(state)
+        return self
+
+    def __getitem__(self, building_id):
+        return self.states[building_id]
+
+    def __iter__(self):
+        return iter(self.states)
+
+    def __len__(self):
+        return len(self.states)
+
+    def fused(self, building_id):
+        """Returns the fused `BuildingAssessment` of one building."""
+        return self.states[building_id].fused(self.ruleset, self.thresholds, self.conflict_share)
+
+    def records(self):
+        """Yields (building_id, fused fact) pairs in first-seen order, ready for `assess_many` or `run_batch`."""
+        ruleset = self.ruleset or get_active_rules()
+        for building_id, state in self.states.items():
+            yield building_id, state.fused(ruleset, self.thresholds, self.conflict_share)
+
+    def to_json(self):
+        """Serializes the per-building states (not the thresholds) to a JSON string."""
+        return json.dumps({str(building_id): state.to_dict() for building_id, state in self.states.items()})
+
+    @classmethod
+    def from_json(cls, text, **kwargs):
+        """Rebuilds a fusion from `to_json` output; keyword arguments are passed to the constructor."""
+        fusion = cls(**kwargs)
+        fusion.states = {building_id: FusionState.from_dict(data) for building_id, data in json.loads(text).items()}
+        return fusion
@@ -0,0 +1,236 @@
+import threading
+
+import numpy as np
+
+from building_assessment_metrics import REGISTRY
+
+# Aggregated output areas below this count as no rule firing; sampled membership
+# functions leave floating-point residue just outside their support
+MIN_AREA = 1e-9
+
+
+def aggregate_outputs(ruleset, *inputs):
+    """
+    Runs the Mamdani rules and returns the moment and area of the aggregated output set.
+
+    Each rule fires with the minimum membership of its antecedents and clips its output
+    set at that strength; clipped sets are aggregated with max. Inputs outside a
+    universe are clamped to it.
+
+    Args:
+        ruleset (CompiledRuleSet): Rule definitions holding the fuzzy sets and rules.
+        *inputs (float or array): One value or array per inference input
+            (crack severity score, crack width, confidence), broadcast together.
+
+    Returns:
+        tuple: (moment, area) arrays over the discretized output universe.
+    """
+    spec = ruleset.fuzzy_inference
+    inputs = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in inputs))
+    values = dict(zip(spec["inputs"], inputs))
+    output_universe = ruleset.fuzzy_ranges[spec["output"]]
+
+    aggregated = np.zeros(inputs[0].shape + output_universe.shape)
+    for rule in spec["rules"]:
+        strength = np.ones(inputs[0].shape)
+        for variable, set_name in rule["if"].items():
+            universe = ruleset.fuzzy_ranges[variable]
+            membership = np.interp(values[variable], universe, ruleset.fuzzy_sets[(variable, set_name)])
+            strength = np.minimum(strength, membership)
+        clipped = np.minimum(strength[..., None], ruleset.fuzzy_sets[(spec["output"], rule["then"])])
+        np.maximum(aggregated, clipped, out=aggregated)
+
+    return (aggregated * output_universe).sum(axis=-1), aggregated.sum(axis=-1)
+
+
+def mamdani_infer(ruleset, *inputs):
+    """
+    Exact Mamdani inference, defuzzified by centroid.
+
+    Args:
+        ruleset (CompiledRuleSet): Rule definitions holding the fuzzy sets and rules.
+        *inputs (float or array): Crack severity score, crack width and confidence.
+
+    Returns:
+        ndarray: Defuzzified output; 0.0 where no rule fires.
+    """
+    moment, area = aggregate_outputs(ruleset, *inputs)
+    return np.divide(moment, area, out=np.zeros_like(area), where=area > MIN_AREA)
+
+
+class FuzzySurface:
+    """
+    Mamdani inference precomputed on a regular grid over the input universes.
+
+    The moment and area of the aggregated output set are stored per grid point and
+    interpolated trilinearly before the centroid division. Unlike the centroid itself,
+    both are continuous, so the surface stays accurate next to regions where no rule
+    fires. Evaluation cost no longer depends on the number of fuzzy rules or the
+    output resolution.
+
+    The error against `mamdani_infer` is zero on grid points and is measured on random
+    points when the surface is built (`max_error`, `mean_error`). It stays small when
+    the membership breakpoints fall on grid lines, as with the default grid.
+
+    Attributes:
+        axes (list): Grid coordinates per input.
+        moment (ndarray): Moment of the aggregated output set at every grid point.
+        area (ndarray): Area of the aggregated output set at every grid point.
+        peak (float): Highest output on the grid. Centroid defuzzification never reaches
+            the top of the output universe, so outputs are divided by it to span [0, 1].
+        max_error (float): Largest absolute error observed against exact inference.
+        mean_error (float): Mean absolute error against exact inference.
+    """
+
+    def __init__(self, axes, moment, area, max_error=None, mean_error=None):
+        self.axes = axes
+        self.moment = moment
+        self.area = area
+        self.max_error = max_error
+        self.mean_error = mean_error
+        self._lower = np.array([axis[0] for axis in axes])
+        self._upper = np.array([axis[-1] for axis in axes])
+        self._steps = np.array([axis[1] - axis[0] for axis in axes])
+        self._last_cell = np.array(moment.shape) - 2
+        self.peak = float(np.divide(moment, area, out=np.zeros_like(area), where=area > MIN_AREA).max())
+
+        # Nested lists make single lookups much cheaper than numpy indexing
+        self._scalar_grid = [self._lower.tolist(), self._upper.tolist(), self._steps.tolist(),
+                             self._last_cell.tolist(), moment.tolist(), area.tolist()]
+
+    def evaluate(self, *inputs):
+        """
+        Interpolates the surface at the given inputs.
+
+        Args:
+            *inputs (float or array): Crack severity score, crack width and confidence;
+                arrays are broadcast together. Values outside the grid are clamped to it.
+
+        Returns:
+            float or ndarray: Defuzzified output, a float for scalar inputs.
+        """
+        if all(isinstance(value, (int, float)) for value in inputs):
+            return self._evaluate_scalar(*inputs)
+
+        points = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in inputs))
+        shape = points[0].shape
+        coords = np.stack([point.ravel() for point in points], axis=-1)
+        coords = (np.clip(coords, self._lower, self._upper) - self._lower) / self._steps
+
+        index = np.minimum(coords.astype(int), self._last_cell)
+        i, j, k = index.T
+        fi, fj, fk = (coords - index).T
+
+        results = []
+        for grid in (self.moment, self.area):
+            c00 = grid[i, j, k] * (1 - fk) + grid[i, j, k + 1] * fk
+            c01 = grid[i, j + 1, k] * (1 - fk) + grid[i, j + 1, k + 1] * fk
+            c10 = grid[i + 1, j, k] * (1 - fk) + grid[i + 1, j, k + 1] * fk
+            c11 = grid[i + 1, j + 1, k] * (1 - fk) + grid[i + 1, j + 1, k + 1] * fk
+            results.append((c00 * (1 - fj) + c01 * fj) * (1 - fi) + (c10 * (1 - fj) + c11 * fj) * fi)
+        moment, area = results
+
+        output = np.divide(moment, area, out=np.zeros_like(area), where=area > MIN_AREA)
+        return output.reshape(shape)
+
+    def _evaluate_scalar(self, *inputs):
+        lower, upper, steps, last_cell, moment_grid, area_grid = self._scalar_grid
+        index = []
+        fraction = []
+        for value, low, high, step, last in zip(inputs, lower, upper, steps, last_cell):
+            coord = (min(max(value, low), high) - low) / step
+            cell = min(int(coord), last)
+            index.append(cell)
+            fraction.append(coord - cell)
+        i, j, k = index
+        fi, fj, fk = fraction
+
+        results = []
+        for grid in (moment_grid, area_grid):
+            plane0, plane1 = grid[i], grid[i + 1]
+            c00 = plane0[j][k] * (1 - fk) + plane0[j][k + 1] * fk
+            c01 = plane0[j + 1][k] * (1 - fk) + plane0[j + 1][k + 1] * fk
+            c10 = plane1[j][k] * (1 - fk) + plane1[j][k + 1] * fk
+            c11 = plane1[j + 1][k] * (1 - fk) + plane1[j + 1][k + 1] * fk
+            results.append((c00 * (1 - fj) + c01 * fj) * (1 - fi) + (c10 * (1 - fj) + c11 * fj) * fi)
+        moment, area = results
+        return moment / area if area > MIN_AREA else 0.0
+
+    def measure_error(self, ruleset, samples=20000, seed=0):
+        """
+        Compares the surface against exact inference on uniformly random inputs.
+
+        Args:
+            ruleset (CompiledRuleSet): Rule definitions the surface was built from.
+            samples (int): Number of random points.
+            seed (int): Random seed, so repeated measurements are comparable.
+
+        Returns:
+            tuple: (max absolute error, mean absolute error).
+        """
+        rng = np.random.default_rng(seed)
+        points = [rng.uniform(axis[0], axis[-1], samples) for axis in self.axes]
+        errors = np.abs(self.evaluate(*points) - mamdani_infer(ruleset, *points))
+        return float(errors.max()), float(errors.mean())
+
+
+def build_surface(ruleset, grid=None):
+    """
+    Precomputes the inference surface of a rule set.
+
+    Args:
+        ruleset (CompiledRuleSet): Rule definitions with a `fuzzy_inference` section.
+        grid (list, optional): Grid points per input; defaults to the definition's `grid`.
+
+    Returns:
+        FuzzySurface: The surface, with its measured error bounds.
+    """
+    spec = ruleset.fuzzy_inference
+    grid = grid or spec["grid"]
+    axes = []
+    for variable, points in zip(spec["inputs"], grid):
+        universe = ruleset.fuzzy_ranges[variable]
+        axes.append(np.linspace(universe[0], universe[-1], points))
+
+    # One slice of the first input at a time keeps the aggregated output array small
+    shape = [len(axis) for axis in axes]
+    moment = np.empty(shape)
+    area = np.empty(shape)
+    for index, value in enumerate(axes[0]):
+        moment[index], area[index] = aggregate_outputs(ruleset, value, axes[1][:, None], axes[2][None, :])
+
+    surface = FuzzySurface(axes, moment, area)
+    surface.max_error, surface.mean_error = surface.measure_error(ruleset)
+    return surface
+
+
+### Surface Cache ###
+
+_surfaces = {}
+_surfaces_lock = threading.Lock()
+
+REGISTRY.gauge("building_assessment_fuzzy_surfaces_cached", "Fuzzy inference surfaces cached in this process.",
+               lambda: len(_surfaces))
+
+
+def get_surface(ruleset):
+    """
+    Returns the inference surface of a rule set, building it on first use.
+
+    Surfaces are cached per process by the rule set's content hash, so engines
+    sharing a rule set share one surface.
+    """
+    surface = _surfaces.get(ruleset.content_hash)
+    if surface is None:
+        with _surfaces_lock:
+            surface = _surfaces.get(ruleset.content_hash)
+            if surface is None:
+                surface = build_surface(ruleset)
+                _surfaces[ruleset.content_hash] = surface
+    return surface
+
+
+def cache_surface(ruleset, surface):
+    """Installs a surface built elsewhere, e.g. loaded from an engine snapshot, into the per-process cache."""
+    with _surfaces_lock:
+        _surfaces.setdefault(ruleset.content_hash, surface)
@@ -0,0 +1,302 @@
+import argparse
+from contextlib import contextmanager
+import gc
+from itertools import islice
+import time
+import tracemalloc
+
+from building_assessment_batch import current_memory_mb, peak_memory_mb, record_results
+from building_assessment_service import ConcurrentAssessor
+
+# Stages of a budgeted batch, in order
+STAGES = ["parse", "assess", "output"]
+
+# Share of the remaining budget a chunk's transient allocations may take; the rest covers
+# allocator fragmentation and memory tracemalloc cannot see (numpy buffers, SQLite pages)
+HEADROOM_SHARE = 0.5
+
+# Allocations made by tracemalloc and the import system are not the batch's own
+IGNORED_FRAMES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+class StageProfiler:
+    """
+    Tracks the memory of each batch stage with `tracemalloc`.
+
+    Tracing slows Python down several times over, so only every `trace_every`-th
+    chunk is traced, starting with the second; the first builds the per-thread
+    engines, which would skew the per-building cost. On a traced chunk, each stage records the peak of traced memory
+    above its starting point, which is what one chunk of that stage costs, and the
+    allocation sites whose retained memory grew during the stage.
+    """
+
+    def __init__(self, top=10, trace_every=5, frames=1):
+        """
+        Args:
+            top (int): Allocation sites reported per stage.
+            trace_every (int): Trace every n-th chunk; 1 traces them all.
+            frames (int): Stack frames stored per allocation; more frames cost more memory.
+        """
+        self.top = top
+        self.trace_every = max(trace_every, 1)
+        self.frames = frames
+        self.chunk = 0
+        self.tracing = False
+        self.stages = {stage: {"last_peak": 0, "peak_bytes": 0, "bytes": 0, "buildings": 0, "seconds": 0.0,
+                               "sites": {}} for stage in STAGES}
+
+    def begin_chunk(self):
+        """Starts a chunk, tracing it if it is sampled."""
+        self.tracing = self.chunk > 0 and (self.chunk - 1) % self.trace_every == 0
+        if self.tracing:
+            tracemalloc.start(self.frames)
+
+    @contextmanager
+    def stage(self, name):
+        """Measures one stage of the current chunk; `name` is one of `STAGES`."""
+        stats = self.stages[name]
+        before = None
+        if self.tracing:
+            before = tracemalloc.take_snapshot().filter_traces(IGNORED_FRAMES)
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+            if before is not None:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                stats["last_peak"] = peak
+                stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+                stats["bytes"] += peak
+                after = tracemalloc.take_snapshot().filter_traces(IGNORED_FRAMES)
+                for difference in after.compare_to(before, "lineno"):
+                    if difference.size_diff > 0:
+                        frame = difference.traceback[0]
+                        site = f"{frame.filename}:{frame.lineno}"
+                        stats["sites"][site] = stats["sites"].get(site, 0) + difference.size_diff
+
+    def end_chunk(self, buildings):
+        """
+        Closes the current chunk.
+
+        Args:
+            buildings (int): Buildings in the chunk, for the per-building cost of each stage.
+
+        Returns:
+            int or None: The largest peak of the chunk's stages in bytes, or None if it was not traced.
+        """
+        self.chunk += 1
+        if not self.tracing:
+            return None
+        tracemalloc.stop()
+        self.tracing = False
+        for stats in self.stages.values():
+            stats["buildings"] += buildings
+        return max(stats["last_peak"] for stats in self.stages.values())
+
+    def close(self):
+        """Stops tracing if a chunk was left open by an error."""
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def report(self):
+        """
+        Summarizes the stages.
+
+        Returns:
+            dict: Per stage: peak bytes of any traced chunk, mean bytes per building,
+            seconds over all chunks, and the top allocation sites as (site, KB retained
+            over the traced chunks).
+        """
+        report = {}
+        for name, stats in self.stages.items():
+            sites = sorted(stats["sites"].items(), key=lambda item: -item[1])[:self.top]
+            report[name] = {
+                "peak_bytes": stats["peak_bytes"],
+                "bytes_per_building": stats["bytes"] / stats["buildings"] if stats["buildings"] else 0.0,
+                "seconds": stats["seconds"],
+                "top_sites": [(site, size / 1024) for site, size in sites],
+            }
+        return report
+
+
+class AdaptiveChunker:
+    """
+    Picks each chunk size so the batch stays under a memory budget.
+
+    On every traced chunk, the largest stage peak divided by the chunk size gives the
+    memory cost of one building in flight. The next chunk gets `HEADROOM_SHARE` of
+    the budget still free, at the last measured cost per building. Going over the
+    budget shrinks the next chunk to the minimum and collects garbage.
+    """
+
+    def __init__(self, budget_mb, initial=100, minimum=10, maximum=5000):
+        if budget_mb <= 0:
+            raise ValueError(f"Memory budget must be positive, got {budget_mb} MB.")
+        self.budget_mb = budget_mb
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = min(max(initial, minimum), maximum)
+        self.sizes = []
+        self.over_budget = 0
+        self.per_building = None  # Bytes per building in flight, from the last traced chunk
+
+    def update(self, buildings, peak_bytes, rss_mb):
+        """
+        Sets the next chunk size from the chunk just processed.
+
+        Args:
+            buildings (int): Buildings in the chunk.
+            peak_bytes (int or None): Largest traced memory peak of its stages, None if not traced.
+            rss_mb (float): Resident set size after the chunk.
+
+        Returns:
+            int: The next chunk size.
+        """
+        self.sizes.append(buildings)
+        if buildings and peak_bytes:
+            self.per_building = peak_bytes / buildings
+        free_mb = self.budget_mb - rss_mb
+        if free_mb <= 0:
+            self.over_budget += 1
+            gc.collect()
+            self.size = self.minimum
+        elif self.per_building:
+            target = int(free_mb * 1024 * 1024 * HEADROOM_SHARE / self.per_building)
+            self.size = min(max(target, self.minimum), self.maximum)
+        return self.size
+
+
+def run_budgeted(records, memory_budget_mb, assessor=None, store=None, portfolio=None, aggregates=None,
+                 top_n=None, initial_chunk=100, min_chunk=10, max_chunk=5000, top_sites=10, trace_every=5):
+    """
+    Runs a batch like `run_batch`, sizing each chunk to stay under a memory budget.
+
+    Every chunk goes through three profiled stages: parse (pulling records from the
+    input), assess and output (store, portfolio and rollups). The chunk size adapts to
+    the measured memory per building (see `AdaptiveChunker`). Traced chunks run several
+    times slower, so raise `trace_every` for long runs; `run_batch` remains the fastest
+    path when memory is not a concern.
+
+    Args:
+        records (iterable): (building_id, BuildingAssessment) pairs, e.g. parsed lazily from a file.
+        memory_budget_mb (float): Resident memory ceiling for the whole process.
+        assessor (ConcurrentAssessor, optional): Assessor to use; a new one is created if omitted.
+        store (AssessmentStore, optional): Persist every assessment.
+        portfolio (PortfolioQueue, optional): Rank every assessed building.
+        aggregates (GroupedAggregate, optional): Roll every result up by group.
+        top_n (int, optional): Only the top `top_n` actions are needed per building.
+        initial_chunk (int): Size of the first chunk, before any measurement.
+        min_chunk (int): Smallest chunk size.
+        max_chunk (int): Largest chunk size.
+        top_sites (int): Allocation sites reported per stage.
+        trace_every (int): Trace allocations on every n-th chunk.
+
+    Returns:
+        dict: `run_batch` statistics plus the budget, peak and final resident memory in MB,
+        chunk sizes, chunks over budget, and the per-stage report of `StageProfiler`.
+    """
+    if current_memory_mb() >= memory_budget_mb:
+        raise ValueError(f"Memory budget of {memory_budget_mb} MB is below the {current_memory_mb():.0f} MB "
+                         "this process already uses.")
+    own_assessor = assessor is None
+    if own_assessor:
+        assessor = ConcurrentAssessor()
+    chunker = AdaptiveChunker(memory_budget_mb, initial_chunk, min_chunk, max_chunk)
+    profiler = StageProfiler(top_sites, trace_every)
+
+    buildings = 0
+    actions = 0
+    peak_rss_mb = current_memory_mb()
+    start = time.perf_counter()
+    iterator = iter(records)
+    try:
+        while True:
+            profiler.begin_chunk()
+            with profiler.stage("parse"):
+                chunk = list(islice(iterator, chunker.size))
+            if not chunk:
+                profiler.end_chunk(0)
+                break
+            with profiler.stage("assess"):
+                results = assessor.assess_many(chunk, top_n=top_n, chunk_size=len(chunk))
+            with profiler.stage("output"):
+                record_results(chunk, results, store, portfolio, aggregates, top_n)
+
+            size = len(chunk)
+            buildings += size
+            actions += sum(len(result.actions) for result in results)
+            del chunk, results  # Released before measuring, as the next chunk will not hold them
+            rss_mb = current_memory_mb()
+            peak_rss_mb = max(peak_rss_mb, rss_mb)
+            chunker.update(size, profiler.end_chunk(size), rss_mb)
+    finally:
+        profiler.close()
+        if own_assessor:
+            assessor.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "buildings": buildings,
+        "actions": actions,
+        "seconds": elapsed,
+        "buildings_per_second": buildings / elapsed if elapsed else 0.0,
+        "budget_mb": memory_budget_mb,
+        "peak_rss_mb": max(peak_rss_mb, current_memory_mb()),
+        "process_peak_rss_mb": peak_memory_mb(),
+        "chunks": len(chunker.sizes),
+        "chunk_sizes": (min(chunker.sizes), max(chunker.sizes), chunker.sizes[-1]) if chunker.sizes else (0, 0, 0),
+        "over_budget_chunks": chunker.over_budget,
+        "stages": profiler.report(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch under a memory budget and report where memory goes.")
+    parser.add_argument("--budget-mb", type=float, required=True, help="Resident memory ceiling in MB.")
+    parser.add_argument("--csv", default=None, help="Buildings to assess, as in the UI's batch upload; "
+                                                    "synthetic buildings if omitted.")
+    parser.add_argument("--count", type=int, default=20000, help="Number of synthetic buildings.")
+    parser.add_argument("--seed", type=int, default=0, help="Population seed.")
+    parser.add_argument("--top-n", type=int, default=None, help="Only compute the top N actions per building.")
+    parser.add_argument("--store", default=None, help="Also persist results to this SQLite file.")
+    args = parser.parse_args()
+
+    store = None
+    if args.store:
+        from building_assessment_store import AssessmentStore
+        store = AssessmentStore(args.store)
+    source = None
+    if args.csv:
+        from building_assessment_csv import iter_csv_records
+        source = open(args.csv, newline="", encoding="utf-8-sig")
+        records = ((building_id, fact) for _, building_id, fact, error in iter_csv_records(source) if error is None)
+    else:
+        from building_assessment_synthetic import generate_buildings
+        records = generate_buildings(args.count, args.seed)
+    try:
+        stats = run_budgeted(records, args.budget_mb, store=store, top_n=args.top_n)
+    finally:
+        if source is not None:
+            source.close()
+        if store is not None:
+            store.close()
+
+    print(f"Buildings:     {stats['buildings']}")
+    print(f"Throughput:    {stats['buildings_per_second']:.0f} buildings/s")
+    print(f"Budget:        {stats['budget_mb']:.0f} MB")
+    print(f"Peak RSS:      {stats['peak_rss_mb']:.0f} MB")
+    print(f"Chunks:        {stats['chunks']} (min/max/last size {'/'.join(map(str, stats['chunk_sizes']))}, "
+          f"{stats['over_budget_chunks']} over budget)")
+    for stage, report in stats["stages"].items():
+        print(f"\n[{stage}] peak {report['peak_bytes'] / 1024:.0f} KB per chunk, "
+              f"{report['bytes_per_building'] / 1024:.1f} KB per building, {report['seconds']:.1f} s")
+        for site, kb in report["top_sites"]:
+            print(f"    {kb:10.1f} KB  {site}")
@@ -0,0 +1,320 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+# Latency buckets in seconds, from half a millisecond to ten seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ThreadSentinel:
+    """Object kept in a thread's local storage; it is released, and finalized, when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _ThreadShards:
+    """
+    Per-thread storage for a metric.
+
+    Each thread writes only to its own dict, so recording takes no lock; the lock is
+    taken once per thread to register its shard, and by `snapshots` to list the shards.
+    When a thread exits, its shard is folded into `retired` with `fold`, so short-lived
+    threads do not leave one shard each behind.
+    """
+
+    def __init__(self, fold):
+        """
+        Args:
+            fold (callable): Adds a shard's value for one label tuple to the retired value,
+                `fold(retired_value, value)`, returning a new value and mutating neither.
+        """
+        self.fold = fold
+        self.local = threading.local()
+        self.shards = {}
+        self.retired = {}
+        self.lock = threading.Lock()
+
+    def shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            sentinel = _ThreadSentinel()
+            shard = {}
+            with self.lock:
+                self.shards[id(shard)] = shard
+            weakref.finalize(sentinel, self._retire, shard)
+            self.local.sentinel, self.local.shard = sentinel, shard
+        return shard
+
+    def _retire(self, shard):
+        with self.lock:
+            del self.shards[id(shard)]
+            for labels, value in shard.items():
+                retired = self.retired.get(labels)
+                self.retired[labels] = value if retired is None else self.fold(retired, value)
+
+    def snapshots(self):
+        with self.lock:
+            shards = list(self.shards.values())
+            retired = dict(self.retired)  # Values are replaced on folding, never mutated
+        return [retired] + [shard.copy() for shard in shards]
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _ThreadShards(lambda retired, value: retired + value)
+
+    def inc(self, *labels, amount=1):
+        """
+        Adds to the counter.
+
+        Args:
+            *labels (str): One value per label name.
+            amount (int or float): Non-negative increment.
+        """
+        shard = self._shards.shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        """Returns the total per label-value tuple, summed over all threads."""
+        totals = {}
+        for shard in self._shards.snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self):
+        for labels, value in sorted(self.values().items()):
+            yield self.name + "_total", _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._shards = _ThreadShards(lambda retired, cells: [a + b for a, b in zip(retired, cells)])
+
+    def observe(self, value, *labels):
+        """Records one observation."""
+        shard = self._shards.shard()
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]  # Bucket counts, +Inf, sum
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                cells[index] += 1
+                break
+        else:
+            cells[len(self.buckets)] += 1
+        cells[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Context manager observing the seconds spent in its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def values(self):
+        """Returns ([count per bucket, +Inf count], sum) per label-value tuple, summed over all threads."""
+        totals = {}
+        for shard in self._shards.snapshots():
+            for labels, cells in shard.items():
+                cells = list(cells)
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = (cells[:-1], cells[-1])
+                else:
+                    totals[labels] = ([a + b for a, b in zip(total[0], cells[:-1])], total[1] + cells[-1])
+        return totals
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                yield self.name + "_bucket", _format_labels(self.labelnames, labels, le), cumulative
+            yield self.name + "_sum", _format_labels(self.labelnames, labels), total
+            yield self.name + "_count", _format_labels(self.labelnames, labels), cumulative
+
+
+class Gauge:
+    """
+    Value that can go up and down.
+
+    Either set explicitly, or read from `function` at collection time, which suits
+    values that already exist elsewhere (queue lengths, cache sizes) and costs
+    nothing on the recording path.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        yield self.name, "", self.function() if self.function is not None else self.value
+
+
+class MetricsRegistry:
+    """
+    Named metrics rendered in the Prometheus text exposition format.
+
+    Metrics are created once, usually at import time, with `counter`, `histogram`
+    or `gauge`; asking for an existing name returns the same metric.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric '{metric.name}' is already registered as a {existing.kind}.")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS, labelnames=()):
+        return self._register(Histogram(name, documentation, buckets, labelnames))
+
+    def gauge(self, name, documentation, function=None):
+        """Registers a gauge; registering a name again replaces its `function`."""
+        gauge = self._register(Gauge(name, documentation, function))
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def exposition(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """
+        Writes the exposition to a file, e.g. for node_exporter's textfile collector.
+
+        The file is replaced atomically, so readers never see a partial write.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.exposition())
+        os.replace(tmp_path, path)
+
+
+# Registry the engine, service and batch runs record into
+REGISTRY = MetricsRegistry()
+
+
+### Exporters ###
+
+def serve_metrics(port=9464, host="127.0.0.1", registry=REGISTRY):
+    """
+    Serves the registry over HTTP on a background thread, at any path (conventionally /metrics).
+
+    Args:
+        port (int): Port to listen on; 0 picks a free one.
+        host (str): Interface to bind; the default only accepts local scrapers.
+        registry (MetricsRegistry): Metrics to expose.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop it.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # Scrapes every few seconds would flood stderr
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class MetricsFileWriter:
+    """Rewrites the exposition to a file every `interval` seconds on a background thread."""
+
+    def __init__(self, path, interval=15.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.registry.write_file(self.path)
+
+    def stop(self):
+        """Stops the writer after writing the file one last time."""
+        self._stopped.set()
+        self._thread.join()
+        self.registry.write_file(self.path)
@@ -0,0 +1,286 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from building_assessment_ES import ENGINE_VERSION, BuildingAssessment
+from building_assessment_rules import get_active_rules
+from building_assessment_service import AssessmentResult, ConcurrentAssessor, RankedAction
+from building_assessment_warm import load_snapshot, warm_start
+
+# Column dtype per field type; text fields are stored as codes into their categories
+COLUMN_DTYPES = {bool: np.uint8, int: np.int64, float: np.float64, str: np.int8}
+
+# Marks unused slots in the action and rule ID buffers
+NO_ACTION = -1
+
+
+def column_layout(ruleset):
+    """
+    Describes how building inputs are laid out as columns.
+
+    Field types are taken from the `BuildingAssessment` defaults. Text fields need a
+    closed set of categories; `cracks` uses the crack classes of the rule set.
+
+    Args:
+        ruleset (CompiledRuleSet): Rule definitions supplying the categories.
+
+    Returns:
+        list: (field, dtype, default, categories) per field, categories None for non-text fields.
+    """
+    categories = {"cracks": sorted(ruleset.crack_severity)}
+    layout = []
+    for name, field in BuildingAssessment.__fields__.items():
+        kind = type(field.default)
+        if kind is str and name not in categories:
+            raise ValueError(f"Text field '{name}' has no known categories.")
+        layout.append((name, COLUMN_DTYPES[kind], field.default, categories.get(name)))
+    return layout
+
+
+def action_vocabulary(ruleset):
+    """Returns the sorted actions and rule names of a rule set; result buffers store their indices."""
+    actions = sorted(set(ruleset.priority_map) | set(ruleset.action_rules))
+    return actions, sorted(ruleset.rules)
+
+
+class SharedArrays:
+    """
+    Named numpy arrays packed into one `multiprocessing.shared_memory` block.
+
+    The creating process owns the block and unlinks it on `close`; other processes
+    attach by name and get views on the same memory, so nothing is copied.
+    """
+
+    def __init__(self, specs, name=None):
+        """
+        Args:
+            specs (list): (name, dtype, shape) per array.
+            name (str, optional): Attach to this existing block instead of creating one.
+        """
+        self.specs = [(array_name, np.dtype(dtype), tuple(shape)) for array_name, dtype, shape in specs]
+        offsets = []
+        size = 0
+        for _, dtype, shape in self.specs:
+            size += -size % 8  # Keep every array 8-byte aligned
+            offsets.append(size)
+            size += dtype.itemsize * int(np.prod(shape))
+
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            # Pool workers share the owner's resource tracker, so attaching registers nothing new
+            self.memory = shared_memory.SharedMemory(name=name)
+
+        self.arrays = {
+            array_name: np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=offset)
+            for (array_name, dtype, shape), offset in zip(self.specs, offsets)
+        }
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def __getitem__(self, array_name):
+        return self.arrays[array_name]
+
+    def close(self):
+        """Releases the views and the block; the owner also unlinks it."""
+        self.arrays = {}
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+### Worker Side ###
+
+_worker = {}
+
+
+def _init_worker(input_name, output_name, specs, ruleset, top_n):
+    load_snapshot(ruleset)  # Spawned workers load the surface instead of rebuilding it; forked ones already have it
+    inputs = SharedArrays(specs["inputs"], name=input_name)
+    outputs = SharedArrays(specs["outputs"], name=output_name)
+    actions, rules = action_vocabulary(ruleset)
+    _worker.update(
+        inputs=inputs,
+        outputs=outputs,
+        layout=column_layout(ruleset),
+        action_ids={action: index for index, action in enumerate(actions)},
+        rule_ids={rule: index for index, rule in enumerate(rules)},
+        assessor=ConcurrentAssessor(ruleset),
+        top_n=top_n,
+    )
+
+
+def _assess_slice(start, stop):
+    """Assesses rows [start, stop) of the shared input and writes their ranked actions in place."""
+    inputs, outputs = _worker["inputs"], _worker["outputs"]
+    action_ids, rule_ids = _worker["action_ids"], _worker["rule_ids"]
+    assessor, top_n = _worker["assessor"], _worker["top_n"]
+
+    # tolist() turns the column slices into plain Python values, as the rules expect
+    columns = []
+    for name, _, default, categories in _worker["layout"]:
+        values = inputs[name][start:stop].tolist()
+        if categories is not None:
+            values = [categories[code] for code in values]
+        elif isinstance(default, bool):
+            values = [bool(value) for value in values]
+        columns.append((name, default, values))
+
+    priorities, action_buffer, rule_buffer, counts = (outputs["priorities"], outputs["actions"],
+                                                      outputs["rules"], outputs["counts"])
+    width = priorities.shape[1]
+    for offset in range(stop - start):
+        fact = BuildingAssessment(**{
+            name: values[offset] for name, default, values in columns if values[offset] != default
+        })
+        ranked = assessor.assess(fact, top_n=top_n).actions[:width]
+        row = start + offset
+        counts[row] = len(ranked)
+        for slot, entry in enumerate(ranked):
+            priorities[row, slot] = entry.priority
+            action_buffer[row, slot] = action_ids[entry.action]
+            rule_buffer[row, slot] = rule_ids.get(entry.rule, NO_ACTION)
+    return stop - start
+
+
+### Parent Side ###
+
+class SharedMemoryBatch:
+    """
+    Multi-process batch assessment over shared-memory columns.
+
+    Inputs are encoded once into typed columns in a shared memory block, and ranked
+    results are written by the workers into a second, preallocated block. Workers
+    attach to both when they start and then receive only (start, stop) offsets, so
+    no facts, dicts or results are pickled between processes.
+
+    Results hold up to `width` actions per building, as indices into the sorted
+    action and rule vocabularies of the rule set.
+
+    Example:
+        with SharedMemoryBatch(records, top_n=5) as batch:
+            batch.run(max_workers=8)
+            for result in batch.results():
+                ...
+    """
+
+    def __init__(self, records, ruleset=None, top_n=None):
+        """
+        Args:
+            records (list): (building_id, BuildingAssessment) pairs.
+            ruleset (CompiledRuleSet, optional): Rule definitions; defaults to the active rules.
+            top_n (int, optional): Only the top `top_n` actions are kept per building.
+
+        Raises:
+            ValueError: If a fact has a field outside the schema or a text value outside its categories.
+        """
+        self.ruleset = ruleset or get_active_rules()
+        self.top_n = top_n
+        self.layout = column_layout(self.ruleset)
+        self.actions, self.rules = action_vocabulary(self.ruleset)
+        self.building_ids = [str(building_id) for building_id, _ in records]
+        self.width = top_n if top_n is not None else len(self.actions)
+
+        rows = len(records)
+        self.specs = {
+            "inputs": [(name, dtype, (rows,)) for name, dtype, _, _ in self.layout],
+            "outputs": [
+                ("priorities", np.float64, (rows, self.width)),
+                ("actions", np.int16, (rows, self.width)),
+                ("rules", np.int16, (rows, self.width)),
+                ("counts", np.int16, (rows,)),
+            ],
+        }
+        self.inputs = SharedArrays(self.specs["inputs"])
+        try:
+            self.outputs = SharedArrays(self.specs["outputs"])
+        except Exception:
+            self.inputs.close()
+            raise
+        self.outputs["counts"][:] = 0
+        try:
+            self._encode([fact for _, fact in records])
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.building_ids)
+
+    def _encode(self, facts):
+        columns = {name for name, _, _, _ in self.layout}
+        for fact in facts:
+            unknown = [name for name in fact
+                       if isinstance(name, str) and not name.startswith("__") and name not in columns]
+            if unknown:
+                raise ValueError(f"Field(s) {sorted(unknown)} have no column; declare them on BuildingAssessment.")
+        for name, dtype, default, categories in self.layout:
+            values = [fact.get(name, default) for fact in facts]
+            if categories is not None:
+                codes = {category: code for code, category in enumerate(categories)}
+                unknown = {value for value in values if value not in codes}
+                if unknown:
+                    raise ValueError(f"Unknown {name} value(s) {sorted(unknown)}; expected one of {categories}.")
+                values = [codes[value] for value in values]
+            self.inputs[name][:] = np.asarray(values, dtype=dtype)
+
+    def run(self, max_workers=None, chunk_size=500, mp_context=None):
+        """
+        Assesses every building on a process pool.
+
+        Args:
+            max_workers (int, optional): Number of processes; defaults to the CPU count.
+            chunk_size (int): Rows per task.
+            mp_context (multiprocessing context, optional): Start method for the workers.
+
+        Returns:
+            int: Number of buildings assessed.
+        """
+        warm_start(self.ruleset)  # Forked workers inherit a ready engine, spawned ones find the snapshot
+        rows = len(self)
+        starts = range(0, rows, chunk_size)
+        stops = [min(start + chunk_size, rows) for start in starts]
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(self.inputs.name, self.outputs.name, self.specs, self.ruleset, self.top_n),
+        ) as executor:
+            return sum(executor.map(_assess_slice, starts, stops))
+
+    def result(self, row):
+        """Decodes the result of one row into an `AssessmentResult`."""
+        count = int(self.outputs["counts"][row])
+        priorities = self.outputs["priorities"][row, :count].tolist()
+        actions = self.outputs["actions"][row, :count].tolist()
+        rules = self.outputs["rules"][row, :count].tolist()
+        return AssessmentResult(
+            self.building_ids[row],
+            tuple(
+                RankedAction(priority, self.actions[action], self.rules[rule] if rule != NO_ACTION else None)
+                for priority, action, rule in zip(priorities, actions, rules)
+            ),
+            ENGINE_VERSION,
+            self.ruleset.content_hash
+        )
+
+    def results(self):
+        """Yields the `AssessmentResult` of every row in input order."""
+        for row in range(len(self)):
+            yield self.result(row)
+
+    def close(self):
+        """Releases and unlinks both shared memory blocks."""
+        self.inputs.close()
+        self.outputs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
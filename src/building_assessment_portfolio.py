@@ -0,0 +1,228 @@
+import heapq
+
+from building_assessment_rules import action_category
+
+
+class IndexedMaxHeap:
+    """
+    Binary max-heap of (priority, building_id) entries with a position index,
+    so any building can be updated or removed in O(log n).
+    """
+
+    def __init__(self):
+        self._priorities = []
+        self._ids = []
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, building_id):
+        return building_id in self._positions
+
+    def get(self, building_id, default=None):
+        """Returns the priority stored for a building, or `default` if absent."""
+        position = self._positions.get(building_id)
+        return default if position is None else self._priorities[position]
+
+    def set(self, building_id, priority):
+        """Inserts a building or changes its priority."""
+        position = self._positions.get(building_id)
+        if position is None:
+            self._priorities.append(priority)
+            self._ids.append(building_id)
+            self._positions[building_id] = len(self._ids) - 1
+            self._sift_up(len(self._ids) - 1)
+        elif priority != self._priorities[position]:
+            increased = priority > self._priorities[position]
+            self._priorities[position] = priority
+            if increased:
+                self._sift_up(position)
+            else:
+                self._sift_down(position)
+
+    def discard(self, building_id):
+        """Removes a building if present."""
+        position = self._positions.pop(building_id, None)
+        if position is None:
+            return
+        last_priority = self._priorities.pop()
+        last_id = self._ids.pop()
+        if position == len(self._ids):
+            return
+        self._priorities[position] = last_priority
+        self._ids[position] = last_id
+        self._positions[last_id] = position
+        self._sift_up(position)
+        self._sift_down(self._positions[last_id])
+
+    def top(self, k):
+        """
+        Returns the `k` highest entries without modifying the heap.
+
+        Explores the heap best-first from the root, so the cost is O(k log k)
+        regardless of the heap size.
+        """
+        results = []
+        if not self._ids or k <= 0:
+            return results
+        frontier = [(-self._priorities[0], 0)]
+        size = len(self._ids)
+        while frontier and len(results) < k:
+            negative_priority, position = heapq.heappop(frontier)
+            results.append((self._ids[position], -negative_priority))
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size:
+                    heapq.heappush(frontier, (-self._priorities[child], child))
+        return results
+
+    def _swap(self, i, j):
+        self._priorities[i], self._priorities[j] = self._priorities[j], self._priorities[i]
+        self._ids[i], self._ids[j] = self._ids[j], self._ids[i]
+        self._positions[self._ids[i]] = i
+        self._positions[self._ids[j]] = j
+
+    def _sift_up(self, position):
+        priorities = self._priorities
+        while position > 0:
+            parent = (position - 1) // 2
+            if priorities[position] <= priorities[parent]:
+                break
+            self._swap(position, parent)
+            position = parent
+
+    def _sift_down(self, position):
+        priorities = self._priorities
+        size = len(priorities)
+        while True:
+            largest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and priorities[child] > priorities[largest]:
+                    largest = child
+            if largest == position:
+                return
+            self._swap(position, largest)
+            position = largest
+
+
+class PortfolioQueue:
+    """
+    Portfolio-wide ranking of buildings by their highest confidence-scaled priority.
+
+    Buildings are fed with the engine's per-building `prioritized_actions` and ranked
+    overall and per action category ("Critical", "High Priority", ...). Inserting,
+    updating or removing a building costs O(log n) per category it appears in, and
+    top-k queries never re-sort the portfolio.
+    """
+
+    def __init__(self):
+        self._overall = IndexedMaxHeap()
+        self._categories = {}
+
+    def __len__(self):
+        return len(self._overall)
+
+    def __contains__(self, building_id):
+        return building_id in self._overall
+
+    @staticmethod
+    def _normalize_category(category):
+        return category.rstrip(":").strip()
+
+    def update(self, building_id, actions):
+        """
+        Inserts a building or replaces its ranking with a new assessment.
+
+        Args:
+            building_id (str): Identifier of the building.
+            actions (list): (priority, action) or (priority, action, rule_name) tuples.
+        """
+        best = {}
+        for entry in actions:
+            priority, action = entry[0], entry[1]
+            category = action_category(action)
+            if priority > best.get(category, float('-inf')):
+                best[category] = priority
+
+        if not best:
+            self.remove(building_id)
+            return
+
+        self._overall.set(building_id, max(best.values()))
+        for category, heap in self._categories.items():
+            if category not in best:
+                heap.discard(building_id)
+        for category, priority in best.items():
+            self._categories.setdefault(category, IndexedMaxHeap()).set(building_id, priority)
+
+    insert = update
+
+    def remove(self, building_id):
+        """Removes a building from the portfolio if present."""
+        self._overall.discard(building_id)
+        for heap in self._categories.values():
+            heap.discard(building_id)
+
+    def priority(self, building_id, category=None):
+        """
+        Returns a building's current ranking priority.
+
+        Args:
+            building_id (str): Identifier of the building.
+            category (str, optional): Restrict to actions in this category.
+
+        Returns:
+            float: The priority, or None if the building has no such actions.
+        """
+        if category is None:
+            return self._overall.get(building_id)
+        heap = self._categories.get(self._normalize_category(category))
+        return None if heap is None else heap.get(building_id)
+
+    def to_dict(self):
+        """Serializes the rankings to a dict of JSON-compatible values, e.g. for checkpoints."""
+        return {
+            "overall": dict(zip(self._overall._ids, self._overall._priorities)),
+            "categories": {category: dict(zip(heap._ids, heap._priorities))
+                           for category, heap in sorted(self._categories.items())},
+        }
+
+    def restore(self, data):
+        """
+        Replaces the rankings with `to_dict` output.
+
+        Args:
+            data (dict): Serialized rankings.
+        """
+        self._overall = IndexedMaxHeap()
+        self._categories = {}
+        for building_id, priority in data["overall"].items():
+            self._overall.set(building_id, priority)
+        for category, priorities in data["categories"].items():
+            heap = self._categories[category] = IndexedMaxHeap()
+            for building_id, priority in priorities.items():
+                heap.set(building_id, priority)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a portfolio from `to_dict` output."""
+        portfolio = cls()
+        portfolio.restore(data)
+        return portfolio
+
+    def top(self, k=10, category=None):
+        """
+        Returns the `k` buildings to act on first.
+
+        Args:
+            k (int): Number of buildings to return.
+            category (str, optional): Rank only by actions in this category,
+                e.g. "Critical:" or "High Priority".
+
+        Returns:
+            list: (building_id, priority) tuples, highest priority first.
+        """
+        if category is None:
+            return self._overall.top(k)
+        heap = self._categories.get(self._normalize_category(category))
+        return [] if heap is None else heap.top(k)
@@ -0,0 +1,272 @@
+import argparse
+import functools
+import hashlib
+import html
+from itertools import islice
+from multiprocessing import Pool
+import os
+import re
+from string import Template
+import time
+import zipfile
+
+from building_assessment_ES import ENGINE_VERSION, BuildingAssessment
+from building_assessment_rules import action_category
+
+### Templates ###
+# Parsed once at import, so every worker process compiles them a single time
+
+HTML_PAGE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Building Assessment - $building_id</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 2em; color: #222; }
+h1 { color: dodgerBlue; font-size: 22px; margin-bottom: 0; }
+.meta { color: #7f8c8d; font-size: 12px; margin-bottom: 1.5em; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 1.5em; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: left; font-size: 13px; vertical-align: top; }
+th { background: #f2f2f2; }
+tr.critical td { background: #fdecea; }
+tr.high-priority td { background: #fff4e5; }
+@media print { body { margin: 0; } }
+</style>
+</head>
+<body>
+<h1>Building Assessment: $building_id</h1>
+<div class="meta">Engine version $engine_version &middot; Generated $generated</div>
+<h2>Recommended Actions</h2>
+<table>
+<tr><th>#</th><th>Priority</th><th>Category</th><th>Action</th><th>Rule</th></tr>
+$actions</table>
+<h2>Observed Conditions</h2>
+<table>
+<tr><th>Field</th><th>Value</th></tr>
+$conditions</table>
+</body>
+</html>
+""")
+
+HTML_ACTION = Template(
+    '<tr class="$css"><td>$rank</td><td>$priority</td><td>$category</td><td>$action</td><td>$rule</td></tr>\n'
+)
+HTML_CONDITION = Template("<tr><td>$field</td><td>$value</td></tr>\n")
+HTML_EMPTY = Template('<tr><td colspan="$columns">$message</td></tr>\n')
+
+TEXT_PAGE = Template("""BUILDING ASSESSMENT: $building_id
+Engine version $engine_version, generated $generated
+
+RECOMMENDED ACTIONS
+$actions
+OBSERVED CONDITIONS
+$conditions""")
+
+TEXT_ACTION = Template("$rank. [$priority] $action\n    Rule: $rule\n")
+TEXT_CONDITION = Template("  $field: $value\n")
+TEXT_EMPTY = Template("  $message\n")
+
+# Page, action row, condition row, empty-section line, escaping and file extension per format
+FORMATS = {
+    "html": (HTML_PAGE, HTML_ACTION, HTML_CONDITION, HTML_EMPTY, html.escape, ".html"),
+    "text": (TEXT_PAGE, TEXT_ACTION, TEXT_CONDITION, TEXT_EMPTY, str, ".txt"),
+}
+
+
+def observed_conditions(inputs):
+    """Returns the (field, value) pairs of an inputs dict that differ from the BuildingAssessment defaults."""
+    fields = BuildingAssessment.__fields__
+    return [
+        (name, value) for name, value in sorted(inputs.items())
+        if not name.startswith("__") and (name not in fields or value != fields[name].default)
+    ]
+
+
+def render_report(building_id, actions, inputs=None, fmt="html", generated=None):
+    """
+    Renders the recommendation sheet of one building.
+
+    Args:
+        building_id (str): Identifier of the building.
+        actions (iterable): (priority, action) or (priority, action, rule_name) tuples, highest priority first.
+        inputs (dict, optional): Assessed input fields; those differing from their defaults are listed.
+        fmt (str): "html" or "text".
+        generated (str, optional): Generation date shown on the sheet; defaults to today.
+
+    Returns:
+        str: The rendered report.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format '{fmt}'; expected one of {sorted(FORMATS)}.")
+    page, action_row, condition_row, empty, escape, _ = FORMATS[fmt]
+
+    action_rows = []
+    for rank, entry in enumerate(actions, start=1):
+        category = action_category(entry[1])
+        action_rows.append(action_row.substitute(
+            rank=rank,
+            priority=f"{entry[0]:.1f}",
+            category=escape(category),
+            css=category.lower().replace(" ", "-"),
+            action=escape(entry[1]),
+            rule=escape(entry[2] if len(entry) > 2 and entry[2] else "-"),
+        ))
+    condition_rows = [
+        condition_row.substitute(field=escape(name.replace("_", " ")), value=escape(str(value)))
+        for name, value in observed_conditions(inputs or {})
+    ]
+
+    return page.substitute(
+        building_id=escape(str(building_id)),
+        engine_version=escape(ENGINE_VERSION),
+        generated=escape(generated or time.strftime("%Y-%m-%d")),
+        actions="".join(action_rows) or empty.substitute(columns=5, message="No actions triggered."),
+        conditions="".join(condition_rows) or empty.substitute(columns=2, message="All fields at their defaults."),
+    )
+
+
+def report_filename(building_id, fmt="html", taken=None):
+    """
+    Returns a file name for a building's report that is safe on every file system.
+
+    Characters outside [A-Za-z0-9._-] are replaced by "_", and the name then ends in
+    a short hash of the raw ID, so that IDs such as "A/1" and "A_1" stay apart.
+
+    Args:
+        building_id (str): Identifier of the building.
+        fmt (str): "html" or "text".
+        taken (set, optional): Names already used in the same directory or archive, case-folded.
+            A name found there, e.g. "a1" after "A1" on a case-insensitive file system,
+            gets the hash suffix and if needed a counter, and the result is added to it.
+
+    Returns:
+        str: The file name.
+    """
+    raw = str(building_id)
+    stem = re.sub(r"[^A-Za-z0-9._-]", "_", raw)
+    suffix = "-" + hashlib.sha256(raw.encode()).hexdigest()[:8]
+    if stem != raw:
+        stem += suffix
+    if taken is not None:
+        if stem.casefold() in taken and not stem.endswith(suffix):
+            stem += suffix
+        base, counter = stem, 2
+        while stem.casefold() in taken:
+            stem = f"{base}-{counter}"
+            counter += 1
+        taken.add(stem.casefold())
+    return stem + FORMATS[fmt][-1]
+
+
+### Output Sinks ###
+
+class DirectorySink:
+    """Writes each report to its own file in a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, filename, content):
+        with open(os.path.join(self.path, filename), "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def close(self):
+        pass
+
+
+class ZipSink:
+    """Appends each report to a compressed zip archive as it arrives."""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, filename, content):
+        self.archive.writestr(filename, content)
+
+    def close(self):
+        self.archive.close()
+
+
+### Bulk Rendering ###
+
+def _render_record(fmt, generated, record):
+    building_id, inputs, actions = record
+    return building_id, render_report(building_id, actions, inputs, fmt, generated)
+
+
+def render_reports(records, output, fmt="html", processes=None, chunk_size=100, window=5000, generated=None):
+    """
+    Renders recommendation sheets for many buildings and streams them to disk.
+
+    Records are rendered on a process pool and written one by one as they come back,
+    in input order. At most `window` records are in flight at a time, so memory stays
+    flat however many buildings are rendered, apart from the set of file names used,
+    which keeps distinct buildings from overwriting each other's sheets.
+
+    Args:
+        records (iterable): (building_id, inputs, actions) tuples, e.g. from
+            `AssessmentStore.iter_assessments()`; inputs may be None.
+        output (str): Directory to write to, or a path ending in ".zip" for a single archive.
+        fmt (str): "html" or "text".
+        processes (int, optional): Worker processes; defaults to the CPU count. 1 renders in this process.
+        chunk_size (int): Records sent to a worker per task.
+        window (int): Maximum number of records in flight.
+        generated (str, optional): Generation date shown on every sheet; defaults to today.
+
+    Returns:
+        dict: Number of reports, bytes written, elapsed seconds and reports per second.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format '{fmt}'; expected one of {sorted(FORMATS)}.")
+    render = functools.partial(_render_record, fmt, generated or time.strftime("%Y-%m-%d"))
+    processes = processes or os.cpu_count()
+    sink = ZipSink(output) if output.endswith(".zip") else DirectorySink(output)
+    pool = Pool(processes) if processes > 1 else None
+
+    reports = 0
+    written = 0
+    taken = set()
+    start = time.perf_counter()
+    iterator = iter(records)
+    try:
+        while True:
+            batch = list(islice(iterator, window))
+            if not batch:
+                break
+            rendered = pool.imap(render, batch, chunksize=chunk_size) if pool is not None else map(render, batch)
+            for building_id, content in rendered:
+                sink.write(report_filename(building_id, fmt, taken), content)
+                reports += 1
+                written += len(content)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "reports": reports,
+        "bytes": written,
+        "seconds": elapsed,
+        "reports_per_second": reports / elapsed if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render per-building recommendation sheets from an assessment store.")
+    parser.add_argument("--store", required=True, help="SQLite file written by AssessmentStore.")
+    parser.add_argument("--out", required=True, help="Output directory, or a .zip archive.")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="html", help="Report format.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes.")
+    args = parser.parse_args()
+
+    from building_assessment_store import AssessmentStore
+    with AssessmentStore(args.store) as store:
+        stats = render_reports(store.iter_assessments(), args.out, fmt=args.format, processes=args.processes)
+
+    print(f"Reports:      {stats['reports']}")
+    print(f"Written:      {stats['bytes'] / 1e6:.1f} MB")
+    print(f"Elapsed:      {stats['seconds']:.1f} s")
+    print(f"Throughput:   {stats['reports_per_second']:.0f} reports/s")
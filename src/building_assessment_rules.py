@@ -0,0 +1,294 @@
+from collections import namedtuple
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import skfuzzy as fuzz
+import numpy as np
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule_definitions.json")
+
+# Per-user cache for compiled artifacts; a shared directory such as /tmp would let other users plant them
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                                 "building_assessment")
+
+# Bump when the compiled layout changes so stale cached artifacts are not reused
+COMPILER_VERSION = 3
+
+RuleDefinition = namedtuple("RuleDefinition", ["name", "description", "thresholds", "actions", "max_priority"])
+
+
+def action_category(action):
+    """
+    Extracts the category prefix of an action string.
+
+    Args:
+        action (str): Action such as "Critical: Flood protection measures required."
+
+    Returns:
+        str: The category (e.g. "Critical", "High Priority"), or "Other" if the action has no prefix.
+    """
+    category, separator, _ = action.partition(":")
+    return category.strip() if separator else "Other"
+
+
+class CompiledRuleSet:
+    """
+    Rule definitions compiled into lookup structures used by the engine.
+
+    Attributes:
+        definitions (dict): Parsed source definitions.
+        content_hash (str): SHA-256 of the source definitions and compiler version, see `rules_hash`.
+        priority_map (dict): Base priority per action.
+        default_priority (float): Priority of actions missing from `priority_map`.
+        crack_severity (dict): Numeric severity per crack class.
+        rules (dict): `RuleDefinition` per rule name.
+        fuzzy_ranges (dict): Universe array per fuzzy variable.
+        fuzzy_sets (dict): Membership arrays per (variable, set) pair.
+        fuzzy_inference (dict): Inputs, output, grid and rules of the Mamdani inference, or None.
+        action_rules (dict): Rule names that can declare each action.
+        category_actions (dict): Known actions per action category.
+    """
+
+    def __init__(self, definitions, content_hash, memberships=None):
+        """
+        Args:
+            definitions (dict): Parsed rule definitions.
+            content_hash (str): Hash identifying the definitions, see `rules_hash`.
+            memberships (dict, optional): Membership lists per "variable.set", as cached by
+                `to_json`; computed from the definitions if omitted.
+        """
+        self.definitions = definitions
+        self.content_hash = content_hash
+        self.version = definitions.get("version", 1)
+        self.default_priority = definitions.get("default_priority", 50)
+        self.priority_map = dict(definitions["priorities"])
+        self.crack_severity = dict(definitions["crack_severity"])
+
+        self.fuzzy_ranges = {}
+        self.fuzzy_sets = {}
+        for variable, spec in definitions.get("fuzzy_sets", {}).items():
+            start, stop, step = spec["range"]
+            universe = np.arange(start, stop + step / 2, step)
+            self.fuzzy_ranges[variable] = universe
+            for set_name, points in spec["sets"].items():
+                cached = memberships.get(f"{variable}.{set_name}") if memberships is not None else None
+                self.fuzzy_sets[(variable, set_name)] = (np.array(cached, dtype=float) if cached is not None
+                                                         else fuzz.trimf(universe, points))
+
+        self.fuzzy_inference = definitions.get("fuzzy_inference")
+        if self.fuzzy_inference is not None:
+            for rule in self.fuzzy_inference["rules"]:
+                for variable, set_name in list(rule["if"].items()) + [(self.fuzzy_inference["output"], rule["then"])]:
+                    if (variable, set_name) not in self.fuzzy_sets:
+                        raise ValueError(f"Fuzzy inference rule {rule} uses unknown set '{variable}.{set_name}'.")
+
+        self.rules = {}
+        self.action_rules = {}
+        self.category_actions = {}
+        for name, spec in definitions["rules"].items():
+            actions = dict(spec.get("actions", {}))
+            if not actions:
+                raise ValueError(f"Rule '{name}' does not define any actions.")
+            thresholds = dict(spec.get("thresholds", {}))
+            for key, value in thresholds.items():
+                if not isinstance(value, (int, float)):
+                    raise ValueError(f"Threshold '{key}' of rule '{name}' must be numeric, got {value!r}.")
+            max_priority = max(self.base_priority(action) for action in actions.values())
+            self.rules[name] = RuleDefinition(name, spec.get("description", ""), thresholds, actions, max_priority)
+            for action in actions.values():
+                self.action_rules.setdefault(action, []).append(name)
+
+        for action in list(self.priority_map) + list(self.action_rules):
+            actions = self.category_actions.setdefault(action_category(action), [])
+            if action not in actions:
+                actions.append(action)
+
+    def base_priority(self, action):
+        """Returns the base priority of an action, falling back to the default priority."""
+        return self.priority_map.get(action, self.default_priority)
+
+    def to_json(self):
+        """Serializes the definitions and computed membership functions, for the on-disk cache."""
+        return json.dumps({
+            "compiler_version": COMPILER_VERSION,
+            "content_hash": self.content_hash,
+            "definitions": self.definitions,
+            "memberships": {f"{variable}.{set_name}": values.tolist()
+                            for (variable, set_name), values in self.fuzzy_sets.items()},
+        }, separators=(",", ":"))
+
+
+def rules_hash(source_bytes):
+    """Returns the content hash identifying rule definitions compiled by this compiler version."""
+    return hashlib.sha256(source_bytes + f"compiler-{COMPILER_VERSION}".encode()).hexdigest()
+
+
+def compile_rules(source_bytes, content_hash=None):
+    """
+    Compiles raw JSON rule definitions.
+
+    Args:
+        source_bytes (bytes): Contents of a rule definition file.
+        content_hash (str, optional): Precomputed `rules_hash` of `source_bytes`.
+
+    Returns:
+        CompiledRuleSet: The compiled rule set.
+    """
+    if content_hash is None:
+        content_hash = rules_hash(source_bytes)
+    return CompiledRuleSet(json.loads(source_bytes), content_hash)
+
+
+### Artifact Cache ###
+
+def _owned(stat):
+    """Returns whether a file belongs to the current user and no one else can write to it."""
+    if not hasattr(os, "getuid"):
+        return True  # No POSIX ownership, e.g. on Windows, where the user profile is private already
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def private_cache_dir(cache_dir):
+    """
+    Creates a cache directory only the current user can access, or checks an existing one.
+
+    Cached artifacts are trusted by their loaders, so a directory that another user
+    owns or can write to is refused rather than read from.
+
+    Args:
+        cache_dir (str): Cache directory.
+
+    Returns:
+        bool: Whether the directory can be used.
+    """
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        return _owned(os.stat(cache_dir))
+    except OSError:
+        return False
+
+
+def read_cached(cache_dir, name):
+    """
+    Reads a cached artifact if it and its directory belong to the current user.
+
+    Args:
+        cache_dir (str): Cache directory.
+        name (str): File name within the directory.
+
+    Returns:
+        bytes or None: The contents, or None if the file is missing or not trusted.
+    """
+    if not private_cache_dir(cache_dir):
+        return None
+    try:
+        with open(os.path.join(cache_dir, name), "rb") as f:
+            if not _owned(os.fstat(f.fileno())):
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cached(cache_dir, name, data):
+    """
+    Atomically writes a cached artifact, readable by the current user only.
+
+    Caching is an optimization, so failures, e.g. on a read-only filesystem, are ignored.
+
+    Args:
+        cache_dir (str): Cache directory.
+        name (str): File name within the directory.
+        data (bytes): Contents.
+    """
+    if not private_cache_dir(cache_dir):
+        return
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")  # Created with mode 0600
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(cache_dir, name))  # Atomic, so concurrent loaders never see a partial file
+    except OSError:
+        pass
+
+
+def load_rules(path=DEFAULT_RULES_PATH, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Loads rule definitions, reusing a compiled artifact cached on disk when available.
+
+    Compiled sets are cached as JSON in `<cache_dir>/rules-<content hash>.json`, so an
+    unchanged definition file is only compiled once across processes and reloads.
+    Only files in a directory private to the current user are read.
+
+    Args:
+        path (str): Path to the JSON rule definition file.
+        cache_dir (str or None): Directory for compiled artifacts; None disables caching.
+
+    Returns:
+        CompiledRuleSet: The compiled rule set.
+    """
+    with open(path, "rb") as f:
+        source_bytes = f.read()
+    content_hash = rules_hash(source_bytes)
+
+    if cache_dir is None:
+        return compile_rules(source_bytes, content_hash)
+
+    name = f"rules-{content_hash}.json"
+    cached = read_cached(cache_dir, name)
+    if cached is not None:
+        try:
+            artifact = json.loads(cached)
+            if artifact["compiler_version"] == COMPILER_VERSION and artifact["content_hash"] == content_hash:
+                return CompiledRuleSet(artifact["definitions"], content_hash, artifact["memberships"])
+        except (ValueError, KeyError, TypeError):
+            pass  # Corrupt artifact; compiled again and overwritten below
+
+    ruleset = compile_rules(source_bytes, content_hash)
+    write_cached(cache_dir, name, ruleset.to_json().encode())
+    return ruleset
+
+
+### Active Rule Set ###
+
+_active_ruleset = None
+_active_path = DEFAULT_RULES_PATH
+_reload_lock = threading.Lock()
+
+
+def get_active_rules():
+    """
+    Returns the rule set currently used by engines that were not given one explicitly.
+
+    Loads the default definitions on first use.
+    """
+    ruleset = _active_ruleset
+    if ruleset is None:
+        ruleset = reload_rules(_active_path)
+    return ruleset
+
+
+def reload_rules(path=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Loads rule definitions and atomically makes them the active rule set.
+
+    The new set is fully compiled before it replaces the old one, so an invalid file
+    leaves the active set untouched. Engines pick the active set up at the start of
+    each `run()`; assessments already running finish with the set they started with.
+
+    Args:
+        path (str, optional): Definition file to load; defaults to the last loaded path.
+        cache_dir (str or None): Directory for compiled artifacts.
+
+    Returns:
+        CompiledRuleSet: The newly active rule set.
+    """
+    global _active_ruleset, _active_path
+    with _reload_lock:
+        path = path or _active_path
+        ruleset = load_rules(path, cache_dir)
+        _active_ruleset, _active_path = ruleset, path
+    return ruleset
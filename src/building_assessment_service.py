@@ -0,0 +1,255 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import os
+import threading
+import weakref
+
+from experta import Fact
+
+from building_assessment_ES import ENGINE_VERSION, BuildingAssessmentExpertSystem
+from building_assessment_metrics import REGISTRY
+from building_assessment_sparse import SparseMatcher
+from building_assessment_warm import take_engine
+
+RankedAction = namedtuple("RankedAction", ["priority", "action", "rule"])
+
+ASSESSMENTS = REGISTRY.counter("building_assessment_assessments", "Buildings assessed.")
+
+# Live assessors, read by the gauges below when metrics are collected
+_assessors = weakref.WeakSet()
+
+
+def _pool_utilization():
+    assessors = list(_assessors)
+    size = sum(assessor.pool_size() for assessor in assessors)
+    return sum(assessor.busy_workers() for assessor in assessors) / size if size else 0.0
+
+
+REGISTRY.gauge("building_assessment_queue_depth", "Buildings waiting for a pool thread.",
+               lambda: sum(assessor.queue_depth() for assessor in list(_assessors)))
+REGISTRY.gauge("building_assessment_pool_utilization", "Share of pool threads currently assessing a building.",
+               _pool_utilization)
+REGISTRY.gauge("building_assessment_engines", "Per-thread engines built by live assessors.",
+               lambda: sum(assessor.engine_count for assessor in list(_assessors)))
+
+
+class AssessmentResult(namedtuple("AssessmentResult", ["building_id", "actions", "engine_version", "ruleset_hash"])):
+    """
+    Immutable outcome of assessing one building.
+
+    Attributes:
+        building_id (str or None): Identifier of the building, if one was given.
+        actions (tuple): `RankedAction` entries, highest priority first.
+        engine_version (str): Version of the engine that produced the result.
+        ruleset_hash (str): Content hash of the rule definitions used.
+    """
+    __slots__ = ()
+
+    @property
+    def top_priority(self):
+        """Highest action priority, or 0.0 if no action was triggered."""
+        return self.actions[0].priority if self.actions else 0.0
+
+    def top(self, n=5):
+        """Returns the top `n` actions."""
+        return self.actions[:n]
+
+
+def split_record(record):
+    """
+    Splits an input record into (building_id, fact).
+
+    Args:
+        record (BuildingAssessment or tuple): A fact, or a (building_id, fact) pair.
+
+    Returns:
+        tuple: (building_id or None, fact).
+    """
+    if isinstance(record, Fact):
+        return None, record
+    building_id, fact = record
+    return building_id, fact
+
+
+class ConcurrentAssessor:
+    """
+    Thread-safe facade over the expert system.
+
+    Each worker thread keeps its own warm `BuildingAssessmentExpertSystem`, which is
+    reset between buildings instead of being rebuilt, and every call returns a new
+    immutable `AssessmentResult` rather than exposing the engine's mutable lists.
+    One assessor can therefore be shared by all Streamlit sessions or batch workers.
+    """
+
+    def __init__(self, ruleset=None, max_workers=None, sparse=False):
+        """
+        Args:
+            ruleset (CompiledRuleSet, optional): Pin all engines to these rule definitions.
+            max_workers (int, optional): Thread pool size used by `assess_many`.
+            sparse (bool): Only evaluate the rules whose fields are set for each building
+                (see `SparseMatcher`); results are identical.
+        """
+        self.ruleset = ruleset
+        self.max_workers = max_workers
+        self.sparse = sparse
+        self._sparse_matchers = []
+        self._local = threading.local()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._pool_size = 0  # Threads of the running pool, fixed when it is created
+        self._queued = 0  # Buildings submitted to the pool and not yet started or cancelled
+        self._busy = {}  # Pool thread ident -> whether it is assessing; each thread writes only its own key
+        self.engine_count = 0
+        _assessors.add(self)
+
+    def engine(self):
+        """Returns the calling thread's engine, building it on first use or claiming one inherited from `warm_start`."""
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = take_engine(self.ruleset)
+            if engine is None:
+                engine = BuildingAssessmentExpertSystem(self.ruleset)
+            if self.sparse:
+                engine.matcher = SparseMatcher(engine)
+            with self._executor_lock:
+                self.engine_count += 1
+                if self.sparse:
+                    self._sparse_matchers.append(engine.matcher)
+            self._local.engine = engine
+        return engine
+
+    def assess(self, fact, building_id=None, top_n=None):
+        """
+        Assesses one building on the calling thread's engine.
+
+        Args:
+            fact (BuildingAssessment): Input fact for the building.
+            building_id (str, optional): Identifier carried into the result.
+            top_n (int, optional): Only the top `top_n` actions are needed; enables early termination.
+
+        Returns:
+            AssessmentResult: The ranked actions.
+        """
+        engine = self.engine()
+        if self.sparse:
+            engine.matcher.select(fact)
+        engine.reset()
+        engine.reset_actions()
+        if engine.trace is not None:
+            engine.trace.begin(building_id)
+        engine.declare(fact)
+        engine.run(top_n=top_n)
+
+        ASSESSMENTS.inc()
+
+        ranked = engine.get_ranked_actions()
+        if top_n is not None:
+            ranked = ranked[:top_n]
+        return AssessmentResult(
+            building_id,
+            tuple(RankedAction(*entry) for entry in ranked),
+            ENGINE_VERSION,
+            engine.ruleset.content_hash
+        )
+
+    def sparse_report(self):
+        """
+        Returns the share of rule evaluations skipped by sparse activation, over all threads.
+
+        Returns:
+            dict: Assessments, evaluated and skipped rule counts, and the skipped percentage.
+        """
+        with self._executor_lock:
+            reports = [matcher.report() for matcher in self._sparse_matchers]
+        assessments = sum(report["assessments"] for report in reports)
+        evaluated = sum(report["rules_evaluated"] for report in reports)
+        skipped = sum(report["rules_skipped"] for report in reports)
+        return {
+            "assessments": assessments,
+            "rules_evaluated": evaluated,
+            "rules_skipped": skipped,
+            "skipped_percent": 100.0 * skipped / (evaluated + skipped) if evaluated + skipped else 0.0,
+        }
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # Resolved here with ThreadPoolExecutor's own default, so the gauges need not read the pool
+                self._pool_size = self.max_workers or min(32, (os.cpu_count() or 1) + 4)
+                self._executor = ThreadPoolExecutor(max_workers=self._pool_size, thread_name_prefix="assessor")
+            return self._executor
+
+    def assess_many(self, records, top_n=None, chunk_size=1000):
+        """
+        Assesses many buildings on the thread pool.
+
+        Records are submitted in chunks of `chunk_size`, so arbitrarily long iterables
+        are processed with bounded memory.
+
+        Args:
+            records (iterable): Facts, or (building_id, fact) pairs.
+            top_n (int, optional): Only the top `top_n` actions are needed per building.
+            chunk_size (int): Number of records in flight at once.
+
+        Returns:
+            list: `AssessmentResult` per record, in input order.
+        """
+        return list(self.iter_assess(records, top_n=top_n, chunk_size=chunk_size))
+
+    def iter_assess(self, records, top_n=None, chunk_size=1000):
+        """Like `assess_many`, but yields results lazily in input order."""
+        pool = self._pool()
+        iterator = iter(records)
+
+        def assess_record(record):
+            building_id, fact = split_record(record)
+            thread = threading.get_ident()
+            with self._executor_lock:
+                self._queued -= 1
+            self._busy[thread] = True
+            try:
+                return self.assess(fact, building_id=building_id, top_n=top_n)
+            finally:
+                self._busy[thread] = False
+
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            with self._executor_lock:
+                self._queued += len(chunk)
+            futures = [pool.submit(assess_record, record) for record in chunk]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                # Records still queued when the caller stops iterating never start
+                cancelled = sum(future.cancel() for future in futures)
+                with self._executor_lock:
+                    self._queued -= cancelled
+
+    def queue_depth(self):
+        """Returns the number of buildings submitted to the pool and not yet started."""
+        return self._queued
+
+    def pool_size(self):
+        """Returns the maximum number of pool threads, or 0 before the pool is started."""
+        return self._pool_size
+
+    def busy_workers(self):
+        """Returns the number of pool threads currently assessing a building."""
+        return sum(self._busy.copy().values())
+
+    def close(self):
+        """Shuts down the thread pool."""
+        with self._executor_lock:
+            executor, self._executor, self._pool_size = self._executor, None, 0
+        if executor is not None:
+            executor.shutdown()  # Outside the lock, which workers still finishing may need
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,229 @@
+from experta import Fact
+from experta.abstract import Matcher
+from experta.conditionalelement import NOT, TEST, ConditionalElement
+from experta.matchers import ReteMatcher
+from experta.matchers.rete.utils import extract_facts, prepare_rule
+
+from building_assessment_ES import (DERIVED_SOURCES, BuildingAssessment, BuildingAssessmentExpertSystem,
+                                    DerivedFeatures, ExplanationTrace)
+from building_assessment_rules import get_active_rules
+
+
+### Static Analysis ###
+
+def _pattern_fields(element, negated=False):
+    """
+    Collects the BuildingAssessment fields read by one conditional element.
+
+    Returns:
+        set or None: Field names, or None if the element can read facts the analysis
+        cannot attribute to BuildingAssessment fields.
+    """
+    if isinstance(element, Fact):
+        if any(isinstance(key, str) and key.startswith("__") for key in element):
+            return None  # Binds the whole fact, so the rule may read any field
+        if type(element) is BuildingAssessment:
+            return {key for key in element}
+        if type(element) is DerivedFeatures:
+            fields = set()
+            for key in element:
+                if key not in DERIVED_SOURCES:
+                    return None
+                fields.update(DERIVED_SOURCES[key])
+            return fields
+        # Other fact types are never declared from an assessment; a negated pattern on them
+        # can only block the rule, but a positive one could make it fire
+        return set() if negated else None
+    if isinstance(element, TEST):
+        return set()
+    if isinstance(element, ConditionalElement):
+        fields = set()
+        for child in element:
+            child_fields = _pattern_fields(child, negated or isinstance(element, NOT))
+            if child_fields is None:
+                return None
+            fields |= child_fields
+        return fields
+    return None
+
+
+def rule_fields(rule):
+    """
+    Statically maps a rule's patterns to the BuildingAssessment fields they read.
+
+    DerivedFeatures patterns count as reading the fields their features are derived from.
+
+    Args:
+        rule (experta.Rule): A rule of the engine.
+
+    Returns:
+        frozenset or None: Field names, or None if the rule must always be evaluated.
+    """
+    fields = set()
+    for element in rule:
+        element_fields = _pattern_fields(element)
+        if element_fields is None:
+            return None
+        fields |= element_fields
+    return frozenset(fields)
+
+
+def active_fields(*facts):
+    """Returns the fields of the given facts whose values differ from their defaults."""
+    fields = set()
+    for fact in facts:
+        schema = type(fact).__fields__
+        for name, value in fact.items():
+            if not isinstance(name, str) or name.startswith("__"):
+                continue
+            field = schema.get(name)
+            if field is None or value != field.default:  # Fields outside the schema have no default
+                fields.add(name)
+    return fields
+
+
+def inert_rules(ruleset, engine_class=BuildingAssessmentExpertSystem):
+    """
+    Finds the rules that do nothing for a building with every field at its default.
+
+    Runs the engine on a default BuildingAssessment with tracing on; rules that
+    declare an action or retract a fact there are not inert.
+
+    Args:
+        ruleset (CompiledRuleSet): Rule definitions the thresholds come from.
+        engine_class (type): Engine whose rules are probed.
+
+    Returns:
+        set: Names of the inert rules.
+    """
+    engine = engine_class(ruleset)
+    engine.trace = ExplanationTrace()
+    engine.reset()
+    engine.reset_actions()
+    engine.declare(BuildingAssessment())
+    engine.run()
+    effective = {entry["rule"] for entry in engine.trace.entries}
+    return {rule._wrapped.__name__ for rule in engine.get_rules()} - effective
+
+
+### Sparse Activation ###
+
+class RuleSubsetMatcher(ReteMatcher):
+    """RETE network built from a subset of the engine's rules."""
+
+    def __init__(self, engine, rules):
+        self.rules = rules
+        self.fact_types = set()  # Fact types the rules' patterns can match
+        super().__init__(engine)
+        self._conflict_set_nodes = super()._get_conflict_set_nodes()
+
+    def build_network(self):
+        ruleset = {prepare_rule(rule) for rule in self.rules}
+        for rule in ruleset:
+            self.fact_types.update(type(pattern) for pattern in extract_facts(rule))
+        alpha_terminals = self.build_alpha_part(ruleset, self.root_node)
+        self.build_beta_part(ruleset, alpha_terminals)
+
+    def relevant(self, facts):
+        """Returns the facts of types this network's patterns can match."""
+        return [fact for fact in facts if type(fact) in self.fact_types]
+
+    def _get_conflict_set_nodes(self):
+        # The base class caches only one matcher's nodes, which thrashes across several networks
+        return self._conflict_set_nodes
+
+
+class SparseMatcher(Matcher):
+    """
+    Matcher that splits the engine's rules into one RETE network per field signature
+    and passes working memory changes only to the networks selected for the building.
+
+    A rule is skippable when it reads only BuildingAssessment fields (see `rule_fields`)
+    and is inert on an all-default building (see `inert_rules`). Its network is skipped
+    when none of those fields differs from its default: the rule would match exactly as
+    in the default probe and do nothing, so the output is unchanged while its patterns
+    are neither matched nor reset. All other rules share one network that always runs.
+    """
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.rules = list(engine.get_rules())
+        self.fields = {rule._wrapped.__name__: rule_fields(rule) for rule in self.rules}
+        self.assessments = 0
+        self.rules_evaluated = 0
+        self.rules_skipped = 0
+        self.build_networks(engine.pinned_ruleset or get_active_rules())
+
+    def build_networks(self, ruleset):
+        """Probes the rule set for inert rules and builds the networks; rebuilt when thresholds change."""
+        inert = inert_rules(ruleset, type(self.engine))
+        always, groups = [], {}
+        for rule in self.rules:
+            fields = self.fields[rule._wrapped.__name__]
+            if fields is None or rule._wrapped.__name__ not in inert:
+                always.append(rule)
+            else:
+                groups.setdefault(fields, []).append(rule)
+
+        self.always = RuleSubsetMatcher(self.engine, always)  # Rules evaluated for every building
+        self.skippable = {fields: RuleSubsetMatcher(self.engine, rules) for fields, rules in groups.items()}
+        self.active = [self.always] + list(self.skippable.values())  # Every rule until `select` narrows it
+        self.touched = set()
+        self.ruleset_hash = ruleset.content_hash
+
+    def select(self, *facts):
+        """
+        Selects the networks for the given facts; call before every `engine.reset()`.
+
+        Args:
+            *facts (BuildingAssessment): Facts about to be declared.
+        """
+        ruleset = self.engine.pinned_ruleset or get_active_rules()
+        if ruleset.content_hash != self.ruleset_hash:
+            self.build_networks(ruleset)
+
+        present = active_fields(*facts)
+        self.active = [self.always]
+        skipped = 0
+        for fields, network in self.skippable.items():
+            if fields & present:
+                self.active.append(network)
+            else:
+                skipped += len(network.rules)
+
+        self.assessments += 1
+        self.rules_skipped += skipped
+        self.rules_evaluated += len(self.rules) - skipped
+
+    def changes(self, adding=None, deleting=None):
+        added, removed = [], []
+        for network in self.active:
+            network_adding = network.relevant(adding or ())
+            network_deleting = network.relevant(deleting or ())
+            if not network_adding and not network_deleting:
+                continue  # Activations only change when matching facts do
+            self.touched.add(network)
+            network_added, network_removed = network.changes(network_adding, network_deleting)
+            added.extend(network_added)
+            removed.extend(network_removed)
+        return added, removed
+
+    def reset(self):
+        for network in self.touched:
+            network.reset()
+        self.touched = set()
+
+    def report(self):
+        """
+        Returns how many rule evaluations were skipped.
+
+        Returns:
+            dict: Assessments, evaluated and skipped rule counts, and the skipped percentage.
+        """
+        total = self.rules_evaluated + self.rules_skipped
+        return {
+            "assessments": self.assessments,
+            "rules_evaluated": self.rules_evaluated,
+            "rules_skipped": self.rules_skipped,
+            "skipped_percent": 100.0 * self.rules_skipped / total if total else 0.0,
+        }
@@ -0,0 +1,401 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+from experta import Field
+
+from building_assessment_ES import ENGINE_VERSION
+from building_assessment_rules import action_category
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    building_id TEXT PRIMARY KEY,
+    engine_version TEXT NOT NULL,
+    assessed_at REAL NOT NULL,
+    inputs TEXT NOT NULL,
+    input_hash TEXT,
+    ruleset_hash TEXT,
+    top_n INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS actions (
+    building_id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    priority REAL NOT NULL,
+    action TEXT NOT NULL,
+    category TEXT NOT NULL,
+    rule TEXT,
+    PRIMARY KEY (building_id, rank)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ingested_files (
+    file_hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS locations (
+    building_id TEXT PRIMARY KEY,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_actions_category_priority ON actions (category, priority DESC, building_id);
+CREATE INDEX IF NOT EXISTS idx_actions_action_priority ON actions (action, priority DESC, building_id);
+CREATE INDEX IF NOT EXISTS idx_actions_rule ON actions (rule, building_id);
+"""
+
+# Columns added after the first release, with their types, for migrating older databases
+MIGRATED_COLUMNS = {"assessments": [("input_hash", "TEXT"), ("ruleset_hash", "TEXT"), ("top_n", "INTEGER")]}
+
+
+# Effective default of every schema field, per fact class
+_field_defaults = {}
+
+
+def canonical_inputs(fact):
+    """
+    Returns a canonical JSON encoding of a fact's inputs.
+
+    Fields set to their default are omitted, so a field left at its default and the
+    same field set explicitly to the default encode identically.
+
+    Args:
+        fact (BuildingAssessment): The input fact.
+
+    Returns:
+        str: JSON with sorted keys and no insignificant whitespace.
+    """
+    defaults = _field_defaults.get(type(fact))
+    if defaults is None:
+        defaults = {name: field.default for name, field in fact.__fields__.items() if field.default is not Field.NODEFAULT}
+        _field_defaults[type(fact)] = defaults
+    missing = object()
+    values = {name: value for name, value in fact.as_dict().items() if defaults.get(name, missing) != value}
+    return json.dumps(values, sort_keys=True, separators=(",", ":"))
+
+
+def input_hash(fact):
+    """Returns the SHA-256 content hash of a fact's canonical inputs."""
+    return hashlib.sha256(canonical_inputs(fact).encode()).hexdigest()
+
+
+class AssessmentStore:
+    """
+    SQLite-backed store for building assessments and their ranked actions.
+
+    Each building keeps its latest assessment: saving a building again replaces its
+    inputs and actions. Writes are grouped into transactions of `batch_size` buildings.
+    """
+
+    def __init__(self, path="assessments.db", batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        for table, columns in MIGRATED_COLUMNS.items():
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            for name, column_type in columns:
+                if name not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+        self.connection.commit()
+
+    def close(self):
+        """Closes the underlying database connection."""
+        self.connection.close()
+
+    def sync(self):
+        """
+        Makes every committed write durable.
+
+        With `synchronous=NORMAL`, commits survive a crash of this process but the last
+        ones can be lost on power failure until the write-ahead log is checkpointed,
+        which syncs it to disk.
+        """
+        self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    ### Writes ###
+
+    def save(self, building_id, fact, actions):
+        """
+        Saves a single building assessment.
+
+        Args:
+            building_id (str): Identifier of the building.
+            fact (BuildingAssessment): The assessed input fact.
+            actions (list): Ranked (priority, action, rule_name) tuples, e.g. from `get_ranked_actions()`.
+        """
+        self.save_many([(building_id, fact, actions)])
+
+    def save_many(self, records):
+        """
+        Bulk-saves building assessments, committing one transaction per batch.
+
+        Args:
+            records (iterable): (building_id, fact, actions), (building_id, fact, actions,
+                ruleset_hash) or (building_id, fact, actions, ruleset_hash, top_n) tuples,
+                with the `top_n` the actions were limited to, if any. Actions are
+                (priority, action) or (priority, action, rule_name) tuples.
+
+        Returns:
+            int: Number of buildings saved.
+        """
+        saved = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                saved += self._write_batch(batch)
+                batch = []
+        if batch:
+            saved += self._write_batch(batch)
+        return saved
+
+    def _write_batch(self, batch):
+        assessed_at = time.time()
+        assessment_rows = []
+        action_rows = []
+        for record in batch:
+            building_id, fact, actions = record[:3]
+            ruleset_hash = record[3] if len(record) > 3 else None
+            top_n = record[4] if len(record) > 4 else None
+            if top_n is not None and len(actions) < top_n:
+                top_n = None  # Fewer actions than the limit, so the ranking is complete
+            building_id = str(building_id)
+            assessment_rows.append((building_id, ENGINE_VERSION, assessed_at, json.dumps(fact.as_dict(), sort_keys=True),
+                                    input_hash(fact), ruleset_hash, top_n))
+            ranked = sorted(actions, reverse=True, key=lambda x: x[0])
+            for rank, entry in enumerate(ranked):
+                priority, action = entry[0], entry[1]
+                rule = entry[2] if len(entry) > 2 else None
+                action_rows.append((building_id, rank, float(priority), action, action_category(action), rule))
+
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM actions WHERE building_id = ?", ((row[0],) for row in assessment_rows)
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO assessments "
+                "(building_id, engine_version, assessed_at, inputs, input_hash, ruleset_hash, top_n) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                assessment_rows
+            )
+            self.connection.executemany(
+                "INSERT INTO actions (building_id, rank, priority, action, category, rule) VALUES (?, ?, ?, ?, ?, ?)",
+                action_rows
+            )
+        return len(assessment_rows)
+
+    def save_locations(self, locations):
+        """
+        Saves or replaces building locations, for the map.
+
+        Args:
+            locations (iterable): (building_id, latitude, longitude) tuples.
+
+        Returns:
+            int: Number of locations saved.
+        """
+        rows = [(str(building_id), float(latitude), float(longitude)) for building_id, latitude, longitude in locations]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO locations (building_id, latitude, longitude) VALUES (?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def mark_ingested(self, file_hash, name, records):
+        """
+        Records that an input file has been fully assessed and saved.
+
+        Args:
+            file_hash (str): Content hash of the file.
+            name (str): File name, for reference.
+            records (int): Number of records read from the file.
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO ingested_files (file_hash, name, records, ingested_at) VALUES (?, ?, ?, ?)",
+                (file_hash, name, records, time.time())
+            )
+
+    ### Queries ###
+
+    def is_ingested(self, file_hash):
+        """Returns whether a file with this content hash was already ingested."""
+        return self.connection.execute(
+            "SELECT 1 FROM ingested_files WHERE file_hash = ?", (file_hash,)
+        ).fetchone() is not None
+
+    def top_buildings(self, category="Critical", limit=500):
+        """
+        Returns the buildings with the highest priority action in a category.
+
+        Walks the (category, priority) index in descending order and stops as soon as
+        `limit` distinct buildings are found, so the cost does not grow with the table.
+
+        Args:
+            category (str): Action category, e.g. "Critical" or "High Priority".
+            limit (int): Maximum number of buildings to return.
+
+        Returns:
+            list: (building_id, priority) tuples, highest priority first.
+        """
+        cursor = self.connection.execute(
+            "SELECT building_id, priority FROM actions WHERE category = ? ORDER BY priority DESC",
+            (category,)
+        )
+        seen = set()
+        results = []
+        for building_id, priority in cursor:
+            if building_id in seen:
+                continue
+            seen.add(building_id)
+            results.append((building_id, priority))
+            if len(results) >= limit:
+                break
+        cursor.close()
+        return results
+
+    def buildings_triggering(self, rule):
+        """
+        Returns all buildings where the given rule declared at least one action.
+
+        Args:
+            rule (str): Rule name, e.g. "landslide_risk_rule".
+
+        Returns:
+            list: Building IDs.
+        """
+        rows = self.connection.execute(
+            "SELECT DISTINCT building_id FROM actions WHERE rule = ?", (rule,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def buildings_with_action(self, action, min_priority=0.0):
+        """
+        Returns all buildings that received an action, highest priority first.
+
+        Args:
+            action (str): Exact action string.
+            min_priority (float): Only include buildings at or above this priority.
+
+        Returns:
+            list: (building_id, priority) tuples.
+        """
+        return self.connection.execute(
+            "SELECT building_id, priority FROM actions WHERE action = ? AND priority >= ? ORDER BY priority DESC",
+            (action, min_priority)
+        ).fetchall()
+
+    def get_actions(self, building_id):
+        """
+        Returns the ranked actions stored for a building.
+
+        Args:
+            building_id (str): Identifier of the building.
+
+        Returns:
+            list: (priority, action, rule_name) tuples, highest priority first.
+        """
+        return self.connection.execute(
+            "SELECT priority, action, rule FROM actions WHERE building_id = ? ORDER BY rank",
+            (str(building_id),)
+        ).fetchall()
+
+    def get_inputs(self, building_id):
+        """
+        Returns the stored input fields and engine version for a building.
+
+        Args:
+            building_id (str): Identifier of the building.
+
+        Returns:
+            tuple: (inputs dict, engine_version), or None if the building is not stored.
+        """
+        row = self.connection.execute(
+            "SELECT inputs, engine_version FROM assessments WHERE building_id = ?", (str(building_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get_hashes(self, building_ids):
+        """
+        Returns what each stored building was last assessed from.
+
+        Args:
+            building_ids (iterable): Identifiers of the buildings.
+
+        Returns:
+            dict: building_id -> (input_hash, engine_version, ruleset_hash, top_n) for the stored
+            buildings, `top_n` being None when all actions were stored.
+        """
+        building_ids = [str(building_id) for building_id in building_ids]
+        hashes = {}
+        for start in range(0, len(building_ids), 500):  # Stay below SQLite's bound parameter limit
+            chunk = building_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT building_id, input_hash, engine_version, ruleset_hash, top_n FROM assessments "
+                f"WHERE building_id IN ({placeholders})",
+                chunk
+            )
+            for building_id, stored_hash, engine_version, ruleset_hash, top_n in rows:
+                hashes[building_id] = (stored_hash, engine_version, ruleset_hash, top_n)
+        return hashes
+
+    def iter_assessments(self):
+        """
+        Streams every stored assessment in building ID order without loading them all.
+
+        Yields:
+            tuple: (building_id, inputs dict, actions) with actions as (priority, action, rule_name)
+            tuples, highest priority first.
+        """
+        rows = self.connection.cursor().execute(
+            "SELECT a.building_id, a.inputs, x.priority, x.action, x.rule FROM assessments a "
+            "LEFT JOIN actions x ON x.building_id = a.building_id ORDER BY a.building_id, x.rank"
+        )
+        current, inputs, actions = None, None, []
+        for building_id, raw_inputs, priority, action, rule in rows:
+            if building_id != current:
+                if current is not None:
+                    yield current, inputs, actions
+                current, inputs, actions = building_id, json.loads(raw_inputs), []
+            if action is not None:
+                actions.append((priority, action, rule))
+        if current is not None:
+            yield current, inputs, actions
+
+    def iter_locations(self):
+        """
+        Streams every assessed building that has a location.
+
+        Yields:
+            tuple: (building_id, latitude, longitude, categories), with the distinct
+            categories of the building's actions.
+        """
+        rows = self.connection.cursor().execute(
+            "SELECT l.building_id, l.latitude, l.longitude, GROUP_CONCAT(DISTINCT x.category) FROM locations l "
+            "JOIN assessments a ON a.building_id = l.building_id "
+            "LEFT JOIN actions x ON x.building_id = l.building_id GROUP BY l.building_id"
+        )
+        for building_id, latitude, longitude, categories in rows:
+            yield building_id, latitude, longitude, categories.split(",") if categories else []
+
+    def count(self):
+        """Returns the number of stored buildings."""
+        return self.connection.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
@@ -0,0 +1,255 @@
+import math
+import random
+
+from building_assessment_ES import BuildingAssessment
+
+# Buildings sharing a district share its damage intensity and hazard exposure
+DISTRICT_SIZE = 500
+
+# Gaza Strip outline for synthetic locations: the coast from Rafah to Beit Lahia as
+# (latitude, longitude) end points, and the inland width in km at the south, middle and north
+COAST_SOUTH = (31.320, 34.220)
+COAST_NORTH = (31.590, 34.480)
+STRIP_WIDTH_KM = (12.0, 6.5, 10.0)
+
+# Spread of buildings around their district center in km
+DISTRICT_SPREAD_KM = 0.3
+
+KM_PER_DEGREE = 111.32
+
+# Typical crack width in mm per crack class: (mean, standard deviation)
+CRACK_WIDTHS = {"none": (0.0, 0.0), "minor": (1.0, 0.7), "moderate": (6.0, 3.0), "severe": (22.0, 8.0)}
+
+
+def _clip(value, low=0.0, high=1.0):
+    return min(max(value, low), high)
+
+
+def _confidence(rng, quality):
+    """Draws a confidence around the survey quality; a few readings are missing (0.0)."""
+    if rng.random() < 0.01:
+        return 0.0
+    return round(_clip(rng.gauss(quality, 0.1)), 2)
+
+
+def _district(seed, district_id):
+    rng = random.Random(f"{seed}:district:{district_id}")
+    return {
+        "intensity": rng.betavariate(2, 3),  # Share of heavily damaged buildings
+        "hazard": rng.betavariate(1, 6),  # Exposure to ordnance and contamination
+        "flood": rng.random() < 0.2,
+        "slope": rng.choice([0.0, 0.0, 5.0, 15.0, 25.0]),
+        "pga": rng.uniform(0.05, 0.5),
+        "urban": rng.random() < 0.6,
+        "quality": rng.uniform(0.6, 0.95),  # Typical survey confidence
+    }
+
+
+def generate_building(index, seed=0, district=None):
+    """
+    Generates one synthetic building assessment.
+
+    The same (index, seed) pair always produces the same building, so populations can
+    be generated in any order or split across workers. Fields are drawn from shared
+    latent variables (district damage intensity, hazard exposure and survey quality,
+    and building damage), which makes them correlated as in real surveys: hazardous
+    zones carry more ordnance and radiation, crack width follows crack severity, and
+    overcrowding goes with displacement and multiple families.
+
+    Only fields that differ from their defaults are set.
+
+    Args:
+        index (int): Position of the building in the population.
+        seed (int): Population seed.
+        district (dict, optional): Precomputed latent variables of the building's district.
+
+    Returns:
+        tuple: (building_id, BuildingAssessment).
+    """
+    rng = random.Random(f"{seed}:{index}")
+    if district is None:
+        district = _district(seed, index // DISTRICT_SIZE)
+    quality = _clip(rng.gauss(district["quality"], 0.05), 0.3, 1.0)
+    damage = _clip(rng.betavariate(1.5, 4) + district["intensity"] - 0.3)
+    fields = {}
+
+    ### Structural ###
+    cracks = "none"
+    if damage > 0.75:
+        cracks = "severe"
+    elif damage > 0.45:
+        cracks = "moderate"
+    elif damage > 0.2:
+        cracks = "minor"
+    if cracks != "none":
+        mean, deviation = CRACK_WIDTHS[cracks]
+        fields["cracks"] = cracks
+        fields["crack_confidence"] = _confidence(rng, quality)
+        fields["crack_width"] = round(max(0.1, rng.gauss(mean, deviation)), 1)
+        fields["width_confidence"] = _confidence(rng, quality)
+        if cracks in ("moderate", "severe") and rng.random() < 0.4:
+            fields["load_bearing_cracks"] = True
+            fields["load_confidence"] = _confidence(rng, quality)
+        if cracks == "minor" and rng.random() < 0.3:
+            fields["cracks_worsening"] = True
+            fields["worsening_confidence"] = _confidence(rng, quality)
+    if damage > 0.6 and rng.random() < 0.7:
+        fields["sar_backscatter"] = True
+    elif damage < 0.15 and rng.random() < 0.5:
+        fields["radar_stable"] = True
+
+    ### Environmental ###
+    hazardous = rng.random() < district["hazard"] * 1.5
+    if hazardous:
+        fields["hazardous_zone"] = True
+        fields["hazardous_confidence"] = _confidence(rng, quality)
+        if rng.random() < 0.5:
+            fields["unexploded_ordnance"] = True
+            fields["ordnance_confidence"] = _confidence(rng, quality)
+        if rng.random() < 0.3:
+            fields["contaminated_materials"] = True
+    elif rng.random() < 0.02:
+        fields["unexploded_ordnance"] = True
+        fields["ordnance_confidence"] = _confidence(rng, quality)
+    if hazardous or rng.random() < 0.1:
+        fields["radiation_level"] = round(rng.lognormvariate(0.5 if hazardous else -1.0, 1.2), 2)
+        fields["radiation_confidence"] = _confidence(rng, quality)
+    if district["flood"]:
+        fields["flood_zone_proximity"] = round(rng.uniform(10.0, 800.0), 1)
+        fields["flood_confidence"] = _confidence(rng, quality)
+        if rng.random() < 0.4:
+            fields["in_flood_zone"] = True
+    if district["slope"]:
+        fields["slope_gradient"] = round(_clip(rng.gauss(district["slope"], 5.0), 0.0, 60.0), 1)
+    if rng.random() < 0.5:
+        fields["seismic_risk"] = round(_clip(rng.gauss(district["pga"], 0.05)), 3)
+        fields["seismic_confidence"] = _confidence(rng, quality)
+    if district["urban"]:
+        fields["urban_proximity"] = True
+        if damage > 0.5 and rng.random() < 0.6:
+            fields["infrastructure_damaged"] = True
+    if damage > 0.5 and rng.random() < damage:
+        fields["road_inaccessibility"] = True
+
+    ### Social ###
+    displaced = damage > 0.5 and rng.random() < 0.6
+    if displaced:
+        fields["population_displacement"] = True
+        fields["temporary_shelter_needed"] = rng.random() < 0.7
+    if rng.random() < (0.5 if displaced else 0.15):
+        fields["overcrowding"] = True
+        fields["overcrowding_confidence"] = _confidence(rng, quality)
+        fields["multiple_families"] = rng.random() < 0.7
+    if rng.random() < 0.25:
+        fields["vulnerable_population"] = True
+        fields["vulnerable_confidence"] = _confidence(rng, quality)
+    if rng.random() < 0.6:
+        fields["income_below_poverty"] = True
+        fields["income_confidence"] = _confidence(rng, quality)
+
+    ### Utilities and Infrastructure ###
+    if rng.random() < damage:
+        fields["damaged_utilities"] = True
+        fields["utilities_confidence"] = _confidence(rng, quality)
+        if rng.random() < 0.4:
+            fields["water_contamination"] = True
+        if rng.random() < 0.6:
+            fields["water_access_disrupted"] = True
+    if rng.random() < 0.05:
+        fields["critical_infrastructure"] = True
+        fields["infrastructure_confidence"] = _confidence(rng, quality)
+    if rng.random() < damage * 0.8:
+        fields["power_outage_duration"] = rng.choice([1, 2, 3, 6, 9, 12])
+    elif rng.random() < 0.3:
+        fields["access_to_power"] = True
+
+    ### Design and Data Availability ###
+    if rng.random() < 0.3:
+        fields["outdated_design"] = True
+    if rng.random() < 0.05 + 0.1 * (1 - quality):
+        fields["conflicting_data"] = True
+    if rng.random() < 0.15:
+        fields["missing_records"] = True
+    if rng.random() < 0.1:
+        fields["multiple_properties"] = True
+        fields["at_least_one_livable"] = rng.random() < 0.5
+    if not district["urban"] and rng.random() < 0.3:
+        fields["renewable_energy_possible"] = True
+
+    fields = {name: value for name, value in fields.items() if value is not False}
+    return f"GZ-{index:06d}", BuildingAssessment(**fields)
+
+
+def district_of(building_id, fact=None):
+    """
+    Returns the synthetic district of a generated building.
+
+    Args:
+        building_id (str): Identifier produced by `generate_building`, e.g. "GZ-001234".
+        fact (BuildingAssessment, optional): Ignored; accepted so this can serve as a
+            `GroupedAggregate` key.
+
+    Returns:
+        str: District name, e.g. "D-0002".
+    """
+    return f"D-{int(building_id[3:]) // DISTRICT_SIZE:04d}"
+
+
+def location_of(building_id, seed=0):
+    """
+    Returns a plausible location inside the Gaza Strip for a generated building.
+
+    Each district gets a center along and across the Strip, and its buildings are
+    scattered around it, so generated populations can be mapped. The same
+    (building_id, seed) always gives the same location.
+
+    Args:
+        building_id (str): Identifier produced by `generate_building`, e.g. "GZ-001234".
+        seed (int): Population seed.
+
+    Returns:
+        tuple: (latitude, longitude) in degrees.
+    """
+    index = int(building_id[3:])
+    district = random.Random(f"{seed}:location:{index // DISTRICT_SIZE}")
+    along, across = district.random(), district.uniform(0.05, 0.95)
+    rng = random.Random(f"{seed}:location:building:{index}")
+
+    km_per_lon = KM_PER_DEGREE * math.cos(math.radians(COAST_SOUTH[0]))
+    north_km = (COAST_NORTH[0] - COAST_SOUTH[0]) * KM_PER_DEGREE
+    east_km = (COAST_NORTH[1] - COAST_SOUTH[1]) * km_per_lon
+    length_km = math.hypot(north_km, east_km)
+    axis = (north_km / length_km, east_km / length_km)
+    inland = (-axis[1], axis[0])  # Perpendicular to the coast, towards the south-east
+    south, middle, north = STRIP_WIDTH_KM
+    width_km = south * (1 - along) ** 2 + 2 * middle * along * (1 - along) + north * along ** 2
+
+    along_km = along * length_km + rng.gauss(0.0, DISTRICT_SPREAD_KM)
+    across_km = min(max(across * width_km + rng.gauss(0.0, DISTRICT_SPREAD_KM), 0.0), width_km)
+    latitude = COAST_SOUTH[0] + (along_km * axis[0] + across_km * inland[0]) / KM_PER_DEGREE
+    longitude = COAST_SOUTH[1] + (along_km * axis[1] + across_km * inland[1]) / km_per_lon
+    return round(latitude, 6), round(longitude, 6)
+
+
+def generate_buildings(count, seed=0, start=0):
+    """
+    Lazily generates a synthetic building population.
+
+    Records are produced one at a time, so populations of millions of buildings can be
+    streamed into `ConcurrentAssessor.iter_assess` or `run_batch` without being held
+    in memory.
+
+    Args:
+        count (int): Number of buildings to generate.
+        seed (int): Population seed; the same seed always yields the same population.
+        start (int): Index of the first building, to generate a slice of a population.
+
+    Yields:
+        tuple: (building_id, BuildingAssessment).
+    """
+    district_id, district = None, None
+    for index in range(start, start + count):
+        if index // DISTRICT_SIZE != district_id:
+            district_id = index // DISTRICT_SIZE
+            district = _district(seed, district_id)
+        yield generate_building(index, seed, district)
@@ -0,0 +1,304 @@
+import argparse
+from collections import OrderedDict
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+# Map categories from most to least severe; each building is colored by the most severe one among its actions
+CATEGORIES = ["Critical", "High Priority", "Moderate", "Recommendation", "Low Priority", "No Action"]
+
+# Action categories by map category; anything else counts as "No Action"
+CATEGORY_INDEX = {"Critical": 0, "High Priority": 1, "Moderate": 2, "Recommendation": 3, "Low Priority": 4,
+                  "Lower Priority": 4}
+
+# RGB color per map category, from red to green, with gray for buildings without actions
+CATEGORY_COLORS = {
+    "Critical": [215, 48, 39],
+    "High Priority": [252, 141, 89],
+    "Moderate": [254, 224, 139],
+    "Recommendation": [145, 191, 219],
+    "Low Priority": [26, 152, 80],
+    "No Action": [150, 150, 150],
+}
+
+# Edge of the finest grid cells in meters; each coarser level doubles it, up to 12.8 km
+BASE_CELL_METERS = 25.0
+LEVELS = 10
+
+# Cells along each edge of a tile, the unit in which cells are cached and sent
+TILE_CELLS = 32
+
+# Level of detail is chosen so a view is at most this many cells wide
+MAX_VIEW_CELLS = 80
+
+# Cells are sent for this share of the view's size beyond each edge, so short pans stay covered
+VIEW_MARGIN = 0.25
+
+# Tile payloads kept in memory per pyramid
+TILE_CACHE_SIZE = 512
+
+METERS_PER_DEGREE = 111320.0
+
+# Ground meters per pixel at zoom 0 on the equator, in the Web Mercator zoom levels of the map
+METERS_PER_PIXEL_ZOOM_0 = 156543.03
+
+
+def highest_category(categories):
+    """
+    Returns the most severe map category among a building's action categories.
+
+    Args:
+        categories (iterable): Action categories, e.g. from `action_category`.
+
+    Returns:
+        int: Index into `CATEGORIES`; "No Action" for buildings without a known category.
+    """
+    return min((CATEGORY_INDEX.get(category, len(CATEGORIES) - 1) for category in categories),
+               default=len(CATEGORIES) - 1)
+
+
+class TileStore:
+    """
+    Multi-resolution grid of building counts by highest action category, served as tiles.
+
+    Buildings are binned once into square cells of `BASE_CELL_METERS` on a local
+    equirectangular grid, and each of the `LEVELS` levels merges 2 x 2 cells of the
+    level below. The cells of a level are sorted by tile, so a tile is a contiguous
+    slice, and tile payloads are built on first request and kept in an LRU cache.
+    A view then only costs the few tiles it overlaps at the level that shows it
+    in at most `MAX_VIEW_CELLS` cells across, whatever the number of buildings.
+    """
+
+    def __init__(self, latitudes, longitudes, categories):
+        """
+        Args:
+            latitudes (array-like): Building latitudes in degrees.
+            longitudes (array-like): Building longitudes in degrees.
+            categories (array-like): Index into `CATEGORIES` per building.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        categories = np.asarray(categories, dtype=np.int64)
+        self.buildings = len(latitudes)
+        self.reference_latitude = float(np.median(latitudes)) if self.buildings else 0.0
+        self.meters_per_lon = METERS_PER_DEGREE * math.cos(math.radians(self.reference_latitude))
+        self.bounds = ((float(latitudes.min()), float(longitudes.min()), float(latitudes.max()), float(longitudes.max()))
+                       if self.buildings else None)
+
+        start = time.perf_counter()
+        x = np.floor(longitudes * self.meters_per_lon / BASE_CELL_METERS).astype(np.int64)
+        y = np.floor(latitudes * METERS_PER_DEGREE / BASE_CELL_METERS).astype(np.int64)
+        counts = np.zeros((self.buildings, len(CATEGORIES)), dtype=np.int64)
+        counts[np.arange(self.buildings), categories] = 1
+        self.levels = []
+        for level in range(LEVELS):
+            grid = self._merge(x, y, counts)
+            self.levels.append(grid)
+            x, y, counts = grid["cells"][:, 0] >> 1, grid["cells"][:, 1] >> 1, grid["counts"]
+        self.build_seconds = time.perf_counter() - start
+
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.tile_requests = 0
+        self.tile_hits = 0
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds the pyramid from located buildings.
+
+        Args:
+            records (iterable): (latitude, longitude, categories) per building, with the
+                action categories of its actions, e.g. from `AssessmentStore.iter_locations`.
+        """
+        latitudes, longitudes, categories = [], [], []
+        for latitude, longitude, building_categories in records:
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+            categories.append(highest_category(building_categories))
+        return cls(latitudes, longitudes, categories)
+
+    def __len__(self):
+        return self.buildings
+
+    @staticmethod
+    def _merge(x, y, counts):
+        """Sums the counts falling in each (x, y) cell and indexes the cells by tile."""
+        if not len(x):
+            return {"cells": np.zeros((0, 2), dtype=np.int64), "counts": counts[:0], "tiles": {}}
+        tile_x, tile_y = np.floor_divide(x, TILE_CELLS), np.floor_divide(y, TILE_CELLS)
+        order = np.lexsort((y, x, tile_y, tile_x))  # Cells of a tile end up next to each other
+        x, y, tile_x, tile_y = x[order], y[order], tile_x[order], tile_y[order]
+        starts = np.flatnonzero(np.concatenate([[True], (np.diff(x) != 0) | (np.diff(y) != 0)]))
+        cells = np.stack([x[starts], y[starts]], axis=1)
+        merged = np.add.reduceat(counts[order], starts, axis=0)
+
+        tile_x, tile_y = tile_x[starts], tile_y[starts]
+        boundaries = np.flatnonzero(np.concatenate([[True], (np.diff(tile_x) != 0) | (np.diff(tile_y) != 0)]))
+        stops = np.concatenate([boundaries[1:], [len(cells)]])
+        tiles = {(int(tile_x[start]), int(tile_y[start])): (int(start), int(stop))
+                 for start, stop in zip(boundaries, stops)}
+        return {"cells": cells, "counts": merged, "tiles": tiles}
+
+    ### Tiles ###
+
+    def cell_meters(self, level):
+        """Returns the cell edge of a level in meters."""
+        return BASE_CELL_METERS * (1 << level)
+
+    def level_for(self, width_meters):
+        """Returns the finest level that shows `width_meters` in at most `MAX_VIEW_CELLS` cells."""
+        level = math.ceil(math.log2(max(width_meters / (MAX_VIEW_CELLS * BASE_CELL_METERS), 1.0)))
+        return min(max(level, 0), LEVELS - 1)
+
+    def tile(self, level, tile_x, tile_y):
+        """
+        Returns one tile's cells, from the cache when possible.
+
+        Args:
+            level (int): Pyramid level, 0 being the finest.
+            tile_x (int): Tile column.
+            tile_y (int): Tile row.
+
+        Returns:
+            list: One dict per non-empty cell, ready for a pydeck `GridCellLayer`: the SW
+            corner as [longitude, latitude], building count, Critical count,
+            and the most common highest category with its color.
+        """
+        key = (level, tile_x, tile_y)
+        with self._lock:
+            self.tile_requests += 1
+            payload = self._tiles.get(key)
+            if payload is not None:
+                self._tiles.move_to_end(key)
+                self.tile_hits += 1
+                return payload
+
+        grid = self.levels[level]
+        span = grid["tiles"].get((tile_x, tile_y))
+        payload = []
+        if span is not None:
+            size = self.cell_meters(level)
+            cells = grid["cells"][span[0]:span[1]]
+            counts = grid["counts"][span[0]:span[1]]
+            for (x, y), row in zip(cells.tolist(), counts.tolist()):
+                dominant = CATEGORIES[max(range(len(row)), key=lambda index: (row[index], -index))]
+                payload.append({
+                    "position": [round(x * size / self.meters_per_lon, 6), round(y * size / METERS_PER_DEGREE, 6)],
+                    "buildings": sum(row),
+                    "critical": row[0],
+                    "category": dominant,
+                    "color": CATEGORY_COLORS[dominant],
+                })
+
+        with self._lock:
+            self._tiles[key] = payload
+            while len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return payload
+
+    def view(self, latitude, longitude, zoom, width_pixels=800, height_pixels=500):
+        """
+        Returns the cells to draw for a map view.
+
+        Args:
+            latitude (float): View center latitude.
+            longitude (float): View center longitude.
+            zoom (float): Web Mercator zoom level, as in pydeck's `ViewState`.
+            width_pixels (int): Map width on screen.
+            height_pixels (int): Map height on screen.
+
+        Returns:
+            dict: The level, its cell size in meters, the number of tiles used, and the
+            cells of every tile overlapping the view.
+        """
+        meters_per_pixel = METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / 2 ** zoom
+        width = meters_per_pixel * width_pixels
+        height = meters_per_pixel * height_pixels
+        level = self.level_for(width)
+        size = self.cell_meters(level)
+        tile_meters = size * TILE_CELLS
+        west = longitude * self.meters_per_lon - width * (0.5 + VIEW_MARGIN)
+        east = longitude * self.meters_per_lon + width * (0.5 + VIEW_MARGIN)
+        south = latitude * METERS_PER_DEGREE - height * (0.5 + VIEW_MARGIN)
+        north = latitude * METERS_PER_DEGREE + height * (0.5 + VIEW_MARGIN)
+
+        cells = []
+        tiles = 0
+        index = self.levels[level]["tiles"]
+        for tile_x in range(math.floor(west / tile_meters), math.floor(east / tile_meters) + 1):
+            for tile_y in range(math.floor(south / tile_meters), math.floor(north / tile_meters) + 1):
+                if (tile_x, tile_y) not in index:
+                    continue
+                tiles += 1
+                payload = self.tile(level, tile_x, tile_y)
+                if west <= tile_x * tile_meters and (tile_x + 1) * tile_meters <= east \
+                        and south <= tile_y * tile_meters and (tile_y + 1) * tile_meters <= north:
+                    cells.extend(payload)  # Tile entirely in view
+                    continue
+                for cell in payload:
+                    x = cell["position"][0] * self.meters_per_lon
+                    y = cell["position"][1] * METERS_PER_DEGREE
+                    if west - size <= x <= east and south - size <= y <= north:
+                        cells.append(cell)
+        return {"level": level, "cell_meters": size, "tiles": tiles, "cells": cells}
+
+    def home(self, width_pixels=800, height_pixels=500):
+        """
+        Returns a view showing every building.
+
+        Returns:
+            tuple: (latitude, longitude, zoom).
+        """
+        if self.bounds is None:
+            return 0.0, 0.0, 1.0
+        south, west, north, east = self.bounds
+        latitude, longitude = (south + north) / 2, (west + east) / 2
+        width = max((east - west) * self.meters_per_lon / width_pixels,
+                    (north - south) * METERS_PER_DEGREE / height_pixels, 1.0)  # Meters per pixel to fit
+        zoom = math.log2(METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / width)
+        return latitude, longitude, min(max(math.floor(zoom * 2) / 2, 1.0), 18.0)
+
+    def report(self):
+        """Returns the number of cells and tiles per level, and the tile cache hit rate."""
+        return {
+            "levels": [(self.cell_meters(level), len(grid["cells"]), len(grid["tiles"]))
+                       for level, grid in enumerate(self.levels)],
+            "build_seconds": self.build_seconds,
+            "cache_hit_rate": self.tile_hits / self.tile_requests if self.tile_requests else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the map tile pyramid of a result store and time views at every zoom.")
+    parser.add_argument("--store", default="assessments.db", help="SQLite file with assessments and locations.")
+    parser.add_argument("--synthetic-seed", type=int, default=None,
+                        help="First save locations for the store's synthetic buildings, generated with this seed.")
+    args = parser.parse_args()
+
+    from building_assessment_store import AssessmentStore
+    with AssessmentStore(args.store) as store:
+        if args.synthetic_seed is not None:
+            from building_assessment_synthetic import location_of
+            saved = store.save_locations((building_id, *location_of(building_id, args.synthetic_seed))
+                                         for building_id, _, _ in store.iter_assessments())
+            print(f"Saved locations: {saved}")
+        start = time.perf_counter()
+        tiles = TileStore.from_records((latitude, longitude, categories)
+                                       for _, latitude, longitude, categories in store.iter_locations())
+        print(f"Buildings:       {len(tiles)}")
+        print(f"Load and build:  {time.perf_counter() - start:.2f} s (pyramid {tiles.build_seconds:.2f} s)")
+
+    latitude, longitude, home_zoom = tiles.home()
+    for zoom in np.arange(home_zoom, 19.0, 1.0):
+        timings = []
+        for attempt in ("cold", "cached"):
+            start = time.perf_counter()
+            view = tiles.view(latitude, longitude, zoom)
+            timings.append((time.perf_counter() - start) * 1000)
+        payload_kb = len(json.dumps(view["cells"])) / 1024
+        print(f"Zoom {zoom:4.1f}: {view['cell_meters']:>6.0f} m cells, {len(view['cells']):>5} cells from "
+              f"{view['tiles']:>2} tiles, {payload_kb:>6.0f} KB, {timings[0]:6.1f} ms cold, {timings[1]:5.1f} ms cached")
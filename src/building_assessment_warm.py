@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import building_assessment_ES
+import building_assessment_fuzzy
+import building_assessment_rules
+from building_assessment_ES import ENGINE_VERSION, BuildingAssessmentExpertSystem
+from building_assessment_fuzzy import FuzzySurface, cache_surface, get_surface
+from building_assessment_rules import DEFAULT_CACHE_DIR, get_active_rules, read_cached, write_cached
+
+# Bump when the snapshot layout changes so stale snapshots are not reused
+SNAPSHOT_VERSION = 2
+
+# Modules whose source defines how an engine is built; editing any of them invalidates snapshots
+ENGINE_MODULES = [building_assessment_ES, building_assessment_fuzzy, building_assessment_rules]
+
+
+### Snapshots ###
+
+def source_hash():
+    """Returns a SHA-256 over the engine's source code, engine version and snapshot layout."""
+    digest = hashlib.sha256(f"{ENGINE_VERSION}-snapshot-{SNAPSHOT_VERSION}".encode())
+    for module in ENGINE_MODULES:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def snapshot_name(ruleset):
+    """
+    Returns the file name of a rule set's snapshot.
+
+    Snapshots are named after both the engine source and the rule definitions, so
+    editing either one makes engines look for, and build, a fresh snapshot.
+    """
+    key = hashlib.sha256((source_hash() + ruleset.content_hash).encode()).hexdigest()
+    return f"engine-{key}.npz"
+
+
+def snapshot_path(ruleset, cache_dir=DEFAULT_CACHE_DIR):
+    """Returns where the snapshot of a rule set is stored."""
+    return os.path.join(cache_dir, snapshot_name(ruleset))
+
+
+def save_snapshot(ruleset=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Writes the expensive part of a warm engine to disk: the fuzzy inference surface.
+
+    The surface is stored as plain numpy arrays (`np.savez`), so loading a snapshot
+    never runs code from the file. experta's RETE network holds closures that cannot
+    be serialized; it takes a few milliseconds to rebuild once the surface is loaded,
+    and forked processes inherit it from `warm_start` instead (see `take_engine`).
+
+    Args:
+        ruleset (CompiledRuleSet, optional): Rule definitions; defaults to the active rules.
+        cache_dir (str): Directory for snapshots, private to the current user.
+
+    Returns:
+        str or None: Path of the snapshot, or None if it could not be written.
+    """
+    ruleset = ruleset or get_active_rules()
+    surface = get_surface(ruleset)
+    buffer = io.BytesIO()
+    np.savez(buffer, content_hash=np.array(ruleset.content_hash), moment=surface.moment, area=surface.area,
+             errors=np.array([surface.max_error, surface.mean_error], dtype=float),
+             **{f"axis_{index}": axis for index, axis in enumerate(surface.axes)})
+    # Snapshots are an optimization; a read-only filesystem should not prevent startup
+    write_cached(cache_dir, snapshot_name(ruleset), buffer.getvalue())
+    path = snapshot_path(ruleset, cache_dir)
+    return path if os.path.exists(path) else None
+
+
+def load_snapshot(ruleset=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Loads a rule set's snapshot into this process, if a current one exists.
+
+    Args:
+        ruleset (CompiledRuleSet, optional): Rule definitions; defaults to the active rules.
+        cache_dir (str): Directory for snapshots; files another user owns or can write to are ignored.
+
+    Returns:
+        bool: Whether a snapshot was loaded.
+    """
+    ruleset = ruleset or get_active_rules()
+    data = read_cached(cache_dir, snapshot_name(ruleset))
+    if data is None:
+        return False
+    try:
+        with np.load(io.BytesIO(data), allow_pickle=False) as snapshot:
+            if str(snapshot["content_hash"]) != ruleset.content_hash:
+                return False
+            axes = [snapshot[f"axis_{index}"] for index in range(len(ruleset.fuzzy_inference["inputs"]))]
+            max_error, mean_error = snapshot["errors"].tolist()
+            surface = FuzzySurface(axes, snapshot["moment"], snapshot["area"], max_error, mean_error)
+    except (ValueError, KeyError, OSError, EOFError):
+        return False  # Corrupt or outdated snapshot; rebuilt and overwritten by `warm_start`
+    cache_surface(ruleset, surface)
+    return True
+
+
+### Warm Templates ###
+
+# Engines built by `warm_start`, keyed by pinned rule set hash (None follows the active set): (pid, engine)
+_templates = {}
+
+
+def warm_start(ruleset=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Readies this process to build engines quickly, and leaves a template engine for forked children.
+
+    Loads the snapshot of the rule set, or builds and saves one, then builds and resets
+    one engine. Processes forked afterwards (e.g. `multiprocessing` pools with the
+    "fork" start method) each claim that engine through `take_engine`, so their first
+    assessment pays neither for imports nor for building the surface or the network.
+
+    Args:
+        ruleset (CompiledRuleSet, optional): Pin the template to these rule definitions.
+        cache_dir (str or None): Directory for snapshots; None always builds from scratch.
+
+    Returns:
+        dict: Whether a snapshot was loaded and the seconds until the engine was ready.
+    """
+    start = time.perf_counter()
+    active = ruleset or get_active_rules()
+    loaded = cache_dir is not None and load_snapshot(active, cache_dir)
+    if cache_dir is not None and not loaded:
+        save_snapshot(active, cache_dir)
+
+    engine = BuildingAssessmentExpertSystem(ruleset)
+    engine.reset()
+    _templates[None if ruleset is None else ruleset.content_hash] = (os.getpid(), engine)
+    return {"snapshot_loaded": loaded, "seconds": time.perf_counter() - start}
+
+
+def take_engine(ruleset=None):
+    """
+    Claims the template engine inherited from a warm parent process.
+
+    The process that ran `warm_start` keeps its template for later forks, so only
+    forked children get one, each exactly once.
+
+    Args:
+        ruleset (CompiledRuleSet, optional): The rule set the engine must be pinned to.
+
+    Returns:
+        BuildingAssessmentExpertSystem or None: A reset engine, or None to build one.
+    """
+    key = None if ruleset is None else ruleset.content_hash
+    entry = _templates.pop(key, None)  # Atomic, so two threads cannot claim the same engine
+    if entry is None:
+        return None
+    if entry[0] == os.getpid():
+        _templates.setdefault(key, entry)
+        return None
+    return entry[1]
+
+
+### Measurement ###
+
+_READY_SCRIPT = """
+import time
+start = time.perf_counter()
+from building_assessment_warm import warm_start
+warm_start(cache_dir={cache_dir!r})
+print(time.perf_counter() - start)
+"""
+
+
+def measure_startup(cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Times engine-ready in a fresh interpreter: imports, surface, network and reset.
+
+    Args:
+        cache_dir (str or None): Snapshot directory; None measures a cold start.
+
+    Returns:
+        float: Seconds until the engine was ready.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get("PYTHONPATH")]))
+    output = subprocess.run([sys.executable, "-c", _READY_SCRIPT.format(cache_dir=cache_dir)],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return float(output.split()[-1])
+
+
+def _fork_ready():
+    from building_assessment_service import ConcurrentAssessor  # Already imported by the parent
+    start = time.perf_counter()
+    ConcurrentAssessor().engine().reset()
+    return time.perf_counter() - start
+
+
+def measure_fork(cache_dir=DEFAULT_CACHE_DIR):
+    """Times engine-ready in a child forked from this process after `warm_start`."""
+    import building_assessment_service  # noqa: F401, imported before forking like a real server would
+    warm_start(cache_dir=cache_dir)
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        return pool.apply(_fork_ready)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure engine-ready time with and without a warm-engine snapshot.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Snapshot directory.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters started per measurement.")
+    args = parser.parse_args()
+
+    # The service claims templates from the imported module, not from this __main__ copy
+    from building_assessment_warm import measure_fork, measure_startup, save_snapshot
+    save_snapshot(cache_dir=args.cache_dir)
+    cold = min(measure_startup(None) for _ in range(args.repeat))
+    warm = min(measure_startup(args.cache_dir) for _ in range(args.repeat))
+    print(f"Cold start:      {cold * 1000:.0f} ms")
+    print(f"From snapshot:   {warm * 1000:.0f} ms")
+    if "fork" in multiprocessing.get_all_start_methods():
+        print(f"Forked child:    {measure_fork(args.cache_dir) * 1000:.1f} ms")
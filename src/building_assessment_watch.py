@@ -0,0 +1,404 @@
+import argparse
+from collections import deque, namedtuple
+import hashlib
+import json
+import os
+import queue
+import shutil
+import signal
+import threading
+import time
+
+from building_assessment_changes import reassess
+from building_assessment_csv import ID_COLUMN, csv_columns, iter_csv_records, parse_location, parse_value
+from building_assessment_ES import BuildingAssessment
+from building_assessment_metrics import REGISTRY
+from building_assessment_service import ConcurrentAssessor
+from building_assessment_warm import warm_start
+
+# File types picked up from the watched directory
+EXTENSIONS = (".csv", ".jsonl")
+
+# Name patterns of files still being written; writers should rename them once complete
+PARTIAL_SUFFIXES = (".tmp", ".part", ".partial")
+
+# Latency buckets in seconds, from a tenth of a second to ten minutes
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# At most this many row errors and finished files are kept for display
+MAX_ERRORS = 100
+MAX_REPORTS = 1000
+
+INGEST_LATENCY_SECONDS = REGISTRY.histogram(
+    "building_assessment_ingest_latency_seconds",
+    "Time from a watched file's arrival to its records being saved, per record.", LATENCY_BUCKETS)
+INGESTED_RECORDS = REGISTRY.counter("building_assessment_ingested_records", "Records read from watched files.")
+BACKPRESSURE_SECONDS = REGISTRY.counter(
+    "building_assessment_ingest_backpressure_seconds", "Time the file reader waited for room in the queue.")
+
+FileReport = namedtuple("FileReport", ["name", "records", "reassessed", "errors", "latency", "failure"])
+
+
+def file_hash(path):
+    """Returns the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_jsonl_records(stream, locations=None):
+    """
+    Reads building assessments from JSON Lines, one object per line.
+
+    Objects use the same names as the CSV columns. Values may be JSON-typed or
+    strings; missing, null and empty fields keep their defaults and unknown fields are ignored.
+
+    Args:
+        stream (file): Text file.
+        locations (dict, optional): Filled with building_id -> (latitude, longitude) for
+            valid objects with a location.
+
+    Yields:
+        tuple: (line_number, building_id, fact, error), as `iter_csv_records`.
+    """
+    accepted = set(csv_columns()) - {ID_COLUMN}
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"expected a JSON object, got {type(row).__name__}.")
+        except ValueError as error:
+            yield line_number, f"row-{line_number}", None, f"Invalid JSON: {error}"
+            continue
+        building_id = str(row.get(ID_COLUMN) or "").strip() or f"row-{line_number}"
+        try:
+            values = {name: parse_value(name, str(value))
+                      for name, value in row.items() if name in accepted and value is not None and str(value).strip()}
+        except ValueError as error:
+            yield line_number, building_id, None, str(error)
+            continue
+        if locations is not None:
+            location = parse_location(row)
+            if location is not None:
+                locations[building_id] = location
+        yield line_number, building_id, BuildingAssessment(**values), None
+
+
+class WatchFolder:
+    """
+    Assesses building files as they are dropped into a directory.
+
+    A reader thread polls the directory for new CSV and JSON Lines files and parses
+    them in chunks onto a bounded queue; a worker thread assesses each chunk with
+    warm engines and saves it. When files arrive faster than they are assessed the
+    queue fills up, the reader blocks, and further files simply wait in the
+    directory, so memory stays bounded by `max_pending` chunks.
+
+    Saving is idempotent: each building goes through `reassess`, which skips
+    buildings already stored with the same inputs and replaces the others, and a
+    file is marked ingested in the store by its content hash once all of its
+    records are saved. A file interrupted by a crash is therefore read again on
+    restart without duplicating results, and the same file dropped twice is skipped.
+    """
+
+    def __init__(self, directory, store, assessor=None, portfolio=None, top_n=None, chunk_size=200, max_pending=8,
+                 poll_interval=1.0, settle=0.5, archive_dir=None, on_file=None):
+        """
+        Args:
+            directory (str): Directory to watch.
+            store (AssessmentStore): Store receiving the results; also records ingested files.
+            assessor (ConcurrentAssessor, optional): Assessor to use; its pool bounds the concurrency.
+                A new one is created if omitted.
+            portfolio (PortfolioQueue, optional): Updated with every re-assessed building.
+            top_n (int, optional): Only the top `top_n` actions are needed per building.
+            chunk_size (int): Records assessed and saved together.
+            max_pending (int): Chunks parsed ahead of the worker before the reader waits.
+            poll_interval (float): Seconds between directory scans.
+            settle (float): Seconds a file must go unmodified before it is read, for writers
+                that do not rename complete files into place.
+            archive_dir (str, optional): Move ingested files here; they stay in place if omitted.
+            on_file (callable, optional): Called with a `FileReport` as each file finishes.
+        """
+        self.directory = directory
+        self.store = store
+        self.own_assessor = assessor is None
+        self.assessor = assessor or ConcurrentAssessor()
+        self.portfolio = portfolio
+        self.top_n = top_n
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.archive_dir = archive_dir
+        self.on_file = on_file
+
+        self.files = 0
+        self.skipped = 0
+        self.records = 0
+        self.reassessed = 0
+        self.error_count = 0
+        self.errors = deque(maxlen=MAX_ERRORS)  # (file name, row number, building_id, message)
+        self.reports = deque(maxlen=MAX_REPORTS)
+        self.backpressure_seconds = 0.0
+        self._queue = queue.Queue(maxsize=max(max_pending, 1))
+        self._seen = {}  # path -> (size, mtime_ns) of files already queued or skipped
+        self._reading = False
+        self._store_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reader = threading.Thread(target=self._read_loop, name="watch-reader", daemon=True)
+        self._worker = threading.Thread(target=self._work_loop, name="watch-worker", daemon=True)
+
+    def start(self):
+        """Warms the engines and starts watching; returns self."""
+        warm_start()
+        self.assessor.engine()
+        self._reader.start()
+        self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stops watching once the chunk being assessed is saved; queued chunks are read again on restart."""
+        self._stopped.set()
+        self._reader.join(timeout)
+        self._worker.join(timeout)
+        if self.own_assessor:
+            self.assessor.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def queue_depth(self):
+        """Returns the number of parsed chunks waiting for the worker."""
+        return self._queue.qsize()
+
+    def idle(self):
+        """Returns whether every file in the directory has been processed."""
+        return not self._reading and self._queue.unfinished_tasks == 0 and not self.scan(settled=False)
+
+    ### Reading ###
+
+    def scan(self, settled=True):
+        """
+        Lists new files ready to be read, oldest first.
+
+        Args:
+            settled (bool): Leave out files modified within the last `settle` seconds.
+
+        Returns:
+            list: (path, arrival time) pairs; arrival is the file's last modification time.
+        """
+        ready = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return ready
+        for entry in entries:
+            name = entry.name
+            if (name.startswith(".") or not name.lower().endswith(EXTENSIONS)
+                    or name.lower().endswith(PARTIAL_SUFFIXES) or not entry.is_file()):
+                continue
+            stat = entry.stat()
+            if self._seen.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            if settled and now - stat.st_mtime < self.settle:
+                continue  # Possibly still being written
+            ready.append((stat.st_mtime, entry.path, (stat.st_size, stat.st_mtime_ns)))
+        return [(path, arrival) for arrival, path, _ in sorted(ready)]
+
+    def _put(self, item):
+        """Queues an item, waiting while the queue is full; returns False if stopped meanwhile."""
+        waited = time.perf_counter()
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            waited = time.perf_counter() - waited
+            if waited > 0.1:
+                self.backpressure_seconds += waited
+                BACKPRESSURE_SECONDS.inc(amount=waited)
+            return True
+        return False
+
+    def _read_file(self, path, arrival):
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        content_hash = file_hash(path)
+        with self._store_lock:
+            ingested = self.store.is_ingested(content_hash)
+        self._seen[path] = (stat.st_size, stat.st_mtime_ns)
+        if ingested:
+            self.skipped += 1
+            self._archive(path)
+            return True
+
+        read = iter_jsonl_records if name.lower().endswith(".jsonl") else iter_csv_records
+        records = 0
+        chunk = []
+        errors = []
+        locations = {}
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as stream:
+                for row_number, building_id, fact, error in read(stream, locations):
+                    records += 1
+                    if error is not None:
+                        errors.append((name, row_number, building_id, error))
+                        continue
+                    chunk.append((building_id, fact))
+                    if len(chunk) >= self.chunk_size:
+                        if not self._put(("chunk", path, arrival, chunk)):
+                            return False
+                        chunk = []
+        except (OSError, UnicodeDecodeError, ValueError) as error:
+            return self._put(("failed", path, arrival, f"{type(error).__name__}: {error}"))
+        if chunk and not self._put(("chunk", path, arrival, chunk)):
+            return False
+        return self._put(("done", path, arrival, (content_hash, records, errors, locations)))
+
+    def _read_loop(self):
+        while not self._stopped.is_set():
+            for path, arrival in self.scan():
+                self._reading = True
+                try:
+                    if not self._read_file(path, arrival):
+                        return
+                except FileNotFoundError:
+                    continue  # Removed between the scan and the read
+                finally:
+                    self._reading = False
+            self._stopped.wait(self.poll_interval)
+
+    ### Assessing ###
+
+    def _work_loop(self):
+        reassessed = {}  # path -> records re-assessed so far
+        failures = {}  # path -> first error assessing one of its chunks
+        while not self._stopped.is_set():
+            try:
+                kind, path, arrival, payload = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                if kind == "chunk" and path not in failures:
+                    try:
+                        with self._store_lock:
+                            report = reassess(payload, self.store, self.assessor, self.portfolio, self.top_n,
+                                              chunk_size=len(payload))
+                    except Exception as error:  # Keep watching; the file is retried when modified or on restart
+                        failures[path] = f"{type(error).__name__}: {error}"
+                        continue
+                    latency = time.time() - arrival
+                    for _ in range(len(payload)):
+                        INGEST_LATENCY_SECONDS.observe(latency)
+                    reassessed[path] = reassessed.get(path, 0) + report.reassessed
+                elif kind == "done" and path not in failures:
+                    self._finish(path, arrival, payload, reassessed.pop(path, 0))
+                elif kind != "chunk":
+                    reassessed.pop(path, None)
+                    failure = failures.pop(path, None) or payload
+                    self._report(FileReport(os.path.basename(path), 0, 0, 0, time.time() - arrival, failure))
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, path, arrival, payload, reassessed):
+        content_hash, records, errors, locations = payload
+        name = os.path.basename(path)
+        with self._store_lock:
+            self.store.save_locations((building_id, *location) for building_id, location in locations.items())
+            self.store.mark_ingested(content_hash, name, records)
+        self._archive(path)
+        self.records += records
+        self.reassessed += reassessed
+        self.error_count += len(errors)
+        self.errors.extend(errors)
+        INGESTED_RECORDS.inc(amount=records)
+        self._report(FileReport(name, records, reassessed, len(errors), time.time() - arrival, None))
+
+    def _report(self, report):
+        self.files += 1
+        self.reports.append(report)
+        if self.on_file is not None:
+            self.on_file(report)
+
+    def _archive(self, path):
+        if self.archive_dir is None:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        try:
+            shutil.move(path, os.path.join(self.archive_dir, os.path.basename(path)))
+        except FileNotFoundError:
+            pass
+        self._seen.pop(path, None)
+
+    ### Reporting ###
+
+    def latency_summary(self):
+        """
+        Summarizes end-to-end latency over the recent files.
+
+        Returns:
+            dict: Median, 95th percentile and maximum seconds from a file's arrival
+            until all of its records were saved, over the last `MAX_REPORTS` files.
+        """
+        latencies = sorted(report.latency for report in list(self.reports) if report.failure is None)
+        if not latencies:
+            return {"files": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "files": len(latencies),
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+            "max": latencies[-1],
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assess building files as they are dropped into a directory.")
+    parser.add_argument("directory", help="Directory to watch for .csv and .jsonl files.")
+    parser.add_argument("--store", default="assessments.db", help="SQLite file receiving the results.")
+    parser.add_argument("--archive", default=None, help="Move ingested files to this directory.")
+    parser.add_argument("--workers", type=int, default=None, help="Assessor thread pool size.")
+    parser.add_argument("--top-n", type=int, default=None, help="Only compute the top N actions per building.")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Records assessed and saved together.")
+    parser.add_argument("--max-pending", type=int, default=8, help="Chunks parsed ahead before reading pauses.")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between directory scans.")
+    parser.add_argument("--once", action="store_true", help="Exit once the files already present are processed.")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve metrics on this local port.")
+    args = parser.parse_args()
+
+    from building_assessment_store import AssessmentStore
+    if args.metrics_port is not None:
+        from building_assessment_metrics import serve_metrics
+        serve_metrics(args.metrics_port)
+
+    def print_report(report):
+        if report.failure is not None:
+            print(f"{report.name}: failed after {report.latency:.1f} s: {report.failure}", flush=True)
+        else:
+            print(f"{report.name}: {report.records} records, {report.reassessed} re-assessed, {report.errors} errors, "
+                  f"available {report.latency:.1f} s after arrival", flush=True)
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    with AssessmentStore(args.store) as store, ConcurrentAssessor(max_workers=args.workers) as assessor:
+        watcher = WatchFolder(args.directory, store, assessor, top_n=args.top_n, chunk_size=args.chunk_size,
+                              max_pending=args.max_pending, poll_interval=args.poll_interval,
+                              archive_dir=args.archive, on_file=print_report)
+        with watcher:
+            try:
+                while not stopped.wait(args.poll_interval):
+                    if args.once and watcher.idle():
+                        break
+            except KeyboardInterrupt:
+                pass
+        summary = watcher.latency_summary()
+        print(f"Files:         {watcher.files} ({watcher.skipped} skipped as already ingested)")
+        print(f"Records:       {watcher.records} ({watcher.reassessed} re-assessed, {watcher.error_count} errors)")
+        print(f"Latency:       p50 {summary['p50']:.1f} s, p95 {summary['p95']:.1f} s, max {summary['max']:.1f} s")
+        print(f"Backpressure:  {watcher.backpressure_seconds:.1f} s waiting for the worker")